@@ -0,0 +1,55 @@
+import string
+from typing import Dict, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+COLUMN_TYPES = ("int", "float", "text", "category", "bool", "date")
+CATEGORIES = ("alpha", "beta", "gamma", "delta", "epsilon", "zeta", "eta", "theta")
+TEXT_ALPHABET = np.array(list(string.ascii_lowercase + " "))
+
+
+def column_names(columns: int, types: Sequence[str]) -> List[str]:
+    """Columns cycle through ``types`` and are named after their type."""
+    counts: Dict[str, int] = {}
+    names = []
+    for i in range(columns):
+        column_type = types[i % len(types)]
+        names.append(f"{column_type}_{counts.get(column_type, 0)}")
+        counts[column_type] = counts.get(column_type, 0) + 1
+    return names
+
+
+def generate_column(rng: np.random.Generator, column_type: str, rows: int, text_length: int) -> np.ndarray:
+    if column_type == "int":
+        return rng.integers(0, 1_000_000, rows)
+    if column_type == "float":
+        return np.round(rng.normal(1000, 250, rows), 3)
+    if column_type == "text":
+        lengths = rng.integers(max(1, text_length // 2), text_length + 1, rows)
+        letters = TEXT_ALPHABET[rng.integers(0, len(TEXT_ALPHABET), int(lengths.sum()))]
+        flat = "".join(letters)
+        offsets = np.concatenate(([0], np.cumsum(lengths)))
+        return np.array([flat[offsets[i]:offsets[i + 1]].strip() or "x" for i in range(rows)], dtype=object)
+    if column_type == "category":
+        return np.array(CATEGORIES, dtype=object)[rng.integers(0, len(CATEGORIES), rows)]
+    if column_type == "bool":
+        return rng.random(rows) < 0.5
+    if column_type == "date":
+        start = np.datetime64("2020-01-01")
+        return (start + rng.integers(0, 5 * 365, rows).astype("timedelta64[D]")).astype(str)
+    raise ValueError(f"Unknown column type '{column_type}', expected one of {COLUMN_TYPES}")
+
+
+def generate_frame(rows: int, columns: int, types: Sequence[str] = COLUMN_TYPES, text_length: int = 24, seed: int = 42) -> pd.DataFrame:
+    """Deterministic synthetic dataset: the same arguments give the same frame."""
+    rng = np.random.default_rng(seed)
+    names = column_names(columns, types)
+    data = {}
+    for i, name in enumerate(names):
+        data[name] = generate_column(rng, types[i % len(types)], rows, text_length)
+    return pd.DataFrame(data)
+
+
+def to_csv_bytes(df: pd.DataFrame) -> bytes:
+    return df.to_csv(index=False).encode()
@@ -0,0 +1,250 @@
+"""In-process stand-ins for MongoDB and Postgres.
+
+They answer from memory and don't evaluate filters, sorts or groupings:
+every query returns the stored rows in insertion order, paged as asked.
+Benchmarks against them measure the application's own cost (query
+building, admission, coalescing, row conversion, serialization) with
+the database time taken out. Use ``--backend local`` for end-to-end
+numbers.
+"""
+import re
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from utils.serialization import dumps
+
+INSERT_PATTERN = re.compile(r'INSERT INTO "(\w+)" \(([^)]*)\)')
+TABLE_PATTERN = re.compile(r'FROM "(\w+)"')
+CREATE_PATTERN = re.compile(r'CREATE TABLE IF NOT EXISTS "(\w+)" \((.*)\)', re.DOTALL)
+COLUMN_PATTERN = re.compile(r'"?(\w+)"? ([A-Z ]+?)(?: DEFAULT| PRIMARY|$)')
+
+
+class FakeCursor:
+    def __init__(self, documents: List[Dict[str, Any]]):
+        self.documents = documents
+        self.offset = 0
+        self.count: Optional[int] = None
+
+    def sort(self, *args, **kwargs) -> "FakeCursor":
+        return self
+
+    def skip(self, offset: int) -> "FakeCursor":
+        self.offset = offset
+        return self
+
+    def limit(self, count: int) -> "FakeCursor":
+        self.count = count
+        return self
+
+    async def to_list(self, length: Optional[int] = None) -> List[Dict[str, Any]]:
+        end = len(self.documents)
+        for bound in (self.count, length):
+            if bound:
+                end = min(end, self.offset + bound)
+        # Copies stand in for the driver decoding fresh documents
+        return [dict(document) for document in self.documents[self.offset:end]]
+
+    def __aiter__(self):
+        return self.iterate()
+
+    async def close(self) -> None:
+        pass
+
+    async def iterate(self):
+        for document in await self.to_list():
+            yield document
+
+
+class FakeCollection:
+    def __init__(self):
+        self.documents: List[Dict[str, Any]] = []
+        self.by_id: Dict[Any, Dict[str, Any]] = {}
+        self.indexes: List[Dict[str, Any]] = [{"name": "_id_", "key": {"_id": 1}}]
+
+    async def insert_many(self, documents: List[Dict[str, Any]], ordered: bool = True) -> None:
+        errors = []
+        for index, document in enumerate(documents):
+            try:
+                await self.insert_one(document)
+            except DuplicateKeyError as e:
+                errors.append({"index": index, "code": 11000, "errmsg": str(e)})
+                if ordered:
+                    break
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": len(documents) - len(errors)})
+
+    async def insert_one(self, document: Dict[str, Any]) -> None:
+        document = {"_id": ObjectId(), **document}
+        if document["_id"] in self.by_id:
+            raise DuplicateKeyError(f"E11000 duplicate key error _id: {document['_id']}", 11000)
+        self.documents.append(document)
+        self.by_id[document["_id"]] = document
+
+    async def update_one(self, query: Dict[str, Any], update: Dict[str, Any], upsert: bool = False) -> None:
+        document = self.by_id.get(query.get("_id"))
+        if document is None:
+            if not upsert:
+                return
+            document = {"_id": query.get("_id"), **update.get("$setOnInsert", {})}
+            self.documents.append(document)
+            self.by_id[document["_id"]] = document
+        document.update(update.get("$set", {}))
+        for key, amount in update.get("$inc", {}).items():
+            document[key] = document.get(key, 0) + amount
+
+    async def replace_one(self, query: Dict[str, Any], document: Dict[str, Any], upsert: bool = False) -> None:
+        existing = self.by_id.get(query.get("_id"))
+        if existing is not None:
+            existing.clear()
+            existing["_id"] = query.get("_id")
+        await self.update_one(query, {"$set": document}, upsert=upsert)
+
+    async def find_one(self, query: Optional[Dict[str, Any]] = None, projection=None) -> Optional[Dict[str, Any]]:
+        if query and "_id" in query:
+            document = self.by_id.get(query["_id"])
+        else:
+            document = self.documents[0] if self.documents else None
+        return dict(document) if document is not None else None
+
+    def find(self, query=None, projection=None, **kwargs) -> FakeCursor:
+        return FakeCursor(self.documents)
+
+    async def count_documents(self, query, **kwargs) -> int:
+        return len(self.documents)
+
+    async def estimated_document_count(self) -> int:
+        return len(self.documents)
+
+    def aggregate(self, pipeline: List[Dict[str, Any]], **kwargs) -> FakeCursor:
+        stages = {name: stage[name] for stage in pipeline for name in stage}
+        if "$facet" in stages:
+            # The combined count-and-page query of fetch_page_with_count
+            page = {name: value for stage in stages["$facet"]["data"] for name, value in stage.items()}
+            data = self.documents[page.get("$skip", 0):page.get("$skip", 0) + page.get("$limit", len(self.documents))]
+            return FakeCursor([{"total": [{"count": len(self.documents)}], "data": [dict(d) for d in data]}])
+        if "$sample" in stages:
+            # Field discovery
+            keys = list(self.documents[0]) if self.documents else []
+            return FakeCursor([{"_id": None, "allkeys": keys}] if keys else [])
+        return FakeCursor(self.documents).limit(stages.get("$limit", 0))
+
+    async def create_index(self, keys, **kwargs) -> str:
+        name = "_".join(f"{field}_{direction}" for field, direction in keys)
+        self.indexes.append({"name": name, "key": dict(keys)})
+        return name
+
+    def list_indexes(self) -> FakeCursor:
+        return FakeCursor(self.indexes)
+
+
+class FakeMongoDatabase:
+    def __init__(self):
+        self.collections: Dict[str, FakeCollection] = {}
+
+    def __getitem__(self, name: str) -> FakeCollection:
+        if name not in self.collections:
+            self.collections[name] = FakeCollection()
+        return self.collections[name]
+
+    async def list_collection_names(self) -> List[str]:
+        return list(self.collections)
+
+    async def command(self, *args, **kwargs) -> Dict[str, Any]:
+        return {"ok": 1}
+
+
+class FakeRecord(dict):
+    """Row that iterates over its values, like asyncpg.Record."""
+
+    def __iter__(self):
+        return iter(self.values())
+
+
+class FakePostgresConnection:
+    def __init__(self, postgres: "FakePostgres"):
+        self.tables = postgres.tables
+        self.columns = postgres.columns
+        self.statements = postgres.statements
+
+    def rows_for(self, query: str) -> List[Dict[str, Any]]:
+        match = TABLE_PATTERN.search(query)
+        return self.tables.get(match.group(1), []) if match else []
+
+    def page(self, query: str, args) -> List[Dict[str, Any]]:
+        rows = self.rows_for(query)
+        if "OFFSET" in query:
+            limit, offset = args[-2], args[-1]
+        else:
+            limit, offset = (args[-1] if "LIMIT" in query else len(rows)), 0
+        return [FakeRecord(row) for row in rows[offset:offset + limit]]
+
+    async def execute(self, query: str, *args, **kwargs) -> str:
+        self.statements.append((query, args))
+        match = CREATE_PATTERN.search(query)
+        if match and match.group(1) not in self.columns:
+            definitions = [COLUMN_PATTERN.match(definition.strip()) for definition in match.group(2).split(",")]
+            self.columns[match.group(1)] = [definition.groups() for definition in definitions]
+        return "OK"
+
+    async def executemany(self, query: str, values, **kwargs) -> None:
+        match = INSERT_PATTERN.search(query)
+        table, columns = match.group(1), [column.strip().strip('"') for column in match.group(2).split(",")]
+        self.tables.setdefault(table, []).extend(dict(zip(columns, row)) for row in values)
+
+    async def fetch(self, query: str, *args, **kwargs) -> List[Dict[str, Any]]:
+        if "information_schema.columns" in query:
+            columns = self.columns.get(args[0])
+            if columns is None:
+                # Tables filled directly, without a CREATE TABLE
+                rows = self.tables.get(args[0], [])
+                columns = [("id", "UUID"), *((name, "TEXT") for name in (rows[0] if rows else []))]
+            data_types = {"TIMESTAMP": "timestamp without time zone"}
+            return [
+                FakeRecord(column_name=name, data_type=data_types.get(pg_type, pg_type.lower()))
+                for name, pg_type in columns
+            ]
+        page = self.page(query, args)
+        if "COUNT(*) OVER()" in query:
+            total = len(self.rows_for(query))
+            for row in page:
+                row["__total_count"] = total
+        return page
+
+    async def fetchrow(self, query: str, *args, **kwargs) -> Optional[Dict[str, Any]]:
+        if "json_agg" in query:
+            return {"total": len(self.rows_for(query)), "data": dumps(self.page(query, args)).decode()}
+        return None
+
+    async def fetchval(self, query: str, *args, **kwargs) -> Any:
+        if "RETURNING" in query:
+            return args[0]
+        if "COUNT(*)" in query:
+            return len(self.rows_for(query))
+        return None
+
+
+class FakePostgres:
+    def __init__(self):
+        self.tables: Dict[str, List[Dict[str, Any]]] = {}
+        # Table -> (column, type) as created, for information_schema lookups
+        self.columns: Dict[str, List[tuple]] = {}
+        self.statements: List[tuple] = []
+
+    async def acquire(self) -> FakePostgresConnection:
+        return FakePostgresConnection(self)
+
+    async def release(self, conn) -> None:
+        pass
+
+
+def install_fakes() -> None:
+    """Point the services at in-memory stand-ins for both databases."""
+    import services.mongo_service as mongo_service
+    import services.supabase_service as supabase_service
+
+    mongo_service.db = FakeMongoDatabase()
+    postgres = FakePostgres()
+    supabase_service.acquire_connection = postgres.acquire
+    supabase_service.release_connection = postgres.release
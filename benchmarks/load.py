@@ -0,0 +1,387 @@
+"""Open-loop HTTP load against a running instance.
+
+    python -m benchmarks.load --url http://localhost:8000 --rate 200 --duration 60
+    python -m benchmarks.load --mix benchmarks/mix.example.jsonl --rate 50
+    python -m benchmarks.load --mix recorded.jsonl --replay --speed 2
+
+Requests are sent on a fixed schedule whatever the server's speed, so a
+slow response does not hold back the ones behind it. Each request is
+timed twice: service time runs from when it was written to the socket,
+corrected time from when the schedule said it should start. When the
+server (or the connection pool) falls behind, only the corrected times
+show the wait, which is what a client arriving at that rate would see.
+
+A mix file has one request per line:
+
+    {"name": "mongo_query", "method": "GET", "path": "/api/mongodb/collections/uploads/query",
+     "params": {"page": 1, "limit": 50}, "weight": 5}
+    {"name": "mongo_query_json", "method": "POST", "path": "...", "json": {...}}
+    {"name": "upload", "method": "POST", "path": "/api/upload/upload",
+     "params": {"collection_name": "load_{n}"}, "upload": {"rows": 1000, "columns": 8}}
+
+"{n}" in the path or a parameter becomes the request's sequence number.
+"upload" sends a generated CSV (or "file" sends one from disk) as
+multipart form data. With --replay, lines carrying "offset_ms" are sent
+at those offsets, in file order, instead of being drawn by weight.
+Lines without a "path" are skipped.
+"""
+import argparse
+import asyncio
+import json
+import random
+import ssl
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlencode, urlsplit
+
+from benchmarks.run import percentile
+
+BOUNDARY = "----benchmarks-load-boundary"
+
+
+def default_mix(collection: str, table: str) -> List[Dict[str, Any]]:
+    return [
+        {"name": "health", "method": "GET", "path": "/Database_health", "weight": 1},
+        {"name": "mongo_query", "method": "GET", "path": f"/api/mongodb/collections/{collection}/query",
+         "params": {"page": 1, "limit": 50}, "weight": 6},
+        {"name": "mongo_query_json", "method": "POST", "path": f"/api/mongodb/collections/{collection}/query-json",
+         "json": {"page": 2, "limit": 50, "sort_order": "desc"}, "weight": 4},
+        {"name": "mongo_aggregate", "method": "POST", "path": f"/api/mongodb/collections/{collection}/aggregate",
+         "json": [{"$sample": {"size": 100}}, {"$limit": 10}], "weight": 2},
+        {"name": "supabase_query", "method": "GET", "path": f"/api/supabase/tables/{table}/query",
+         "params": {"page": 1, "limit": 50}, "weight": 6},
+        {"name": "supabase_query_json", "method": "POST", "path": f"/api/supabase/tables/{table}/query-json",
+         "json": {"page": 2, "limit": 50}, "weight": 4},
+        {"name": "supabase_aggregate", "method": "POST", "path": f"/api/supabase/tables/{table}/aggregate",
+         "json": {"metrics": [{"function": "count"}]}, "weight": 2},
+        {"name": "upload", "method": "POST", "path": "/api/upload/upload",
+         "params": {"table_name": "load_{n}", "collection_name": "load_{n}"},
+         "upload": {"rows": 1000, "columns": 8}, "weight": 1}
+    ]
+
+
+def load_mix(path: str) -> List[Dict[str, Any]]:
+    specs = []
+    with open(path) as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            spec = json.loads(line)
+            if "path" not in spec:
+                print(f"Skipping line {line_number}: no 'path'", file=sys.stderr)
+                continue
+            specs.append(spec)
+    if not specs:
+        raise SystemExit(f"No replayable requests in {path}")
+    return specs
+
+
+def substitute(value: Any, n: int) -> Any:
+    if isinstance(value, str):
+        return value.replace("{n}", str(n))
+    if isinstance(value, dict):
+        return {key: substitute(item, n) for key, item in value.items()}
+    if isinstance(value, list):
+        return [substitute(item, n) for item in value]
+    return value
+
+
+def multipart_body(filename: str, content: bytes) -> bytes:
+    return (
+        f"--{BOUNDARY}\r\n"
+        f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        f"Content-Type: text/csv\r\n\r\n"
+    ).encode() + content + f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+def upload_content(spec: Dict[str, Any]) -> Tuple[str, bytes]:
+    if "file" in spec:
+        with open(spec["file"], "rb") as f:
+            return spec["file"].rsplit("/", 1)[-1], f.read()
+    from benchmarks.datasets import generate_frame, to_csv_bytes
+
+    options = spec["upload"]
+    df = generate_frame(options.get("rows", 1000), options.get("columns", 8), seed=options.get("seed", 42))
+    return "load.csv", to_csv_bytes(df)
+
+
+class PreparedRequest:
+    def __init__(self, spec: Dict[str, Any]):
+        self.name = spec.get("name") or f"{spec.get('method', 'GET')} {spec['path']}"
+        self.method = spec.get("method", "GET").upper()
+        self.path = spec["path"]
+        self.params = spec.get("params") or {}
+        self.weight = spec.get("weight", 1)
+        self.offset_ms = spec.get("offset_ms")
+        self.headers = dict(spec.get("headers") or {})
+        self.body = b""
+        if "json" in spec:
+            self.body = json.dumps(spec["json"]).encode()
+            self.headers["Content-Type"] = "application/json"
+        elif "upload" in spec or "file" in spec:
+            self.body = multipart_body(*upload_content(spec))
+            self.headers["Content-Type"] = f"multipart/form-data; boundary={BOUNDARY}"
+
+    def target(self, n: int) -> str:
+        path = substitute(self.path, n)
+        if not self.params:
+            return path
+        params = {key: json.dumps(value) if isinstance(value, (dict, list)) else value
+                  for key, value in substitute(self.params, n).items()}
+        return f"{path}?{urlencode(params)}"
+
+
+class Connection:
+    """One keep-alive HTTP/1.1 connection."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.reusable = True
+
+    async def request(self, method: str, target: str, host: str, headers: Dict[str, str], body: bytes) -> Tuple[int, int]:
+        lines = [f"{method} {target} HTTP/1.1", f"Host: {host}", f"Content-Length: {len(body)}"]
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        self.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode() + body)
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError("Connection closed by server")
+        status = int(status_line.split()[1])
+        response_headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            response_headers[name.strip().lower()] = value.strip()
+
+        if response_headers.get("connection", "").lower() == "close":
+            self.reusable = False
+        if response_headers.get("transfer-encoding", "").lower() == "chunked":
+            return status, await self.read_chunked()
+        if "content-length" in response_headers:
+            return status, len(await self.reader.readexactly(int(response_headers["content-length"])))
+        self.reusable = False
+        return status, len(await self.reader.read())
+
+    async def read_chunked(self) -> int:
+        size = 0
+        while True:
+            chunk_size = int((await self.reader.readline()).split(b";")[0], 16)
+            if chunk_size == 0:
+                # Trailers, then the blank line
+                while (await self.reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                return size
+            size += len(await self.reader.readexactly(chunk_size))
+            await self.reader.readexactly(2)
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+class ConnectionPool:
+    def __init__(self, url: str, size: int):
+        parts = urlsplit(url)
+        self.host = parts.hostname or "localhost"
+        self.port = parts.port or (443 if parts.scheme == "https" else 80)
+        self.host_header = parts.netloc
+        self.ssl = ssl.create_default_context() if parts.scheme == "https" else None
+        self.semaphore = asyncio.Semaphore(size)
+        self.idle: List[Connection] = []
+
+    async def acquire(self) -> Connection:
+        await self.semaphore.acquire()
+        if self.idle:
+            return self.idle.pop()
+        try:
+            return Connection(*await asyncio.open_connection(self.host, self.port, ssl=self.ssl))
+        except BaseException:
+            self.semaphore.release()
+            raise
+
+    def release(self, conn: Connection, healthy: bool) -> None:
+        if healthy and conn.reusable:
+            self.idle.append(conn)
+        else:
+            conn.close()
+        self.semaphore.release()
+
+    def close(self) -> None:
+        for conn in self.idle:
+            conn.close()
+        self.idle.clear()
+
+
+class Recorder:
+    def __init__(self):
+        self.samples: Dict[str, List[Dict[str, Any]]] = {}
+        self.max_schedule_lag = 0.0
+
+    def add(self, name: str, service: Optional[float], corrected: float, status: Optional[int],
+            size: int, error: Optional[str]) -> None:
+        self.samples.setdefault(name, []).append({
+            "service": service, "corrected": corrected, "status": status, "bytes": size, "error": error
+        })
+
+
+async def send(pool: ConnectionPool, request: PreparedRequest, n: int, intended: float,
+               timeout: float, recorder: Recorder) -> None:
+    service_started = None
+    status, size, error = None, 0, None
+    try:
+        conn = await pool.acquire()
+        healthy = False
+        try:
+            service_started = time.perf_counter()
+            status, size = await asyncio.wait_for(
+                conn.request(request.method, request.target(n), pool.host_header, request.headers, request.body),
+                timeout
+            )
+            healthy = True
+        finally:
+            pool.release(conn, healthy)
+        if status >= 400:
+            error = f"HTTP {status}"
+    except asyncio.TimeoutError:
+        error = "timeout"
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    finished = time.perf_counter()
+    recorder.add(
+        request.name,
+        finished - service_started if service_started is not None else None,
+        finished - intended,
+        status, size, error
+    )
+
+
+def schedule(requests: List[PreparedRequest], args: argparse.Namespace) -> List[Tuple[float, PreparedRequest]]:
+    """(offset in seconds, request) pairs in send order."""
+    if args.replay:
+        timed = [request for request in requests if request.offset_ms is not None]
+        if not timed:
+            raise SystemExit("--replay needs 'offset_ms' on the mix lines")
+        return [(request.offset_ms / 1000 / args.speed, request) for request in timed]
+
+    rng = random.Random(args.seed)
+    weights = [request.weight for request in requests]
+    total = args.requests or int(args.rate * args.duration)
+    picks = rng.choices(requests, weights=weights, k=total)
+    return [(i / args.rate, request) for i, request in enumerate(picks)]
+
+
+async def run_load(args: argparse.Namespace) -> Tuple[Recorder, float]:
+    specs = load_mix(args.mix) if args.mix else default_mix(args.collection, args.table)
+    requests = [PreparedRequest(spec) for spec in specs]
+    plan = schedule(requests, args)
+    pool = ConnectionPool(args.url, args.connections)
+    recorder = Recorder()
+    tasks = []
+
+    started = time.perf_counter()
+    for n, (offset, request) in enumerate(plan):
+        intended = started + offset
+        delay = intended - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        else:
+            recorder.max_schedule_lag = max(recorder.max_schedule_lag, -delay)
+        tasks.append(asyncio.create_task(send(pool, request, n, intended, args.timeout, recorder)))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+    pool.close()
+    return recorder, elapsed
+
+
+def summarize(samples: List[Dict[str, Any]], elapsed: float) -> Dict[str, Any]:
+    # Error responses count towards latency too; only requests that got
+    # no response at all are left out
+    answered = [sample for sample in samples if sample["status"] is not None]
+    service = [sample["service"] for sample in answered]
+    corrected = [sample["corrected"] for sample in answered]
+    errors = [sample for sample in samples if sample["error"]]
+    statuses: Dict[str, int] = {}
+    for sample in samples:
+        key = str(sample["status"]) if sample["status"] is not None else sample["error"].split(":")[0]
+        statuses[key] = statuses.get(key, 0) + 1
+
+    def ms(values: List[float], fraction: float) -> float:
+        return round(percentile(values, fraction) * 1000, 2)
+
+    return {
+        "requests": len(samples),
+        "throughput": round(len(samples) / elapsed, 1) if elapsed else 0.0,
+        "errors": len(errors),
+        "error_rate": round(len(errors) / len(samples), 4) if samples else 0.0,
+        "statuses": statuses,
+        "bytes": sum(sample["bytes"] for sample in samples),
+        "service_ms": {"p50": ms(service, 0.5), "p90": ms(service, 0.9), "p99": ms(service, 0.99),
+                       "max": ms(service, 1.0)},
+        "corrected_ms": {"p50": ms(corrected, 0.5), "p90": ms(corrected, 0.9), "p99": ms(corrected, 0.99),
+                         "p999": ms(corrected, 0.999), "max": ms(corrected, 1.0)}
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    header = ("requests", "req/s", "errors", "svc p50", "svc p99", "cor p50", "cor p99", "cor p999", "cor max")
+    print(f"{'endpoint':<22}" + "".join(f"{column:>10}" for column in header))
+    for name, summary in report["endpoints"].items():
+        cells = (
+            summary["requests"], summary["throughput"], f"{summary['error_rate'] * 100:.1f}%",
+            summary["service_ms"]["p50"], summary["service_ms"]["p99"],
+            summary["corrected_ms"]["p50"], summary["corrected_ms"]["p99"],
+            summary["corrected_ms"]["p999"], summary["corrected_ms"]["max"]
+        )
+        print(f"{name:<22}" + "".join(f"{cell:>10}" for cell in cells))
+    target = f"Target rate {report['target_rate']}/s, achieved" if report["target_rate"] else "Replayed at"
+    print(f"\n{target} {report['endpoints']['all']['throughput']}/s over {report['elapsed_sec']}s. Latencies in ms.")
+    if report["max_schedule_lag_ms"] > 10:
+        print(f"The generator fell up to {report['max_schedule_lag_ms']} ms behind its schedule; "
+              f"corrected times include that delay.")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Replay a request mix against a running instance")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--mix", help="JSONL request mix; a built-in mix is used when omitted")
+    parser.add_argument("--collection", default="uploads", help="Collection used by the built-in mix")
+    parser.add_argument("--table", default="uploads", help="Table used by the built-in mix")
+    parser.add_argument("--rate", type=float, default=50, help="Requests per second")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to run at --rate")
+    parser.add_argument("--requests", type=int, help="Send this many requests instead of --duration worth")
+    parser.add_argument("--replay", action="store_true", help="Send at the mix's recorded offset_ms")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed-up factor")
+    parser.add_argument("--connections", type=int, default=64, help="Maximum open connections")
+    parser.add_argument("--timeout", type=float, default=30, help="Per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write the report as JSON to this file")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    recorder, elapsed = asyncio.run(run_load(args))
+
+    everything = [sample for samples in recorder.samples.values() for sample in samples]
+    endpoints = {name: summarize(samples, elapsed) for name, samples in sorted(recorder.samples.items())}
+    endpoints["all"] = summarize(everything, elapsed)
+    report = {
+        "url": args.url,
+        "target_rate": None if args.replay else args.rate,
+        "elapsed_sec": round(elapsed, 2),
+        "max_schedule_lag_ms": round(recorder.max_schedule_lag * 1000, 1),
+        "endpoints": endpoints
+    }
+
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
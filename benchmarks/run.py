@@ -0,0 +1,194 @@
+"""Benchmark the ingest and query paths.
+
+    python -m benchmarks.run                          # in-process fakes
+    python -m benchmarks.run --backend local          # MONGO_URI / SUPABASE_DB_* from the environment
+    python -m benchmarks.run --save-baseline benchmarks/baseline.json
+    python -m benchmarks.run --baseline benchmarks/baseline.json
+
+Each scenario runs in its own interpreter, so peak RSS is per scenario
+and no cache or pool state carries over. With --baseline, any metric
+worse than the baseline by more than --tolerance is reported as a
+regression and the exit status is 1. Local runs leave their bench_*
+datasets behind.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+SCENARIOS = ("upload", "mongo_query", "supabase_query", "mongo_aggregate")
+# Metric name -> whether a higher value is better
+COMPARED_METRICS = {"rows_per_sec": True, "p50_ms": False, "p99_ms": False, "peak_rss_mb": False}
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, min(len(ordered), int(fraction * len(ordered) + 0.999999)))
+    return ordered[rank - 1]
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def summarize(run: Dict[str, Any]) -> Dict[str, Any]:
+    latencies = run["latencies"]
+    return {
+        "operations": len(latencies),
+        "errors": len(run["errors"]),
+        "first_error": run["errors"][0] if run["errors"] else None,
+        "elapsed_sec": round(run["elapsed"], 3),
+        "ops_per_sec": round(len(latencies) / run["elapsed"], 1) if run["elapsed"] else 0.0,
+        "rows_per_sec": round(run["rows"] / run["elapsed"], 1) if run["elapsed"] else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2) if latencies else 0.0,
+        "peak_rss_mb": peak_rss_mb()
+    }
+
+
+async def run_scenario(args: argparse.Namespace) -> Dict[str, Any]:
+    from benchmarks.datasets import generate_frame
+    from benchmarks.scenarios import drive, prepare
+
+    if args.backend == "fake":
+        from benchmarks.fakes import install_fakes
+        install_fakes()
+
+    df = generate_frame(args.rows, args.columns, args.types.split(","), args.text_length, args.seed)
+    name = f"bench_{args.rows}x{args.columns}_{args.seed}_{int(time.time())}"
+    operation = await prepare(args.worker, df, name, args.page_limit)
+    iterations = args.upload_iterations if args.worker == "upload" else args.iterations
+    concurrency = 1 if args.worker == "upload" else args.concurrency
+    return summarize(await drive(operation, iterations, concurrency, args.warmup))
+
+
+def worker_command(args: argparse.Namespace, scenario: str) -> List[str]:
+    command = [sys.executable, "-m", "benchmarks.run", "--worker", scenario]
+    for option in ("backend", "rows", "columns", "types", "text_length", "seed",
+                   "iterations", "upload_iterations", "concurrency", "warmup", "page_limit"):
+        command += [f"--{option.replace('_', '-')}", str(getattr(args, option))]
+    return command
+
+
+def run_workers(args: argparse.Namespace) -> Dict[str, Dict[str, Any]]:
+    env = dict(os.environ)
+    if args.backend == "fake":
+        # Nothing should reach out to a real server during a fake run
+        env.setdefault("WARMUP_ENABLED", "false")
+        env.setdefault("SPOOL_ENABLED", "false")
+
+    results = {}
+    for scenario in args.scenarios.split(","):
+        print(f"Running {scenario}...", file=sys.stderr)
+        completed = subprocess.run(worker_command(args, scenario), env=env, capture_output=True, text=True)
+        if completed.returncode != 0:
+            print(completed.stderr, file=sys.stderr)
+            raise SystemExit(f"Scenario {scenario} failed")
+        results[scenario] = json.loads(completed.stdout.strip().splitlines()[-1])
+    return results
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], tolerance: float) -> List[str]:
+    regressions = []
+    for scenario, result in results.items():
+        previous = baseline.get(scenario)
+        if previous is None:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            old, new = previous.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            worse = change < -tolerance if higher_is_better else change > tolerance
+            result.setdefault("change", {})[metric] = round(change * 100, 1)
+            if worse:
+                regressions.append(f"{scenario}.{metric}: {old} -> {new} ({change * 100:+.1f}%)")
+    return regressions
+
+
+def print_table(results: Dict[str, Dict[str, Any]]) -> None:
+    columns = ("operations", "errors", "rows_per_sec", "ops_per_sec", "p50_ms", "p99_ms", "peak_rss_mb")
+    print(f"{'scenario':<18}" + "".join(f"{column:>16}" for column in columns))
+    for scenario, result in results.items():
+        cells = []
+        for column in columns:
+            change = result.get("change", {}).get(column)
+            cell = f"{result[column]}" + (f" ({change:+.0f}%)" if change is not None else "")
+            cells.append(f"{cell:>16}")
+        print(f"{scenario:<18}" + "".join(cells))
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark ingest and query paths")
+    parser.add_argument("--backend", choices=("fake", "local"), default="fake")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--rows", type=int, default=20000, help="Rows in the synthetic dataset")
+    parser.add_argument("--columns", type=int, default=12)
+    parser.add_argument("--types", default="int,float,text,category,bool,date", help="Column types to cycle through")
+    parser.add_argument("--text-length", type=int, default=24, help="Maximum length of text values")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--iterations", type=int, default=2000, help="Timed operations per query scenario")
+    parser.add_argument("--upload-iterations", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--page-limit", type=int, default=50)
+    parser.add_argument("--baseline", help="Compare against this results file")
+    parser.add_argument("--save-baseline", help="Write the results here")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed fraction of change before flagging")
+    parser.add_argument("--output", help="Also write the results, with environment details, to this file")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+
+    if args.worker:
+        logging.basicConfig(level=logging.WARNING)
+        print(json.dumps(asyncio.run(run_scenario(args))))
+        return
+
+    results = run_workers(args)
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f)["results"], args.tolerance)
+
+    print_table(results)
+    report = {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "backend": args.backend
+        },
+        "arguments": {key: value for key, value in vars(args).items() if key != "worker"},
+        "results": results
+    }
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w") as f:
+                json.dump(report, f, indent=2)
+
+    if regressions:
+        print("\nRegressions:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+import asyncio
+import io
+import time
+from typing import Any, Awaitable, Callable, Dict, List
+
+import pandas as pd
+from starlette.datastructures import UploadFile
+
+from benchmarks.datasets import to_csv_bytes
+
+Operation = Callable[[int], Awaitable[int]]
+
+
+def upload_file(name: str, content: bytes) -> UploadFile:
+    return UploadFile(file=io.BytesIO(content), filename=f"{name}.csv")
+
+
+async def seed_dataset(df: pd.DataFrame, name: str) -> None:
+    from handlers.upload_handler import UploadHandler
+
+    result = await UploadHandler.handle_file_upload(
+        upload_file(name, to_csv_bytes(df)), table_name=name, collection_name=name
+    )
+    if result["status"] != "success":
+        raise RuntimeError(f"Seeding '{name}' failed: {result}")
+
+
+def query_mix(df: pd.DataFrame, i: int, page_limit: int):
+    """Rotate through plain, search, filter and sort queries over varying pages.
+
+    Distinct pages keep identical queries from being coalesced, so each
+    iteration does its own work.
+    """
+    from schemas.schema import QueryParams
+
+    columns = list(df.columns)
+    pages = max(1, len(df) // page_limit)
+    params = {"page": i % pages + 1, "limit": page_limit}
+    text_columns = [column for column in columns if column.startswith(("text", "category"))]
+    numeric_columns = [column for column in columns if column.startswith(("int", "float"))]
+
+    kind = i % 4
+    if kind == 1 and text_columns:
+        params.update(search="ab", search_columns=text_columns[:2], page=1)
+        params["limit"] = page_limit + i % 7
+    elif kind == 2 and numeric_columns:
+        params["filters"] = {numeric_columns[0]: {"gte": int(df[numeric_columns[0]].median())}}
+    elif kind == 3:
+        params.update(sort_by=columns[i % len(columns)], sort_order="desc")
+    return QueryParams(**params)
+
+
+def aggregate_pipeline(df: pd.DataFrame, i: int) -> List[Dict[str, Any]]:
+    columns = list(df.columns)
+    group_column = next((column for column in columns if column.startswith("category")), columns[0])
+    numeric_column = next((column for column in columns if column.startswith(("int", "float"))), None)
+    group: Dict[str, Any] = {"_id": f"${group_column}", "rows": {"$sum": 1}}
+    if numeric_column:
+        group["average"] = {"$avg": f"${numeric_column}"}
+    # The threshold changes every iteration so the result cache never answers
+    return [
+        {"$match": {numeric_column or group_column: {"$gte": i}}},
+        {"$group": group},
+        {"$sort": {"rows": -1}}
+    ]
+
+
+async def prepare(scenario: str, df: pd.DataFrame, name: str, page_limit: int) -> Operation:
+    """Seed what the scenario reads and return its timed operation.
+
+    Each operation takes the iteration number and returns the rows it
+    processed.
+    """
+    if scenario == "upload":
+        from handlers.upload_handler import UploadHandler
+
+        content = to_csv_bytes(df)
+
+        async def upload(i: int) -> int:
+            dataset = f"{name}_upload_{i}"
+            result = await UploadHandler.handle_file_upload(
+                upload_file(dataset, content), table_name=dataset, collection_name=dataset
+            )
+            if result["status"] != "success":
+                raise RuntimeError(f"Upload failed: {result}")
+            return result["rows"]
+
+        return upload
+
+    await seed_dataset(df, name)
+
+    if scenario == "mongo_query":
+        from config import MONGO_COLLECTION
+        from services.mongo_service import query_collection
+
+        async def mongo_query(i: int) -> int:
+            # Uploads land in MONGO_COLLECTION whatever the dataset name
+            result = await query_collection(MONGO_COLLECTION, query_mix(df, i, page_limit))
+            return len(result.data)
+
+        return mongo_query
+
+    if scenario == "supabase_query":
+        from services.supabase_service import query_table, sanitize_column_name
+
+        table_name = sanitize_column_name(name)
+
+        async def supabase_query(i: int) -> int:
+            result = await query_table(table_name, query_mix(df, i, page_limit))
+            return len(result.data)
+
+        return supabase_query
+
+    if scenario == "mongo_aggregate":
+        from config import MONGO_COLLECTION
+        from services.mongo_service import aggregate_collection
+
+        async def mongo_aggregate(i: int) -> int:
+            return len(await aggregate_collection(MONGO_COLLECTION, aggregate_pipeline(df, i)))
+
+        return mongo_aggregate
+
+    raise ValueError(f"Unknown scenario '{scenario}'")
+
+
+async def drive(operation: Operation, iterations: int, concurrency: int, warmup: int) -> Dict[str, Any]:
+    for i in range(warmup):
+        await operation(-1 - i)
+
+    latencies: List[float] = []
+    errors: List[str] = []
+    rows = 0
+    next_iteration = 0
+
+    async def worker() -> None:
+        nonlocal rows, next_iteration
+        while next_iteration < iterations:
+            i = next_iteration
+            next_iteration += 1
+            started = time.perf_counter()
+            try:
+                rows += await operation(i)
+            except Exception as e:
+                errors.append(f"{type(e).__name__}: {e}")
+                continue
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return {
+        "elapsed": time.perf_counter() - started,
+        "latencies": latencies,
+        "rows": rows,
+        "errors": errors
+    }
@@ -0,0 +1,70 @@
+"""Measure cold-start cost per deployment profile.
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --profiles query --runs 10
+
+Each run imports ``main`` in a fresh interpreter and reports the import
+time, the peak RSS and which heavy libraries ended up loaded. The
+lifespan isn't run, since its time depends on reaching the databases;
+a running instance reports that as startup_duration_seconds.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+HEAVY_MODULES = ("pandas", "numpy", "pyarrow", "motor")
+
+WORKER = f"""
+import json, sys, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter() - started
+from benchmarks.run import peak_rss_mb
+print(json.dumps({{
+    "import_ms": imported * 1000,
+    "peak_rss_mb": peak_rss_mb(),
+    "modules": len(sys.modules),
+    "loaded": [name for name in {HEAVY_MODULES!r} if name in sys.modules]
+}}))
+"""
+
+
+def measure(profile: str, runs: int) -> dict:
+    env = {**os.environ, "APP_PROFILE": profile}
+    samples = []
+    for _ in range(runs):
+        completed = subprocess.run([sys.executable, "-c", WORKER], env=env, capture_output=True, text=True)
+        if completed.returncode != 0:
+            print(completed.stderr, file=sys.stderr)
+            raise SystemExit(f"Importing main with APP_PROFILE={profile} failed")
+        samples.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+    return {
+        "import_ms": round(statistics.median(sample["import_ms"] for sample in samples), 1),
+        "peak_rss_mb": round(statistics.median(sample["peak_rss_mb"] for sample in samples), 1),
+        "modules": samples[-1]["modules"],
+        "loaded": samples[-1]["loaded"]
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure cold-start cost per deployment profile")
+    parser.add_argument("--profiles", default="full,query")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per profile; the median is reported")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    results = {profile: measure(profile, args.runs) for profile in args.profiles.split(",")}
+    print(f"{'profile':<10}{'import_ms':>12}{'peak_rss_mb':>14}{'modules':>10}  loaded")
+    for profile, result in results.items():
+        print(f"{profile:<10}{result['import_ms']:>12}{result['peak_rss_mb']:>14}{result['modules']:>10}  "
+              f"{', '.join(result['loaded']) or '-'}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
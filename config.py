@@ -14,4 +14,114 @@ SUPABASE_DB_PORT=os.getenv("SUPABASE_DB_PORT")
 SUPABASE_DB_NAME=os.getenv("SUPABASE_DB_NAME")
 SUPABASE_DB_USER=os.getenv("SUPABASE_DB_USER")
 SUPABASE_DB_PASSWORD=os.getenv("SUPABASE_DB_PASSWORD")
-SUPABASE_SERVICE_ROLE_KEY=os.getenv("SUPABASE_SERVICE_ROLE_KEY")
\ No newline at end of file
+SUPABASE_SERVICE_ROLE_KEY=os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+SUPABASE_POOL_MIN_SIZE=int(os.getenv("SUPABASE_POOL_MIN_SIZE", "1"))
+SUPABASE_POOL_MAX_SIZE=int(os.getenv("SUPABASE_POOL_MAX_SIZE", "10"))
+SUPABASE_STATEMENT_CACHE_SIZE=int(os.getenv("SUPABASE_STATEMENT_CACHE_SIZE", "100"))
+
+# Query execution
+QUERY_COMBINED_COUNT=os.getenv("QUERY_COMBINED_COUNT", "true").lower() == "true"
+# MongoDB returns the combined count and page as one document, capped at 16MB
+QUERY_COMBINED_COUNT_MAX_LIMIT=int(os.getenv("QUERY_COMBINED_COUNT_MAX_LIMIT", "500"))
+QUERY_COALESCING=os.getenv("QUERY_COALESCING", "true").lower() == "true"
+QUERY_RAW_JSON=os.getenv("QUERY_RAW_JSON", "true").lower() == "true"
+QUERY_TIMEOUT_MS=int(os.getenv("QUERY_TIMEOUT_MS", "30000"))
+QUERY_MAX_TIMEOUT_MS=int(os.getenv("QUERY_MAX_TIMEOUT_MS", "120000"))
+CANCEL_ON_DISCONNECT=os.getenv("CANCEL_ON_DISCONNECT", "true").lower() == "true"
+
+# Aggregation
+AGGREGATE_MAX_RESULTS=int(os.getenv("AGGREGATE_MAX_RESULTS", "10000"))
+AGGREGATE_MAX_TIME_MS=int(os.getenv("AGGREGATE_MAX_TIME_MS", "30000"))
+AGGREGATE_ALLOW_DISK_USE=os.getenv("AGGREGATE_ALLOW_DISK_USE", "false").lower() == "true"
+AGGREGATE_CACHE_TTL=float(os.getenv("AGGREGATE_CACHE_TTL", "60"))
+AGGREGATE_CACHE_SIZE=int(os.getenv("AGGREGATE_CACHE_SIZE", "256"))
+AGGREGATE_STREAM_BATCH_SIZE=int(os.getenv("AGGREGATE_STREAM_BATCH_SIZE", "1000"))
+AGGREGATE_MAX_GROUPS=int(os.getenv("AGGREGATE_MAX_GROUPS", "10000"))
+FACET_MAX_FIELDS=int(os.getenv("FACET_MAX_FIELDS", "20"))
+FACET_MAX_VALUES=int(os.getenv("FACET_MAX_VALUES", "1000"))
+
+# Column statistics
+STATS_TOP_K=int(os.getenv("STATS_TOP_K", "10"))
+STATS_HISTOGRAM_BINS=int(os.getenv("STATS_HISTOGRAM_BINS", "20"))
+STATS_RECOMPUTE_MAX_ROWS=int(os.getenv("STATS_RECOMPUTE_MAX_ROWS", "1000000"))
+
+
+# Response compression
+COMPRESSION_ENABLED=os.getenv("COMPRESSION_ENABLED", "true").lower() == "true"
+COMPRESSION_MIN_SIZE=int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSION_GZIP_LEVEL=int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_ZSTD_LEVEL=int(os.getenv("COMPRESSION_ZSTD_LEVEL", "3"))
+COMPRESSION_OFFLOAD_SIZE=int(os.getenv("COMPRESSION_OFFLOAD_SIZE", str(1024 * 1024)))
+
+# Dataset catalog
+CATALOG_CACHE_TTL=float(os.getenv("CATALOG_CACHE_TTL", "300"))
+CATALOG_CACHE_SIZE=int(os.getenv("CATALOG_CACHE_SIZE", "1024"))
+
+# In-memory hot dataset tier (opt-in): comma-separated dataset names, or "*"
+HOT_DATASETS=os.getenv("HOT_DATASETS", "")
+HOT_DATASET_MAX_ROWS=int(os.getenv("HOT_DATASET_MAX_ROWS", "300000"))
+HOT_DATASET_MEMORY_MB=int(os.getenv("HOT_DATASET_MEMORY_MB", "512"))
+HOT_DATASET_RETRY_SECONDS=float(os.getenv("HOT_DATASET_RETRY_SECONDS", "300"))
+# Uploads only invalidate frames in the worker that took them; others reload after this
+HOT_DATASET_MAX_AGE_SECONDS=float(os.getenv("HOT_DATASET_MAX_AGE_SECONDS", "60"))
+
+# Batch queries
+BATCH_QUERY_MAX_ITEMS=int(os.getenv("BATCH_QUERY_MAX_ITEMS", "50"))
+BATCH_QUERY_CONCURRENCY=int(os.getenv("BATCH_QUERY_CONCURRENCY", "8"))
+
+# Admission control
+ADMISSION_ENABLED=os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+ADMISSION_QUEUE_SIZE=int(os.getenv("ADMISSION_QUEUE_SIZE", "64"))
+ADMISSION_MAX_WAIT_MS=int(os.getenv("ADMISSION_MAX_WAIT_MS", "5000"))
+MONGO_QUERY_CONCURRENCY=int(os.getenv("MONGO_QUERY_CONCURRENCY", "32"))
+MONGO_AGGREGATE_CONCURRENCY=int(os.getenv("MONGO_AGGREGATE_CONCURRENCY", "8"))
+MONGO_UPLOAD_CONCURRENCY=int(os.getenv("MONGO_UPLOAD_CONCURRENCY", "2"))
+SUPABASE_QUERY_CONCURRENCY=int(os.getenv("SUPABASE_QUERY_CONCURRENCY", "8"))
+SUPABASE_AGGREGATE_CONCURRENCY=int(os.getenv("SUPABASE_AGGREGATE_CONCURRENCY", "4"))
+SUPABASE_UPLOAD_CONCURRENCY=int(os.getenv("SUPABASE_UPLOAD_CONCURRENCY", "2"))
+
+# Circuit breakers
+CIRCUIT_BREAKER_ENABLED=os.getenv("CIRCUIT_BREAKER_ENABLED", "true").lower() == "true"
+CIRCUIT_FAILURE_THRESHOLD=int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "3"))
+CIRCUIT_RESET_SECONDS=float(os.getenv("CIRCUIT_RESET_SECONDS", "5"))
+CIRCUIT_MAX_RESET_SECONDS=float(os.getenv("CIRCUIT_MAX_RESET_SECONDS", "60"))
+CIRCUIT_PROBE_TIMEOUT_SECONDS=float(os.getenv("CIRCUIT_PROBE_TIMEOUT_SECONDS", "5"))
+
+# Write spool
+SPOOL_ENABLED=os.getenv("SPOOL_ENABLED", "true").lower() == "true"
+SPOOL_DIR=os.getenv("SPOOL_DIR", ".spool")
+SPOOL_RETRY_INITIAL_SECONDS=float(os.getenv("SPOOL_RETRY_INITIAL_SECONDS", "5"))
+SPOOL_RETRY_MAX_SECONDS=float(os.getenv("SPOOL_RETRY_MAX_SECONDS", "600"))
+SPOOL_MAX_ATTEMPTS=int(os.getenv("SPOOL_MAX_ATTEMPTS", "50"))
+SPOOL_POLL_SECONDS=float(os.getenv("SPOOL_POLL_SECONDS", "30"))
+SPOOL_CLAIM_TIMEOUT_SECONDS=float(os.getenv("SPOOL_CLAIM_TIMEOUT_SECONDS", "900"))
+
+# Health monitor and startup warm-up
+HEALTH_CHECK_INTERVAL_SECONDS=float(os.getenv("HEALTH_CHECK_INTERVAL_SECONDS", "10"))
+HEALTH_CHECK_TIMEOUT_SECONDS=float(os.getenv("HEALTH_CHECK_TIMEOUT_SECONDS", "3"))
+WARMUP_ENABLED=os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+WARMUP_TIMEOUT_SECONDS=float(os.getenv("WARMUP_TIMEOUT_SECONDS", "15"))
+
+# Slow-query log
+SLOW_QUERY_ENABLED=os.getenv("SLOW_QUERY_ENABLED", "true").lower() == "true"
+SLOW_QUERY_THRESHOLD_MS=int(os.getenv("SLOW_QUERY_THRESHOLD_MS", "1000"))
+SLOW_QUERY_LOG_SIZE=int(os.getenv("SLOW_QUERY_LOG_SIZE", "200"))
+SLOW_QUERY_EXPLAIN=os.getenv("SLOW_QUERY_EXPLAIN", "true").lower() == "true"
+SLOW_QUERY_EXPLAIN_TIMEOUT_SECONDS=float(os.getenv("SLOW_QUERY_EXPLAIN_TIMEOUT_SECONDS", "10"))
+
+# Metrics
+METRICS_ENABLED=os.getenv("METRICS_ENABLED", "true").lower() == "true"
+LOOP_LAG_INTERVAL_SECONDS=float(os.getenv("LOOP_LAG_INTERVAL_SECONDS", "0.5"))
+
+# Request timing and profiling
+SERVER_TIMING_ENABLED=os.getenv("SERVER_TIMING_ENABLED", "true").lower() == "true"
+PROFILER_ENABLED=os.getenv("PROFILER_ENABLED", "false").lower() == "true"
+PROFILE_SAMPLE_RATE=float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_MS=float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_DIR=os.getenv("PROFILE_DIR", ".profiles")
+
+# Deployment profile: "full", or "query" for replicas that only serve reads
+# and never load the upload stack (pandas, parquet spool replay, hot datasets)
+APP_PROFILE=os.getenv("APP_PROFILE", "full").lower()
+QUERY_ONLY=APP_PROFILE == "query"
+PRELOAD_UPLOAD_STACK=os.getenv("PRELOAD_UPLOAD_STACK", "true").lower() == "true"
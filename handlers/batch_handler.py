@@ -0,0 +1,84 @@
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import BATCH_QUERY_MAX_ITEMS, BATCH_QUERY_CONCURRENCY
+from schemas.schema import BatchQueryItem, BatchQueryItemResult, BatchQueryResponse
+from services import mongo_service, supabase_service
+from utils.admission import AdmissionRejected
+from utils.circuit_breaker import CircuitOpen, breakers
+from utils.deadlines import DeadlineExceeded
+
+logger = logging.getLogger(__name__)
+
+
+class BatchHandler:
+
+    @staticmethod
+    def error_status(error: Exception) -> int:
+        if isinstance(error, (AdmissionRejected, CircuitOpen)):
+            return 503
+        if isinstance(error, DeadlineExceeded):
+            return 504
+        if isinstance(error, ValueError):
+            return 400
+        return 500
+
+    @staticmethod
+    async def handle_batch_query(queries: List[BatchQueryItem]) -> BatchQueryResponse:
+        if not queries:
+            raise ValueError("At least one query is required")
+        if len(queries) > BATCH_QUERY_MAX_ITEMS:
+            raise ValueError(f"A batch may hold at most {BATCH_QUERY_MAX_ITEMS} queries")
+
+        semaphore = asyncio.Semaphore(BATCH_QUERY_CONCURRENCY)
+        # Items over the same dataset share one schema lookup
+        schemas: Dict[Tuple[str, str], asyncio.Task] = {}
+
+        def schema_for(item: BatchQueryItem) -> asyncio.Task:
+            key = (item.backend, item.dataset)
+            if key not in schemas:
+                if item.backend == "mongodb":
+                    lookup = mongo_service.get_collection_fields(item.dataset)
+                else:
+                    lookup = supabase_service.get_table_columns(item.dataset)
+                schemas[key] = asyncio.ensure_future(lookup)
+            return schemas[key]
+
+        async def run_item(index: int, item: BatchQueryItem) -> BatchQueryItemResult:
+            async with semaphore:
+                try:
+                    breakers[item.backend].check()
+                    fields: Optional[List[str]] = await schema_for(item)
+                    if item.backend == "mongodb":
+                        result = await mongo_service.query_collection(item.dataset, item.params, fields)
+                    else:
+                        result = await supabase_service.query_table(item.dataset, item.params, fields)
+                    return BatchQueryItemResult(
+                        index=index,
+                        backend=item.backend,
+                        dataset=item.dataset,
+                        status="ok",
+                        status_code=200,
+                        result=result
+                    )
+                except Exception as e:
+                    logger.error(f"Batch query {index} on {item.backend} '{item.dataset}' failed: {e}")
+                    return BatchQueryItemResult(
+                        index=index,
+                        backend=item.backend,
+                        dataset=item.dataset,
+                        status="error",
+                        status_code=BatchHandler.error_status(e),
+                        error=str(e)
+                    )
+
+        try:
+            results = await asyncio.gather(*(run_item(index, item) for index, item in enumerate(queries)))
+        finally:
+            for task in schemas.values():
+                if not task.done():
+                    task.cancel()
+
+        failed = sum(1 for result in results if result.status != "ok")
+        return BatchQueryResponse(results=results, succeeded=len(results) - failed, failed=failed)
@@ -1,19 +1,35 @@
 import logging
-from typing import Optional, List
+from typing import AsyncIterator, Optional, Union, List
 import json
 
+from config import AGGREGATE_ALLOW_DISK_USE, QUERY_ONLY
+
 from services.mongo_service import (
     QueryParams,
     QueryResult,
     query_collection,
+    query_collection_json,
     list_collections,
     get_collection_fields,
     get_collection_stats,
+    recompute_collection_stats,
     create_index,
     get_collection_indexes,
-    aggregate_collection
+    aggregate_collection,
+    stream_aggregate_collection,
+    get_collection_facets,
+    FacetParams,
+    list_catalog,
+    get_catalog_entry
 )
 
+from utils.admission import AdmissionRejected
+from utils.circuit_breaker import CircuitOpen
+from utils.deadlines import DeadlineExceeded
+from utils.background import spawn_coalesced
+from utils.metrics import query_json_bytes, query_rows_returned
+from utils.serialization import dumps
+
 # Set up logging
 logger = logging.getLogger(__name__)
 
@@ -38,8 +54,11 @@ class MongoHandler:
         search_columns: Optional[str] = None,
         filters: Optional[str] = None,
         sort_by: Optional[str] = None,
-        sort_order: str = "asc"
-    ) -> QueryResult:
+        sort_order: str = "asc",
+        fields: Optional[str] = None,
+        exclude_fields: Optional[str] = None,
+        raw_json: bool = False
+    ) -> Union[QueryResult, bytes]:
 
         try:
 
@@ -47,6 +66,14 @@ class MongoHandler:
             if search_columns:
                 search_columns_list = [col.strip() for col in search_columns.split(',')]
 
+            fields_list = None
+            if fields:
+                fields_list = [field.strip() for field in fields.split(',')]
+
+            exclude_fields_list = None
+            if exclude_fields:
+                exclude_fields_list = [field.strip() for field in exclude_fields.split(',')]
+
             filters_dict = None
             if filters:
                 try:
@@ -61,12 +88,22 @@ class MongoHandler:
                 search_columns=search_columns_list,
                 filters=filters_dict,
                 sort_by=sort_by,
-                sort_order=sort_order
+                sort_order=sort_order,
+                fields=fields_list,
+                exclude_fields=exclude_fields_list
             )
 
+            if raw_json:
+                body = await query_collection_json(collection_name, query_params)
+                query_json_bytes.inc("mongodb", amount=len(body))
+                return body
+
             result = await query_collection(collection_name, query_params)
+            query_rows_returned.inc("mongodb", amount=len(result.data))
             return result
 
+        except (AdmissionRejected, CircuitOpen, DeadlineExceeded):
+            raise
         except ValueError as e:
             logger.error(f" Validation error for collection {collection_name}: {e}")
             raise e
@@ -77,11 +114,20 @@ class MongoHandler:
     @staticmethod
     async def handle_query_collection_post(
             collection_name: str,
-            query_params: QueryParams
-    ) -> QueryResult:
+            query_params: QueryParams,
+            raw_json: bool = False
+    ) -> Union[QueryResult, bytes]:
         try:
+            if raw_json:
+                body = await query_collection_json(collection_name, query_params)
+                query_json_bytes.inc("mongodb", amount=len(body))
+                return body
+
             result = await query_collection(collection_name, query_params)
+            query_rows_returned.inc("mongodb", amount=len(result.data))
             return result
+        except (AdmissionRejected, CircuitOpen, DeadlineExceeded):
+            raise
         except ValueError as e:
             logger.error(f"Validation error for collection {collection_name}: {e}")
             raise e
@@ -89,6 +135,20 @@ class MongoHandler:
             logger.error(f"Error querying collection {collection_name}: {e}")
             raise Exception(f"Failed to query collection: {str(e)}")
 
+    @staticmethod
+    async def handle_get_collection_stats(collection_name: str, recompute: bool = False) -> dict:
+        if recompute and QUERY_ONLY:
+            raise ValueError("Statistics can't be recomputed in the query profile")
+        try:
+            stats = await get_collection_stats(collection_name)
+            if recompute:
+                spawn_coalesced(lambda: recompute_collection_stats(collection_name), key=("mongo_stats", collection_name))
+                stats["recompute_scheduled"] = True
+            return stats
+        except Exception as e:
+            logger.error(f"Error getting stats for collection {collection_name}: {e}")
+            raise Exception(f"Failed to get collection stats: {str(e)}")
+
     @staticmethod
     async def handle_get_collection_indexes(collection_name: str) -> dict:
         try:
@@ -119,16 +179,85 @@ class MongoHandler:
     @staticmethod
     async def handle_aggregate_collection(
         collection_name: str,
-        pipeline: List[dict]
+        pipeline: List[dict],
+        allow_disk_use: bool = AGGREGATE_ALLOW_DISK_USE
     ) -> dict:
         try:
-            result = await aggregate_collection(collection_name, pipeline)
+            result = await aggregate_collection(collection_name, pipeline, allow_disk_use)
             return {
                 "collection_name": collection_name,
                 "pipeline_stages": len(pipeline),
                 "result_count": len(result),
                 "data": result
             }
+        except (AdmissionRejected, CircuitOpen, DeadlineExceeded):
+            raise
+        except ValueError as e:
+            logger.error(f" Aggregation rejected: {e}")
+            raise e
         except Exception as e:
             logger.error(f" Error executing aggregation: {e}")
-            raise Exception(f"Failed to execute aggregation: {str(e)}")
\ No newline at end of file
+            raise Exception(f"Failed to execute aggregation: {str(e)}")
+
+    @staticmethod
+    async def handle_stream_aggregate_collection(
+        collection_name: str,
+        pipeline: List[dict],
+        allow_disk_use: bool = AGGREGATE_ALLOW_DISK_USE,
+        chunk_size: int = 64 * 1024
+    ) -> AsyncIterator[bytes]:
+        # Results go out as NDJSON, buffered into ~64 KiB chunks so a large
+        # result set never has to be held in memory at once
+        buffer = bytearray()
+        try:
+            async for document in stream_aggregate_collection(collection_name, pipeline, allow_disk_use):
+                buffer += dumps(document)
+                buffer += b"\n"
+                if len(buffer) >= chunk_size:
+                    yield bytes(buffer)
+                    buffer.clear()
+            if buffer:
+                yield bytes(buffer)
+        except Exception as e:
+            logger.error(f" Error streaming aggregation: {e}")
+            raise
+
+    @staticmethod
+    async def handle_collection_facets(
+        collection_name: str,
+        params: FacetParams
+    ) -> dict:
+        try:
+            facets = await get_collection_facets(collection_name, params)
+            return {
+                "collection_name": collection_name,
+                "facets": facets
+            }
+        except (AdmissionRejected, CircuitOpen, DeadlineExceeded):
+            raise
+        except ValueError as e:
+            logger.error(f"Validation error computing facets for collection {collection_name}: {e}")
+            raise e
+        except Exception as e:
+            logger.error(f"Error computing facets for collection {collection_name}: {e}")
+            raise Exception(f"Failed to compute facets: {str(e)}")
+
+    @staticmethod
+    async def handle_list_catalog(page: int = 1, limit: int = 50) -> QueryResult:
+        try:
+            return await list_catalog(page, limit)
+        except Exception as e:
+            logger.error(f"Error listing collection catalog: {e}")
+            raise Exception(f"Failed to list catalog: {str(e)}")
+
+    @staticmethod
+    async def handle_get_catalog_entry(collection_name: str) -> dict:
+        try:
+            entry = await get_catalog_entry(collection_name)
+        except Exception as e:
+            logger.error(f"Error reading catalog entry for collection {collection_name}: {e}")
+            raise Exception(f"Failed to read catalog entry: {str(e)}")
+
+        if not entry:
+            raise ValueError(f"Collection '{collection_name}' is not in the catalog")
+        return entry
\ No newline at end of file
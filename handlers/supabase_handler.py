@@ -1,13 +1,29 @@
 import logging
-from typing import Optional
+from typing import Optional, Union
 import json
 
+from config import QUERY_ONLY
 from services.supabase_service import (
     QueryParams,
     QueryResult,
     query_table,
+    query_table_json,
+    aggregate_table,
+    TableAggregateParams,
+    get_table_facets,
+    FacetParams,
+    get_table_stats,
+    recompute_table_stats,
+    list_catalog,
+    get_catalog_entry,
 )
 
+from utils.admission import AdmissionRejected
+from utils.circuit_breaker import CircuitOpen
+from utils.deadlines import DeadlineExceeded
+from utils.background import spawn_coalesced
+from utils.metrics import query_json_bytes, query_rows_returned
+
 logger = logging.getLogger(__name__)
 
 
@@ -22,8 +38,11 @@ class SupabaseHandler:
         search_columns: Optional[str] = None,
         filters: Optional[str] = None,
         sort_by: Optional[str] = None,
-        sort_order: str = "asc"
-    ) -> QueryResult:
+        sort_order: str = "asc",
+        fields: Optional[str] = None,
+        exclude_fields: Optional[str] = None,
+        raw_json: bool = False
+    ) -> Union[QueryResult, bytes]:
 
         try:
 
@@ -31,6 +50,14 @@ class SupabaseHandler:
             if search_columns:
                 search_columns_list = [col.strip() for col in search_columns.split(',')]
 
+            fields_list = None
+            if fields:
+                fields_list = [field.strip() for field in fields.split(',')]
+
+            exclude_fields_list = None
+            if exclude_fields:
+                exclude_fields_list = [field.strip() for field in exclude_fields.split(',')]
+
             filters_dict = None
             if filters:
                 try:
@@ -45,12 +72,22 @@ class SupabaseHandler:
                 search_columns=search_columns_list,
                 filters=filters_dict,
                 sort_by=sort_by,
-                sort_order=sort_order
+                sort_order=sort_order,
+                fields=fields_list,
+                exclude_fields=exclude_fields_list
             )
 
+            if raw_json:
+                body = await query_table_json(table_name, query_params)
+                query_json_bytes.inc("supabase", amount=len(body))
+                return body
+
             result = await query_table(table_name, query_params)
+            query_rows_returned.inc("supabase", amount=len(result.data))
             return result
 
+        except (AdmissionRejected, CircuitOpen, DeadlineExceeded):
+            raise
         except ValueError as e:
             logger.error(f"Validation error for table {table_name}: {e}")
             raise e
@@ -61,15 +98,100 @@ class SupabaseHandler:
     @staticmethod
     async def handle_query_table_post(
         table_name: str,
-        query_params: QueryParams
-    ) -> QueryResult:
+        query_params: QueryParams,
+        raw_json: bool = False
+    ) -> Union[QueryResult, bytes]:
 
         try:
+            if raw_json:
+                body = await query_table_json(table_name, query_params)
+                query_json_bytes.inc("supabase", amount=len(body))
+                return body
+
             result = await query_table(table_name, query_params)
+            query_rows_returned.inc("supabase", amount=len(result.data))
             return result
+        except (AdmissionRejected, CircuitOpen, DeadlineExceeded):
+            raise
         except ValueError as e:
             logger.error(f" Validation error for table {table_name}: {e}")
             raise e
         except Exception as e:
             logger.error(f" Error querying table {table_name}: {e}")
-            raise Exception(f"Failed to query table: {str(e)}")
\ No newline at end of file
+            raise Exception(f"Failed to query table: {str(e)}")
+
+    @staticmethod
+    async def handle_aggregate_table(
+        table_name: str,
+        params: TableAggregateParams
+    ) -> dict:
+        try:
+            groups = await aggregate_table(table_name, params)
+            return {
+                "table_name": table_name,
+                "group_by": params.group_by,
+                "group_count": len(groups),
+                "data": groups
+            }
+        except (AdmissionRejected, CircuitOpen, DeadlineExceeded):
+            raise
+        except ValueError as e:
+            logger.error(f"Validation error aggregating table {table_name}: {e}")
+            raise e
+        except Exception as e:
+            logger.error(f"Error aggregating table {table_name}: {e}")
+            raise Exception(f"Failed to aggregate table: {str(e)}")
+
+    @staticmethod
+    async def handle_table_facets(
+        table_name: str,
+        params: FacetParams
+    ) -> dict:
+        try:
+            facets = await get_table_facets(table_name, params)
+            return {
+                "table_name": table_name,
+                "facets": facets
+            }
+        except (AdmissionRejected, CircuitOpen, DeadlineExceeded):
+            raise
+        except ValueError as e:
+            logger.error(f"Validation error computing facets for table {table_name}: {e}")
+            raise e
+        except Exception as e:
+            logger.error(f"Error computing facets for table {table_name}: {e}")
+            raise Exception(f"Failed to compute facets: {str(e)}")
+
+    @staticmethod
+    async def handle_get_table_stats(table_name: str, recompute: bool = False) -> dict:
+        if recompute and QUERY_ONLY:
+            raise ValueError("Statistics can't be recomputed in the query profile")
+        try:
+            stats = await get_table_stats(table_name)
+            if recompute:
+                spawn_coalesced(lambda: recompute_table_stats(table_name), key=("supabase_stats", table_name))
+                stats["recompute_scheduled"] = True
+            return stats
+        except Exception as e:
+            logger.error(f"Error getting stats for table {table_name}: {e}")
+            raise Exception(f"Failed to get table stats: {str(e)}")
+
+    @staticmethod
+    async def handle_list_catalog(page: int = 1, limit: int = 50) -> QueryResult:
+        try:
+            return await list_catalog(page, limit)
+        except Exception as e:
+            logger.error(f"Error listing table catalog: {e}")
+            raise Exception(f"Failed to list catalog: {str(e)}")
+
+    @staticmethod
+    async def handle_get_catalog_entry(table_name: str) -> dict:
+        try:
+            entry = await get_catalog_entry(table_name)
+        except Exception as e:
+            logger.error(f"Error reading catalog entry for table {table_name}: {e}")
+            raise Exception(f"Failed to read catalog entry: {str(e)}")
+
+        if not entry:
+            raise ValueError(f"Table '{table_name}' is not in the catalog")
+        return entry
\ No newline at end of file
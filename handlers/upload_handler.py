@@ -1,15 +1,46 @@
 import time
+import asyncio
+import hashlib
 import logging
 from typing import Optional, Dict, Any
+from bson import ObjectId
 from fastapi import UploadFile
 
-from utils.file_parser import parse_file
-from services.mongo_service import insert_many_mongo
-from services.supabase_service import create_table_and_insert
+from utils.admission import AdmissionRejected
+from utils.circuit_breaker import CircuitOpen, breakers
+from utils.spool import write_spool
+from utils.metrics import metrics
+from utils.timing import phase
+from services.mongo_service import (
+    insert_many_mongo,
+    record_ingest_stats as record_mongo_stats,
+    record_catalog_entry as record_mongo_catalog
+)
+from services.supabase_service import (
+    create_table_and_insert,
+    record_ingest_stats as record_supabase_stats,
+    record_catalog_entry as record_supabase_catalog
+)
 
 
 logger = logging.getLogger(__name__)
 
+upload_bytes_parsed = metrics.counter("upload_bytes_parsed_total", "Bytes of uploaded files parsed")
+upload_rows_parsed = metrics.counter("upload_rows_parsed_total", "Rows parsed from uploaded files")
+upload_parse_duration = metrics.histogram("upload_parse_duration_seconds", "Time to parse an uploaded file")
+upload_rows_inserted = metrics.counter("upload_rows_inserted_total", "Uploaded rows written per backend", ("backend",))
+upload_insert_duration = metrics.histogram(
+    "upload_insert_duration_seconds", "Time to write an uploaded dataset per backend", ("backend",)
+)
+upload_rows_spooled = metrics.counter("upload_rows_spooled_total", "Uploaded rows spooled for replay per backend", ("backend",))
+
+
+def preload_parsing_stack() -> None:
+    # pandas is imported on first use, so query-only workers never load it;
+    # full workers call this in the background after startup instead
+    import utils.column_stats
+    import utils.file_parser
+
 
 class UploadHandler:
 
@@ -46,6 +77,110 @@ class UploadHandler:
 
         return table_name, collection_name
 
+    @staticmethod
+    async def store_metadata(record, description: str) -> None:
+        # Statistics and catalog entries are best-effort: a failure here must
+        # not fail an upload whose data already committed
+        try:
+            with phase("metadata"):
+                await record
+        except Exception as e:
+            logger.warning(f"Storing {description} failed: {e}")
+
+    @staticmethod
+    def elapsed_ms(started: float) -> float:
+        return round((time.perf_counter() - started) * 1000, 2)
+
+    @staticmethod
+    async def write_mongo(
+        df,
+        catalog_entry: Dict[str, Any],
+        column_stats: Optional[Dict[str, Any]],
+        timings: Dict[str, float],
+        batch_id: Optional[str] = None
+    ) -> None:
+        started = time.perf_counter()
+        with phase("insert-mongodb"):
+            await insert_many_mongo(df.to_dict(orient="records"), batch_id)
+        upload_insert_duration.observe(time.perf_counter() - started, "mongodb")
+        upload_rows_inserted.inc("mongodb", amount=len(df))
+
+        load_timings = {**timings, "insert": UploadHandler.elapsed_ms(started)}
+        await UploadHandler.store_metadata(
+            record_mongo_catalog({**catalog_entry, "load_timings_ms": load_timings}),
+            "MongoDB catalog entry"
+        )
+        if column_stats:
+            await UploadHandler.store_metadata(record_mongo_stats(column_stats), "MongoDB column statistics")
+
+    @staticmethod
+    async def write_supabase(
+        table_name: str,
+        df,
+        catalog_entry: Dict[str, Any],
+        column_stats: Optional[Dict[str, Any]],
+        timings: Dict[str, float]
+    ) -> None:
+        started = time.perf_counter()
+        # create_table_and_insert renames columns in place; the shallow copy
+        # keeps the original names for a MongoDB write or a spool entry
+        with phase("insert-supabase"):
+            await create_table_and_insert(table_name, df.copy(deep=False))
+        upload_insert_duration.observe(time.perf_counter() - started, "supabase")
+        upload_rows_inserted.inc("supabase", amount=len(df))
+
+        load_timings = {**timings, "insert": UploadHandler.elapsed_ms(started)}
+        await UploadHandler.store_metadata(
+            record_supabase_catalog(table_name, {**catalog_entry, "load_timings_ms": load_timings}),
+            "Supabase catalog entry"
+        )
+        if column_stats:
+            await UploadHandler.store_metadata(
+                record_supabase_stats(table_name, column_stats), "Supabase column statistics"
+            )
+
+    @staticmethod
+    async def spool_failed_writes(
+        failed: Dict[str, Exception],
+        df,
+        table_name: str,
+        collection_name: str,
+        catalog_entry: Dict[str, Any],
+        column_stats: Optional[Dict[str, Any]],
+        timings: Dict[str, float],
+        batch_id: Optional[str] = None
+    ) -> Dict[str, str]:
+        spooled = {}
+        if not write_spool.enabled:
+            return spooled
+
+        metadata = {"catalog_entry": catalog_entry, "column_stats": column_stats, "timings": timings, "batch_id": batch_id}
+        for backend, error in failed.items():
+            if isinstance(error, ValueError):
+                # Rejected data would fail the same way on every replay
+                continue
+            dataset = collection_name if backend == "mongodb" else table_name
+            try:
+                with phase("spool"):
+                    spooled[backend] = await write_spool.put(backend, dataset, df, metadata)
+                upload_rows_spooled.inc(backend, amount=len(df))
+            except Exception as e:
+                logger.error(f"Spooling {backend} write for '{dataset}' failed: {e}")
+        return spooled
+
+    @staticmethod
+    async def replay_spooled_write(manifest: Dict[str, Any], df) -> None:
+        metadata = manifest["metadata"]
+        catalog_entry = {**metadata["catalog_entry"], "replayed_from_spool": manifest["id"]}
+        if manifest["backend"] == "mongodb":
+            await UploadHandler.write_mongo(
+                df, catalog_entry, metadata["column_stats"], metadata["timings"], metadata.get("batch_id")
+            )
+        else:
+            await UploadHandler.write_supabase(
+                manifest["dataset"], df, catalog_entry, metadata["column_stats"], metadata["timings"]
+            )
+
     @staticmethod
     async def handle_file_upload(
         file: UploadFile,
@@ -54,13 +189,24 @@ class UploadHandler:
         mongo_only: bool = False,
         supabase_only: bool = False
     ) -> Dict[str, Any]:
+        from utils.column_stats import compute_dataframe_stats
+        from utils.file_parser import parse_content
 
         try:
             UploadHandler.validate_file(file)
             UploadHandler.validate_upload_options(mongo_only, supabase_only)
 
             logger.info(f"Parsing file: {file.filename}")
-            df = await parse_file(file)
+            timings = {}
+            started = time.perf_counter()
+            with phase("read"):
+                content = await file.read()
+            with phase("parse"):
+                df = parse_content(file.filename, content)
+            timings["parse"] = UploadHandler.elapsed_ms(started)
+            upload_parse_duration.observe(timings["parse"] / 1000)
+            upload_bytes_parsed.inc(amount=len(content))
+            upload_rows_parsed.inc(amount=len(df))
 
             if df.empty:
                 raise ValueError("Uploaded file is empty")
@@ -71,6 +217,25 @@ class UploadHandler:
                 file.filename, table_name, collection_name
             )
 
+            # Full-column stats are computed once while the frame is in memory
+            # and persisted next to each dataset that commits
+            column_stats = None
+            started = time.perf_counter()
+            try:
+                with phase("stats"):
+                    column_stats = await asyncio.to_thread(compute_dataframe_stats, df)
+            except Exception as e:
+                logger.warning(f"Column statistics failed: {e}")
+            timings["stats"] = UploadHandler.elapsed_ms(started)
+
+            catalog_entry = {
+                "source_filename": file.filename,
+                "content_hash": hashlib.sha256(content).hexdigest(),
+                "byte_size": len(content),
+                "row_count": len(df),
+                "schema": [{"name": str(col), "type": str(dtype)} for col, dtype in df.dtypes.items()]
+            }
+
             results = {
                 "message": "Data processed successfully",
                 "rows": len(df),
@@ -80,26 +245,54 @@ class UploadHandler:
                 "mongo_success": False,
                 "supabase_success": False
             }
+            rejections = []
+
+            failed = {}
+            # Ties the rows of this upload together, so a replay of the
+            # MongoDB write can tell which of them already landed
+            batch_id = str(ObjectId())
 
             if not supabase_only:
                 try:
+                    # A backend known to be down is skipped without waiting on it
+                    breakers["mongodb"].check()
                     logger.info("Inserting data to MongoDB...")
-                    await insert_many_mongo(df.to_dict(orient="records"))
+                    await UploadHandler.write_mongo(df, catalog_entry, column_stats, timings, batch_id)
                     results["mongo_success"] = True
                     logger.info("MongoDB insertion successful")
                 except Exception as e:
                     logger.error(f" MongoDB insertion failed: {e}")
                     results["mongo_error"] = str(e)
+                    failed["mongodb"] = e
+                    if isinstance(e, (AdmissionRejected, CircuitOpen)):
+                        rejections.append(e)
 
             if not mongo_only:
                 try:
+                    breakers["supabase"].check()
                     logger.info(" Inserting data to Supabase...")
-                    await create_table_and_insert(table_name, df)
+                    await UploadHandler.write_supabase(table_name, df, catalog_entry, column_stats, timings)
                     results["supabase_success"] = True
                     logger.info(" Supabase insertion successful")
                 except Exception as e:
                     logger.error(f" Supabase insertion failed: {e}")
                     results["supabase_error"] = str(e)
+                    failed["supabase"] = e
+                    if isinstance(e, (AdmissionRejected, CircuitOpen)):
+                        rejections.append(e)
+
+            if failed and (results["mongo_success"] or results["supabase_success"]):
+                # One backend committed, so the upload is acknowledged and the
+                # other catches up from the spool
+                spooled = await UploadHandler.spool_failed_writes(
+                    failed, df, table_name, collection_name, catalog_entry, column_stats, timings, batch_id
+                )
+                for backend, spool_id in spooled.items():
+                    results[f"{'mongo' if backend == 'mongodb' else backend}_spooled"] = spool_id
+                if len(spooled) == len(failed):
+                    results["status"] = "accepted"
+                    results["message"] = "Data committed to one backend; the rest is queued for replay"
+                    return results
 
             success_conditions = [
                 (mongo_only and results["mongo_success"]),
@@ -113,13 +306,23 @@ class UploadHandler:
                 results["status"] = "partial_success"
             else:
                 results["status"] = "failure"
+                targeted = 1 if (mongo_only or supabase_only) else 2
+                if len(rejections) == targeted:
+                    # Every target shed the load, so the client should retry
+                    raise max(rejections, key=lambda rejection: rejection.retry_after)
                 raise Exception("Failed to insert data to specified databases")
 
             return results
 
+        except (AdmissionRejected, CircuitOpen):
+            raise
         except ValueError as e:
             logger.error(f" Validation error: {e}")
             raise e
         except Exception as e:
             logger.error(f" Unexpected error: {e}")
-            raise Exception(f"Internal server error: {str(e)}")
\ No newline at end of file
+            raise Exception(f"Internal server error: {str(e)}")
+
+
+write_spool.register("mongodb", UploadHandler.replay_spooled_write)
+write_spool.register("supabase", UploadHandler.replay_spooled_write)
@@ -1,39 +1,222 @@
-import uvicorn
 import time
+
+# Startup is timed from here, before the heavy imports below
+STARTUP_BEGAN = time.perf_counter()
+
+import uvicorn
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 from dotenv import load_dotenv
-from fastapi import FastAPI
+from typing import Dict, Optional
+from fastapi import FastAPI, Query
+from fastapi.responses import PlainTextResponse
+
+from config import (
+    COMPRESSION_ENABLED,
+    CANCEL_ON_DISCONNECT,
+    METRICS_ENABLED,
+    SERVER_TIMING_ENABLED,
+    PROFILER_ENABLED,
+    WARMUP_ENABLED,
+    WARMUP_TIMEOUT_SECONDS,
+    APP_PROFILE,
+    QUERY_ONLY,
+    PRELOAD_UPLOAD_STACK,
+    HOT_DATASETS
+)
+from utils.compression import CompressionMiddleware
+from utils.database_connections import close_supabase_pool, get_supabase_pool, mongo_pool_stats, supabase_pool_stats
+from utils.disconnect import DisconnectCancellationMiddleware
+from utils.admission import admission_stats
+from utils.background import cancel_all, spawn
+from utils.circuit_breaker import circuit_stats
+from utils.health import health_monitor
+from utils.hot_datasets import hot_datasets
+from utils.metrics import MetricsMiddleware, metrics, start_loop_lag_monitor
+from utils.profiler import ProfilingMiddleware
+from utils.single_flight import query_flights
+from utils.slow_queries import slow_queries
+from utils.spool import write_spool
+from utils.timing import ServerTimingMiddleware
 
-from routes.upload_route import router as upload_route
 from routes.supabase_route import router as supabase_route
 from routes.mongo_route import router as mongodb_route
+from routes.batch_route import router as batch_route
 
-from services.supabase_service import test_connection
-from services.mongo_service import list_collections
+from services.supabase_service import (
+    statement_stats,
+    warm_catalog_cache as warm_supabase_catalog,
+    facet_cache as supabase_facet_cache,
+    catalog_cache as supabase_catalog_cache
+)
+from services.mongo_service import (
+    ping as ping_mongo,
+    warm_catalog_cache as warm_mongo_catalog,
+    aggregate_cache as mongo_aggregate_cache,
+    catalog_cache as mongo_catalog_cache
+)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 load_dotenv()
 
+CIRCUIT_STATES = {"closed": 0, "half_open": 1, "open": 2, "disabled": 0}
+CACHES = {
+    "mongodb_aggregate": mongo_aggregate_cache,
+    "mongodb_catalog": mongo_catalog_cache,
+    "supabase_facet": supabase_facet_cache,
+    "supabase_catalog": supabase_catalog_cache,
+}
+
+
+def cache_totals(stat: str) -> Dict[tuple, float]:
+    return {(name,): cache.stats()[stat] for name, cache in CACHES.items()}
+
+
+pool_connections = metrics.gauge("db_pool_connections", "Connections per backend pool by state", ("backend", "state"))
+metrics.counter_function(
+    "db_pool_checkout_failures_total",
+    "Failed connection checkouts",
+    ("backend",),
+    lambda: {("mongodb",): mongo_pool_stats.stats()["checkout_failures"]}
+)
+cache_entries = metrics.gauge("cache_entries", "Entries held per cache", ("cache",))
+metrics.counter_function("cache_hits_total", "Cache hits", ("cache",), lambda: cache_totals("hits"))
+metrics.counter_function("cache_misses_total", "Cache misses", ("cache",), lambda: cache_totals("misses"))
+# asyncpg exposes no statement cache counters; these come from a process-wide
+# mirror of its LRU and overstate the per-connection hit rate
+metrics.counter_function(
+    "supabase_statement_cache_estimated_hits_total",
+    "Estimated asyncpg statement cache hits (an upper bound)",
+    (),
+    lambda: {(): statement_stats.hits}
+)
+metrics.counter_function(
+    "supabase_statement_executions_total",
+    "Generated SQL statements executed against Supabase",
+    (),
+    lambda: {(): statement_stats.executions}
+)
+admission_active = metrics.gauge("admission_active", "Admitted backend operations running", ("backend", "kind"))
+admission_queued = metrics.gauge("admission_queued", "Backend operations waiting for a slot", ("backend", "kind"))
+metrics.counter_function(
+    "admission_rejected_total",
+    "Backend operations shed by admission control",
+    ("backend", "kind"),
+    lambda: {tuple(key.split(".")): stats["rejected"] for key, stats in admission_stats().items()}
+)
+circuit_state = metrics.gauge("circuit_state", "Circuit breaker state (0 closed, 1 half-open, 2 open)", ("backend",))
+metrics.counter_function(
+    "queries_coalesced_total", "Queries served by an identical in-flight query", (), lambda: {(): query_flights.coalesced}
+)
+hot_dataset_bytes = metrics.gauge("hot_dataset_bytes", "Memory held by in-memory hot datasets")
+spool_pending_rows = metrics.gauge("spool_pending_rows", "Upload rows waiting in the write spool")
+metrics.counter_function(
+    "slow_queries_recorded_total", "Queries recorded by the slow-query log", (), lambda: {(): slow_queries.recorded}
+)
+startup_duration = metrics.gauge(
+    "startup_duration_seconds", "Seconds from the start of main until imported and until ready", ("phase",)
+)
+
+
+def collect_runtime_metrics() -> None:
+    supabase_pool = supabase_pool_stats()
+    pool_connections.set(supabase_pool["size"] - supabase_pool["idle"], "supabase", "in_use")
+    pool_connections.set(supabase_pool["idle"], "supabase", "idle")
+    mongo_pool = mongo_pool_stats.stats()
+    pool_connections.set(mongo_pool["checked_out"], "mongodb", "in_use")
+    pool_connections.set(mongo_pool["open"] - mongo_pool["checked_out"], "mongodb", "idle")
+    pool_connections.set(mongo_pool["waiting"], "mongodb", "waiting")
+
+    for name, cache in CACHES.items():
+        cache_entries.set(cache.stats()["entries"], name)
+
+    for key, stats in admission_stats().items():
+        backend, kind = key.split(".")
+        admission_active.set(stats["active"], backend, kind)
+        admission_queued.set(stats["queued"], backend, kind)
+    for backend, stats in circuit_stats().items():
+        circuit_state.set(CIRCUIT_STATES[stats["state"]], backend)
+
+    hot_dataset_bytes.set(hot_datasets.stats()["used_bytes"])
+    spool_pending_rows.set(write_spool.stats()["pending_rows"])
+
+
+metrics.register_collector(collect_runtime_metrics)
+
+
+async def warm_up_step(description: str, step) -> None:
+    started = time.perf_counter()
+    try:
+        result = await asyncio.wait_for(step, timeout=WARMUP_TIMEOUT_SECONDS)
+        detail = f" ({result} entries)" if isinstance(result, int) else ""
+        logger.info(f"Warmed {description}{detail} in {(time.perf_counter() - started) * 1000:.0f} ms")
+    except Exception as e:
+        logger.warning(f"Warm-up of {description} failed: {e}")
+
+
+async def warm_up() -> None:
+    # Connections and catalog entries are loaded before traffic arrives, so
+    # the first requests don't pay for TLS handshakes and schema lookups
+    await asyncio.gather(
+        warm_up_step("Supabase connection pool", get_supabase_pool()),
+        warm_up_step("MongoDB connection", ping_mongo()),
+    )
+    await asyncio.gather(
+        warm_up_step("Supabase catalog cache", warm_supabase_catalog()),
+        warm_up_step("MongoDB catalog cache", warm_mongo_catalog()),
+    )
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("Starting up Dataset Upload API...")
 
-    supabase_ok = await test_connection()
-    if not supabase_ok:
-        logger.warning("⚠Supabase connection failed during startup")
+    if WARMUP_ENABLED:
+        await warm_up()
 
-    try:
-        collections = await list_collections()
-        logger.info(f"MongoDB connected successfully. Found {len(collections)} collections.")
-    except Exception as e:
-        logger.warning(f"MongoDB connection failed during startup: {e}")
+    await health_monitor.check_all()
+    for backend, status in health_monitor.snapshot().items():
+        if status["connected"]:
+            logger.info(f"{backend} connected ({status['latency_ms']} ms)")
+        else:
+            logger.warning(f"⚠{backend} connection failed during startup: {status['error']}")
+    health_monitor.start()
+    if METRICS_ENABLED:
+        start_loop_lag_monitor()
+
+    if QUERY_ONLY:
+        if HOT_DATASETS:
+            logger.warning("HOT_DATASETS is ignored in the query profile, which doesn't load pandas")
+    else:
+        # Writes spooled before a restart are picked up again here
+        write_spool.start()
+        if PRELOAD_UPLOAD_STACK:
+            from handlers.upload_handler import preload_parsing_stack
+
+            # In the background, so readiness doesn't wait for pandas
+            spawn(
+                warm_up_step("upload parsing stack", asyncio.to_thread(preload_parsing_stack)),
+                key="preload_upload_stack"
+            )
+
+    ready = time.perf_counter() - STARTUP_BEGAN
+    startup_duration.set(IMPORTS_FINISHED - STARTUP_BEGAN, "import")
+    startup_duration.set(ready, "ready")
+    logger.info(
+        f"Ready in {ready * 1000:.0f} ms ({(IMPORTS_FINISHED - STARTUP_BEGAN) * 1000:.0f} ms importing), "
+        f"profile '{APP_PROFILE}'"
+    )
 
     yield
 
     logger.info(" Shutting down Dataset Upload API...")
+    # Background loops and probes go first, so none of them is left holding
+    # a pool connection while the pool closes
+    await cancel_all()
+    await close_supabase_pool()
 
 
 app = FastAPI(
@@ -43,9 +226,33 @@ app = FastAPI(
     lifespan=lifespan
 )
 
-app.include_router(upload_route, prefix="/api/upload", tags=["Upload"])
+if CANCEL_ON_DISCONNECT:
+    # Uploads are left to finish so a dropped client never leaves a half-written dataset
+    app.add_middleware(DisconnectCancellationMiddleware, skip_prefixes=("/api/upload",))
+
+if COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware)
+
+if SERVER_TIMING_ENABLED:
+    # Outside the disconnect middleware, so the handler task it starts
+    # shares this request's timing context
+    app.add_middleware(ServerTimingMiddleware)
+
+if METRICS_ENABLED:
+    # Outside compression and disconnect handling, so the timing includes
+    # both and cancelled requests are counted
+    app.add_middleware(MetricsMiddleware)
+
+if PROFILER_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+
+if not QUERY_ONLY:
+    from routes.upload_route import router as upload_route
+
+    app.include_router(upload_route, prefix="/api/upload", tags=["Upload"])
 app.include_router(supabase_route, prefix="/api/supabase", tags=["Supabase"])
 app.include_router(mongodb_route, prefix="/api/mongodb", tags=["MongoDB"])
+app.include_router(batch_route, prefix="/api/batch", tags=["Batch"])
 
 
 @app.get("/")
@@ -55,21 +262,60 @@ async def root():
 
 @app.get("/Database_health")
 async def health_check():
-    supabase_status = await test_connection()
-    mongo_status = False
-    try:
-        await list_collections()
-        mongo_status = True
-    except Exception as e:
-        logger.error(f"MongoDB health check failed: {e}")
+    # Served from the background monitor, so load balancer polling never
+    # opens connections of its own
+    checks = health_monitor.snapshot()
+    supabase_status = health_monitor.is_connected("supabase")
+    mongo_status = health_monitor.is_connected("mongodb")
 
     return {
         "status": "healthy" if (supabase_status and mongo_status) else "degraded",
         "supabase": "connected" if supabase_status else "disconnected",
         "mongodb": "connected" if mongo_status else "disconnected",
+        "checks": checks,
+        "circuits": circuit_stats(),
         "timestamp": time.time()
     }
 
+
+@app.get("/query_stats")
+async def query_stats():
+    return {
+        "coalescing": query_flights.stats(),
+        "hot_datasets": hot_datasets.stats(),
+        "admission": admission_stats(),
+        "circuits": circuit_stats(),
+        "spool": write_spool.stats(),
+        "statement_cache": statement_stats.stats(),
+        "slow_queries": slow_queries.stats(),
+        "timestamp": time.time()
+    }
+
+
+@app.get("/slow_queries")
+async def list_slow_queries(
+    limit: Optional[int] = Query(50, ge=1, description="Most recent entries to return"),
+    backend: Optional[str] = Query(None, description="Only entries for 'mongodb' or 'supabase'")
+):
+    return {
+        **slow_queries.stats(),
+        "entries": slow_queries.list(limit, backend),
+        "timestamp": time.time()
+    }
+
+
+@app.delete("/slow_queries")
+async def clear_slow_queries():
+    return {"cleared": slow_queries.clear()}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+IMPORTS_FINISHED = time.perf_counter()
+
 if __name__ == "__main__":
     uvicorn.run(
         "main:app",
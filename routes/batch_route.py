@@ -0,0 +1,40 @@
+from fastapi import APIRouter, HTTPException, Body, Depends
+
+from config import QUERY_TIMEOUT_MS
+from handlers.batch_handler import BatchHandler
+from schemas.schema import BatchQueryRequest, BatchQueryResponse
+from utils.deadlines import request_deadline
+
+router = APIRouter()
+
+
+@router.post(
+    "/query",
+    response_model=BatchQueryResponse,
+    dependencies=[Depends(request_deadline(QUERY_TIMEOUT_MS))]
+)
+async def batch_query_endpoint(
+        request: BatchQueryRequest = Body(
+            ...,
+            example={
+                "queries": [
+                    {"backend": "supabase", "dataset": "sales", "params": {"page": 1, "limit": 10}},
+                    {"backend": "mongodb", "dataset": "dataset",
+                     "params": {"filters": {"status": "active"}, "fields": ["name", "status"]}}
+                ]
+            }
+        )
+):
+    """
+    Run several paginated queries in one request.
+
+    Items run concurrently up to BATCH_QUERY_CONCURRENCY at a time and
+    queries against the same dataset share one schema lookup. Each item
+    reports its own status, so one failing query does not fail the batch.
+    """
+    try:
+        return await BatchHandler.handle_batch_query(request.queries)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
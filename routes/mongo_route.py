@@ -1,8 +1,14 @@
-from typing import Optional, List
-from fastapi import APIRouter, Query, HTTPException, Body
+from typing import AsyncIterator, Optional, List
+from fastapi import APIRouter, Query, HTTPException, Body, Header, Depends
+from fastapi.responses import StreamingResponse
 
+from config import QUERY_RAW_JSON, QUERY_TIMEOUT_MS, AGGREGATE_ALLOW_DISK_USE, AGGREGATE_MAX_TIME_MS
 from handlers.mongo_handler import MongoHandler
-from services.mongo_service import QueryParams, QueryResult
+from services.mongo_service import QueryParams, QueryResult, FacetParams
+from utils.admission import AdmissionRejected
+from utils.circuit_breaker import CircuitOpen
+from utils.deadlines import DeadlineExceeded, request_deadline
+from utils.responses import negotiate_format, query_response
 
 router = APIRouter()
 
@@ -15,7 +21,11 @@ async def get_collections():
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/collections/{collection_name}/query", response_model=QueryResult)
+@router.get(
+    "/collections/{collection_name}/query",
+    response_model=QueryResult,
+    dependencies=[Depends(request_deadline(QUERY_TIMEOUT_MS))]
+)
 async def query_collection_endpoint(
         collection_name: str,
 
@@ -30,9 +40,15 @@ async def query_collection_endpoint(
 
         sort_by: Optional[str] = Query(None, description="Field name to sort by"),
         sort_order: str = Query("asc", pattern="^(asc|desc)$", description="Sort order: asc or desc"),
+
+        fields: Optional[str] = Query(None, description="Comma-separated list of fields to return"),
+        exclude_fields: Optional[str] = Query(None, description="Comma-separated list of fields to leave out"),
+
+        accept: Optional[str] = Header(None),
 ):
     try:
-        return await MongoHandler.handle_query_collection(
+        response_format = negotiate_format(accept)
+        result = await MongoHandler.handle_query_collection(
             collection_name=collection_name,
             page=page,
             limit=limit,
@@ -40,15 +56,25 @@ async def query_collection_endpoint(
             search_columns=search_columns,
             filters=filters,
             sort_by=sort_by,
-            sort_order=sort_order
+            sort_order=sort_order,
+            fields=fields,
+            exclude_fields=exclude_fields,
+            raw_json=QUERY_RAW_JSON and response_format == "json"
         )
+        return query_response(result, response_format)
+    except (AdmissionRejected, CircuitOpen, DeadlineExceeded) as e:
+        raise e.to_http()
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.post("/collections/{collection_name}/query-json", response_model=QueryResult)
+@router.post(
+    "/collections/{collection_name}/query-json",
+    response_model=QueryResult,
+    dependencies=[Depends(request_deadline(QUERY_TIMEOUT_MS))]
+)
 async def query_collection_json_endpoint(
         collection_name: str,
         query_params: QueryParams = Body(
@@ -65,9 +91,11 @@ async def query_collection_json_endpoint(
                     "name": {"contains": "john"}
                 },
                 "sort_by": "created_at",
-                "sort_order": "desc"
+                "sort_order": "desc",
+                "fields": ["field1", "field2", "name"]
             }
-        )
+        ),
+        accept: Optional[str] = Header(None)
 ):
     """
     Query a MongoDB collection using JSON payload with advanced filtering capabilities.
@@ -84,6 +112,18 @@ async def query_collection_json_endpoint(
     - `startswith`: String starts with
     - `endswith`: String ends with
 
+    **Fields Selection:**
+    - `fields`: Only return these fields
+    - `exclude_fields`: Return every field except these
+
+    **Response Formats** (via the `Accept` header):
+    - `application/json` (default)
+    - `application/vnd.apache.arrow.stream`: Arrow IPC stream, one column per field
+    - `application/msgpack`: MessagePack map of column name to values
+
+    Binary formats carry pagination in `X-Total-Count`, `X-Page`, `X-Limit`,
+    `X-Total-Pages`, `X-Has-Next` and `X-Has-Previous` headers.
+
     Collection_Name: uploads
 
     **Example Filters:**
@@ -105,7 +145,15 @@ async def query_collection_json_endpoint(
     ```
     """
     try:
-        return await MongoHandler.handle_query_collection_post(collection_name, query_params)
+        response_format = negotiate_format(accept)
+        result = await MongoHandler.handle_query_collection_post(
+            collection_name,
+            query_params,
+            raw_json=QUERY_RAW_JSON and response_format == "json"
+        )
+        return query_response(result, response_format)
+    except (AdmissionRejected, CircuitOpen, DeadlineExceeded) as e:
+        raise e.to_http()
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
@@ -114,6 +162,24 @@ async def query_collection_json_endpoint(
 
 # MONGODB ADVANCED ENDPOINTS
 
+@router.get("/collections/{collection_name}/stats")
+async def get_collection_stats_endpoint(
+        collection_name: str,
+        recompute: bool = Query(False, description="Rebuild full-column statistics in the background")
+):
+    """
+    Column statistics recorded at upload time (null counts, min/max, mean,
+    distinct estimates, top values, histograms). Collections without recorded
+    statistics fall back to a 100-document sample.
+    """
+    try:
+        return await MongoHandler.handle_get_collection_stats(collection_name, recompute)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/collections/{collection_name}/indexes")
 async def get_collection_indexes_endpoint(collection_name: str):
     try:
@@ -134,10 +200,22 @@ async def create_index_endpoint(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.post("/collections/{collection_name}/aggregate")
+async def prepend_chunk(first_chunk: bytes, chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    if first_chunk:
+        yield first_chunk
+    async for chunk in chunks:
+        yield chunk
+
+
+@router.post(
+    "/collections/{collection_name}/aggregate",
+    dependencies=[Depends(request_deadline(AGGREGATE_MAX_TIME_MS))]
+)
 async def aggregate_collection_endpoint(
         collection_name: str,
-        pipeline: List[dict]
+        pipeline: List[dict],
+        stream: bool = Query(False, description="Stream results as NDJSON instead of one buffered response"),
+        allow_disk_use: bool = Query(AGGREGATE_ALLOW_DISK_USE, description="Let blocking stages spill to disk")
 ):
     """
         Execute aggregation pipeline on a collection.
@@ -165,8 +243,87 @@ async def aggregate_collection_endpoint(
             { "$sort": { "total_books": -1 } }
         ]
         ```
+
+        Buffered responses are capped at `AGGREGATE_MAX_RESULTS` documents and cached
+        briefly; pass `stream=true` to receive an `application/x-ndjson` stream with no cap.
         """
+    if stream:
+        chunks = MongoHandler.handle_stream_aggregate_collection(collection_name, pipeline, allow_disk_use)
+        # Pull the first chunk before committing to a 200, so an overloaded
+        # backend or a bad pipeline still gets a proper status code
+        try:
+            first_chunk = await anext(chunks, b"")
+        except (AdmissionRejected, CircuitOpen, DeadlineExceeded) as e:
+            raise e.to_http()
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        return StreamingResponse(
+            prepend_chunk(first_chunk, chunks),
+            media_type="application/x-ndjson"
+        )
+
+    try:
+        return await MongoHandler.handle_aggregate_collection(collection_name, pipeline, allow_disk_use)
+    except (AdmissionRejected, CircuitOpen, DeadlineExceeded) as e:
+        raise e.to_http()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post(
+    "/collections/{collection_name}/facets",
+    dependencies=[Depends(request_deadline(AGGREGATE_MAX_TIME_MS))]
+)
+async def collection_facets_endpoint(
+        collection_name: str,
+        params: FacetParams = Body(
+            ...,
+            example={
+                "fields": ["genre", "language"],
+                "top_n": 10,
+                "filters": {"published_year": {"gte": 2010}}
+            }
+        )
+):
+    """
+    Top values and their counts for several fields in one round trip, under the
+    same `search`/`filters` semantics as `query-json`. Results are cached per
+    filter and refreshed when new data is uploaded.
+
+    Collection_Name: uploads
+    """
     try:
-        return await MongoHandler.handle_aggregate_collection(collection_name, pipeline)
+        return await MongoHandler.handle_collection_facets(collection_name, params)
+    except (AdmissionRejected, CircuitOpen, DeadlineExceeded) as e:
+        raise e.to_http()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/catalog", response_model=QueryResult)
+async def list_catalog_endpoint(
+        page: int = Query(1, ge=1, description="Page number (starts from 1)"),
+        limit: int = Query(50, ge=1, le=1000, description="Number of datasets per page (max 1000)")
+):
+    """
+    Uploaded collections with row counts, sizes, source file, content hash and load
+    timings, served from the dataset catalog rather than the database catalog.
+    """
+    try:
+        return await MongoHandler.handle_list_catalog(page, limit)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/catalog/{collection_name}")
+async def get_catalog_entry_endpoint(collection_name: str):
+    try:
+        return await MongoHandler.handle_get_catalog_entry(collection_name)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
@@ -1,13 +1,22 @@
 from typing import Optional
-from fastapi import APIRouter, Query, HTTPException, Body
+from fastapi import APIRouter, Query, HTTPException, Body, Header, Depends
 
+from config import QUERY_RAW_JSON, QUERY_TIMEOUT_MS, AGGREGATE_MAX_TIME_MS
 from handlers.supabase_handler import SupabaseHandler
-from services.supabase_service import QueryParams, QueryResult
+from services.supabase_service import QueryParams, QueryResult, TableAggregateParams, FacetParams
+from utils.admission import AdmissionRejected
+from utils.circuit_breaker import CircuitOpen
+from utils.deadlines import DeadlineExceeded, request_deadline
+from utils.responses import negotiate_format, query_response
 
 router = APIRouter()
 
 
-@router.get("/tables/{table_name}/query", response_model=QueryResult)
+@router.get(
+    "/tables/{table_name}/query",
+    response_model=QueryResult,
+    dependencies=[Depends(request_deadline(QUERY_TIMEOUT_MS))]
+)
 async def query_table_endpoint(
         table_name: str,
 
@@ -22,9 +31,15 @@ async def query_table_endpoint(
 
         sort_by: Optional[str] = Query(None, description="Column name to sort by"),
         sort_order: str = Query("asc", pattern="^(asc|desc)$", description="Sort order: asc or desc"),
+
+        fields: Optional[str] = Query(None, description="Comma-separated list of columns to return"),
+        exclude_fields: Optional[str] = Query(None, description="Comma-separated list of columns to leave out"),
+
+        accept: Optional[str] = Header(None),
 ):
     try:
-        return await SupabaseHandler.handle_query_table(
+        response_format = negotiate_format(accept)
+        result = await SupabaseHandler.handle_query_table(
             table_name=table_name,
             page=page,
             limit=limit,
@@ -32,15 +47,25 @@ async def query_table_endpoint(
             search_columns=search_columns,
             filters=filters,
             sort_by=sort_by,
-            sort_order=sort_order
+            sort_order=sort_order,
+            fields=fields,
+            exclude_fields=exclude_fields,
+            raw_json=QUERY_RAW_JSON and response_format == "json"
         )
+        return query_response(result, response_format)
+    except (AdmissionRejected, CircuitOpen, DeadlineExceeded) as e:
+        raise e.to_http()
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.post("/tables/{table_name}/query-json", response_model=QueryResult)
+@router.post(
+    "/tables/{table_name}/query-json",
+    response_model=QueryResult,
+    dependencies=[Depends(request_deadline(QUERY_TIMEOUT_MS))]
+)
 async def query_table_json_endpoint(
         table_name: str,
         query_params: QueryParams = Body(
@@ -57,9 +82,11 @@ async def query_table_json_endpoint(
                     "name": {"contains": "john"}
                 },
                 "sort_by": "created_at",
-                "sort_order": "desc"
+                "sort_order": "desc",
+                "fields": ["column1", "column2", "name"]
             }
-        )
+        ),
+        accept: Optional[str] = Header(None)
 ):
     """
     **Filter Operations Supported:**
@@ -74,6 +101,18 @@ async def query_table_json_endpoint(
     - `startswith`: String starts with
     - `endswith`: String ends with
 
+    **Columns Selection:**
+    - `fields`: Only return these columns
+    - `exclude_fields`: Return every column except these
+
+    **Response Formats** (via the `Accept` header):
+    - `application/json` (default)
+    - `application/vnd.apache.arrow.stream`: Arrow IPC stream, one column per field
+    - `application/msgpack`: MessagePack map of column name to values
+
+    Binary formats carry pagination in `X-Total-Count`, `X-Page`, `X-Limit`,
+    `X-Total-Pages`, `X-Has-Next` and `X-Has-Previous` headers.
+
     Table_Name: books
 
     **Input:**
@@ -95,7 +134,135 @@ async def query_table_json_endpoint(
     ```
     """
     try:
-        return await SupabaseHandler.handle_query_table_post(table_name, query_params)
+        response_format = negotiate_format(accept)
+        result = await SupabaseHandler.handle_query_table_post(
+            table_name,
+            query_params,
+            raw_json=QUERY_RAW_JSON and response_format == "json"
+        )
+        return query_response(result, response_format)
+    except (AdmissionRejected, CircuitOpen, DeadlineExceeded) as e:
+        raise e.to_http()
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post(
+    "/tables/{table_name}/aggregate",
+    dependencies=[Depends(request_deadline(AGGREGATE_MAX_TIME_MS))]
+)
+async def aggregate_table_endpoint(
+        table_name: str,
+        params: TableAggregateParams = Body(
+            ...,
+            example={
+                "group_by": ["genre"],
+                "metrics": [
+                    {"function": "count"},
+                    {"function": "avg", "column": "rating", "alias": "avg_rating"},
+                    {"function": "approx_distinct", "column": "author"}
+                ],
+                "filters": {"published_year": {"gte": 2010}},
+                "sort_by": "count",
+                "sort_order": "desc",
+                "limit": 100
+            }
+        )
+):
+    """
+    Group rows and compute metrics in Postgres, returning one row per group.
+
+    **Metric Functions:**
+    - `count`: Row count, or non-null count when a column is given
+    - `sum`, `avg`, `min`, `max`: Over the given column
+    - `approx_distinct`: Distinct values in the given column
+
+    `search`, `search_columns` and `filters` behave as in `query-json`.
+    `sort_by` may name a group column or a metric alias.
+
+    Table_Name: books
+    """
+    try:
+        return await SupabaseHandler.handle_aggregate_table(table_name, params)
+    except (AdmissionRejected, CircuitOpen, DeadlineExceeded) as e:
+        raise e.to_http()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post(
+    "/tables/{table_name}/facets",
+    dependencies=[Depends(request_deadline(AGGREGATE_MAX_TIME_MS))]
+)
+async def table_facets_endpoint(
+        table_name: str,
+        params: FacetParams = Body(
+            ...,
+            example={
+                "fields": ["genre", "language"],
+                "top_n": 10,
+                "filters": {"published_year": {"gte": 2010}}
+            }
+        )
+):
+    """
+    Top values and their counts for several columns in one round trip, under the
+    same `search`/`filters` semantics as `query-json`. Results are cached per
+    filter and refreshed when new data is uploaded.
+
+    Table_Name: books
+    """
+    try:
+        return await SupabaseHandler.handle_table_facets(table_name, params)
+    except (AdmissionRejected, CircuitOpen, DeadlineExceeded) as e:
+        raise e.to_http()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/tables/{table_name}/stats")
+async def get_table_stats_endpoint(
+        table_name: str,
+        recompute: bool = Query(False, description="Rebuild full-column statistics in the background")
+):
+    """
+    Column statistics recorded at upload time (null counts, min/max, mean,
+    distinct estimates, top values, histograms). Tables without recorded
+    statistics fall back to a 100-row sample.
+    """
+    try:
+        return await SupabaseHandler.handle_get_table_stats(table_name, recompute)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/catalog", response_model=QueryResult)
+async def list_catalog_endpoint(
+        page: int = Query(1, ge=1, description="Page number (starts from 1)"),
+        limit: int = Query(50, ge=1, le=1000, description="Number of datasets per page (max 1000)")
+):
+    """
+    Uploaded tables with row counts, sizes, source file, content hash and load
+    timings, served from the dataset catalog rather than the database catalog.
+    """
+    try:
+        return await SupabaseHandler.handle_list_catalog(page, limit)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/catalog/{table_name}")
+async def get_catalog_entry_endpoint(table_name: str):
+    try:
+        return await SupabaseHandler.handle_get_catalog_entry(table_name)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
@@ -2,6 +2,8 @@ from fastapi import APIRouter, UploadFile, File, Query, HTTPException
 from fastapi.responses import JSONResponse
 
 from handlers.upload_handler import UploadHandler
+from utils.admission import AdmissionRejected
+from utils.circuit_breaker import CircuitOpen
 
 router = APIRouter()
 
@@ -25,6 +27,11 @@ async def upload_file(
 
         if results["status"] == "success":
             return results
+        elif results["status"] == "accepted":
+            return JSONResponse(
+                status_code=202,
+                content=results
+            )
         elif results["status"] == "partial_success":
             return JSONResponse(
                 status_code=207,
@@ -36,6 +43,8 @@ async def upload_file(
                 detail="Failed to insert data to specified databases"
             )
 
+    except (AdmissionRejected, CircuitOpen) as e:
+        raise e.to_http()
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
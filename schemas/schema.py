@@ -1,4 +1,4 @@
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Literal, Optional, Set
 from pydantic import BaseModel
 
 class QueryResult(BaseModel):
@@ -20,4 +20,69 @@ class QueryParams(BaseModel):
     filters: Optional[Dict[str, Any]] = None
 
     sort_by: Optional[str] = None
-    sort_order: str = "asc"
\ No newline at end of file
+    sort_order: str = "asc"
+
+    fields: Optional[List[str]] = None
+    exclude_fields: Optional[List[str]] = None
+
+
+def referenced_fields(params: BaseModel) -> Set[str]:
+    """Dataset fields a query names in its filters, search, sort or selection."""
+    names = set(getattr(params, "filters", None) or {})
+    for attribute in ("search_columns", "fields", "exclude_fields"):
+        names.update(getattr(params, attribute, None) or [])
+    if getattr(params, "sort_by", None):
+        names.add(params.sort_by)
+    return names
+
+
+class AggregateMetric(BaseModel):
+    function: str
+    column: Optional[str] = None
+    alias: Optional[str] = None
+
+class TableAggregateParams(BaseModel):
+    group_by: List[str] = []
+    metrics: List[AggregateMetric] = []
+
+    search: Optional[str] = None
+    search_columns: Optional[List[str]] = None
+
+    filters: Optional[Dict[str, Any]] = None
+
+    sort_by: Optional[str] = None
+    sort_order: str = "asc"
+
+    limit: int = 1000
+
+class FacetParams(BaseModel):
+    fields: List[str]
+    top_n: int = 10
+
+    search: Optional[str] = None
+    search_columns: Optional[List[str]] = None
+
+    filters: Optional[Dict[str, Any]] = None
+
+
+class BatchQueryItem(BaseModel):
+    backend: Literal["mongodb", "supabase"]
+    dataset: str
+    params: QueryParams = QueryParams()
+
+class BatchQueryRequest(BaseModel):
+    queries: List[BatchQueryItem]
+
+class BatchQueryItemResult(BaseModel):
+    index: int
+    backend: str
+    dataset: str
+    status: str
+    status_code: int
+    result: Optional[QueryResult] = None
+    error: Optional[str] = None
+
+class BatchQueryResponse(BaseModel):
+    results: List[BatchQueryItemResult]
+    succeeded: int
+    failed: int
@@ -1,19 +1,168 @@
-from typing import Dict, List, Any
+from typing import AsyncIterator, Dict, Iterable, List, Any, Optional, Set, Tuple
+import asyncio
+import datetime
+import hashlib
 import logging
 import re
 from bson import ObjectId
 from pymongo import ASCENDING, DESCENDING
-
-from config import MONGO_COLLECTION
-from schemas.schema import QueryResult, QueryParams
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+
+from config import (
+    MONGO_COLLECTION,
+    QUERY_COMBINED_COUNT,
+    QUERY_COMBINED_COUNT_MAX_LIMIT,
+    QUERY_TIMEOUT_MS,
+    AGGREGATE_MAX_RESULTS,
+    AGGREGATE_MAX_TIME_MS,
+    AGGREGATE_ALLOW_DISK_USE,
+    AGGREGATE_CACHE_TTL,
+    AGGREGATE_CACHE_SIZE,
+    AGGREGATE_STREAM_BATCH_SIZE,
+    FACET_MAX_FIELDS,
+    FACET_MAX_VALUES,
+    STATS_RECOMPUTE_MAX_ROWS,
+    CATALOG_CACHE_TTL,
+    CATALOG_CACHE_SIZE
+)
+from schemas.schema import QueryResult, QueryParams, FacetParams, referenced_fields
+from utils.admission import admit, run_admitted, cancel_hooks
+from utils.background import rerun_if_running, spawn
+from utils.circuit_breaker import breakers
+from utils.health import health_monitor
+from utils.cache import TTLCache
 from utils.database_connections import mongo_db as db
+from utils.deadlines import remaining_ms, operation_id_var
+from utils.hot_datasets import hot_datasets
+from utils.serialization import canonical_dumps, dumps, pagination_meta, query_result_json
+from utils.single_flight import query_flights
+from utils.slow_queries import slow_queries, describe_query
+from utils.timing import phase
 
 logger = logging.getLogger(__name__)
 
-async def insert_many_mongo(data: list[dict]):
+WRITE_STAGES = ("$out", "$merge")
+LOOKUP_STAGES = ("$lookup", "$graphLookup", "$unionWith")
+# BSONObjectTooLarge, and the $facet output limit of newer servers
+FACET_TOO_LARGE_CODES = (10334, 4031700)
+STATS_COLLECTION = "_dataset_stats"
+CATALOG_COLLECTION = "_dataset_catalog"
+METADATA_COLLECTIONS = (STATS_COLLECTION, CATALOG_COLLECTION)
+
+aggregate_cache = TTLCache(AGGREGATE_CACHE_TTL, AGGREGATE_CACHE_SIZE)
+catalog_cache = TTLCache(CATALOG_CACHE_TTL, CATALOG_CACHE_SIZE)
+
+
+def operation_options(default_ms: int) -> Dict[str, Any]:
+    # maxTimeMS follows the request deadline; the comment lets a cancelled
+    # request find its operations in $currentOp
+    options = {"maxTimeMS": remaining_ms(default_ms)}
+    operation_id = operation_id_var.get()
+    if operation_id:
+        options["comment"] = operation_id
+    return options
+
+
+async def kill_operations(operation_id: str) -> None:
+    admin = db.client.admin
+    try:
+        cursor = admin.aggregate([
+            {"$currentOp": {"allUsers": True}},
+            {"$match": {"$or": [
+                {"command.comment": operation_id},
+                {"cursor.originatingCommand.comment": operation_id}
+            ]}}
+        ])
+        async for operation in cursor:
+            await admin.command("killOp", op=operation["opid"])
+            logger.info(f"Killed MongoDB operation {operation['opid']} of cancelled request {operation_id}")
+    except Exception as e:
+        logger.warning(f"Could not kill MongoDB operations of cancelled request {operation_id}: {e}")
+
+
+def kill_cancelled_operations() -> None:
+    operation_id = operation_id_var.get()
+    if operation_id:
+        spawn(kill_operations(operation_id), key=("kill", operation_id))
+
+
+cancel_hooks["mongodb"] = kill_cancelled_operations
+
+
+async def ping() -> None:
+    await db.command("ping")
+
+
+breakers["mongodb"].probe = ping
+health_monitor.register("mongodb", ping)
+
+
+async def explain_query(collection_name: str, query: Dict[str, Any]) -> Dict[str, Any]:
+    # queryPlanner only chooses the plan; executionStats would run the slow
+    # query a second time
+    breakers["mongodb"].check()
+    if "pipeline" in query:
+        command = {
+            "aggregate": collection_name,
+            "pipeline": query["pipeline"],
+            "allowDiskUse": query.get("allow_disk_use", False),
+            "cursor": {}
+        }
+    else:
+        command = {
+            "find": collection_name,
+            "filter": query["filter"],
+            "sort": query["sort"],
+            "projection": query["projection"],
+            "skip": query["skip"],
+            "limit": query["limit"]
+        }
+    return await db.command("explain", command, verbosity="queryPlanner")
+
+
+slow_queries.register_explainer("mongodb", explain_query)
+
+
+def invalidate_collection_cache(collection_name: str) -> None:
+    # Cache keys lead with every collection the cached result was read from
+    aggregate_cache.invalidate(lambda key: collection_name in key[0])
+    hot_datasets.invalidate(("mongodb", collection_name))
+
+
+def batch_document_ids(batch_id: str, count: int) -> List[ObjectId]:
+    """Deterministic _ids for the rows of one upload batch.
+
+    The batch's ObjectId timestamp keeps the ids in upload order, a hash of
+    the batch id separates batches and the low three bytes number the rows,
+    so writing the same batch twice produces the same ids.
+    """
+    if count >= 1 << 24:
+        raise ValueError("An upload batch is limited to 16,777,215 rows")
+    batch = ObjectId(batch_id)
+    prefix = batch.binary[:4] + hashlib.blake2b(batch.binary, digest_size=5).digest()
+    return [ObjectId(prefix + index.to_bytes(3, "big")) for index in range(count)]
+
+
+async def insert_many_mongo(data: list[dict], batch_id: Optional[str] = None):
     if data:
         collection = db[MONGO_COLLECTION]
-        await collection.insert_many(data)
+        if batch_id is None:
+            async with admit("mongodb", "upload"):
+                await collection.insert_many(data)
+        else:
+            # A retried batch (e.g. a spool replay after a partial insert)
+            # skips the rows that already landed instead of duplicating them
+            for document, document_id in zip(data, batch_document_ids(batch_id, len(data))):
+                document["_id"] = document_id
+            try:
+                async with admit("mongodb", "upload"):
+                    await collection.insert_many(data, ordered=False)
+            except BulkWriteError as e:
+                errors = e.details.get("writeErrors", [])
+                if not errors or any(error.get("code") != 11000 for error in errors):
+                    raise
+                logger.info(f"Skipped {len(errors)} rows of batch {batch_id} that were already written")
+        invalidate_collection_cache(MONGO_COLLECTION)
 
 async def get_collection(collection_name: str):
     return db[collection_name]
@@ -22,13 +171,115 @@ async def get_collection(collection_name: str):
 async def list_collections() -> List[str]:
     try:
         collections = await db.list_collection_names()
-        return [col for col in collections if not col.startswith('system.')]
+        return [col for col in collections if not col.startswith('system.') and col not in METADATA_COLLECTIONS]
     except Exception as e:
         logger.error(f"Error listing collections: {e}")
         return []
 
 
-async def get_collection_fields(collection_name: str) -> List[str]:
+async def get_catalog_entry(collection_name: str) -> Optional[Dict[str, Any]]:
+    cached = catalog_cache.get(("entry", collection_name))
+    if cached is not None:
+        return cached or None
+
+    entry = await db[CATALOG_COLLECTION].find_one({"_id": collection_name})
+    if entry is not None:
+        entry["name"] = entry.pop("_id")
+
+    # Misses are cached too (as {}), so uncatalogued collections don't pay an
+    # extra lookup on every query
+    catalog_cache.set(("entry", collection_name), entry or {})
+    return entry
+
+
+async def list_catalog(page: int = 1, limit: int = 50) -> QueryResult:
+    cache_key = ("list", page, limit)
+    cached = catalog_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    catalog = db[CATALOG_COLLECTION]
+    total_count = await catalog.count_documents({})
+    cursor = catalog.find({}, {"schema": 0}).sort("_id", ASCENDING).skip((page - 1) * limit).limit(limit)
+    entries = await cursor.to_list(length=limit)
+    for entry in entries:
+        entry["name"] = entry.pop("_id")
+
+    result = QueryResult(data=entries, **pagination_meta(total_count, page, limit))
+    catalog_cache.set(cache_key, result)
+    return result
+
+
+async def warm_catalog_cache() -> int:
+    # The most recently loaded collections are the likeliest to be queried;
+    # half the cache is left for everything else
+    cursor = db[CATALOG_COLLECTION].find({}).sort("updated_at", DESCENDING).limit(CATALOG_CACHE_SIZE // 2)
+    entries = await cursor.to_list(length=None)
+    for entry in entries:
+        entry["name"] = entry.pop("_id")
+        catalog_cache.set(("entry", entry["name"]), entry)
+    return len(entries)
+
+
+async def record_catalog_entry(entry: Dict[str, Any], collection_name: str = MONGO_COLLECTION) -> None:
+    catalog = db[CATALOG_COLLECTION]
+    existing = await catalog.find_one({"_id": collection_name}, {"schema": 1})
+
+    if existing is None:
+        # First catalogued load: fold in fields from documents that were
+        # already in the collection before the catalog existed
+        known_fields = await sample_collection_fields(collection_name)
+        schema = [{"name": field, "type": None} for field in known_fields]
+    else:
+        schema = existing.get("schema", [])
+
+    known = {column["name"] for column in schema}
+    schema = schema + [column for column in entry["schema"] if column["name"] not in known]
+    schema = [column for column in schema if not column["name"].startswith('_')]
+
+    now = datetime.datetime.now(datetime.timezone.utc)
+    update = {
+        "$set": {
+            "schema": schema,
+            "source_filename": entry["source_filename"],
+            "content_hash": entry["content_hash"],
+            "load_timings_ms": entry["load_timings_ms"],
+            "updated_at": now
+        },
+        "$inc": {
+            "row_count": entry["row_count"],
+            "byte_size": entry["byte_size"],
+            "upload_count": 1
+        },
+        "$setOnInsert": {"backend": "mongodb", "created_at": now}
+    }
+    if existing is None:
+        # The collection may already hold documents from before the catalog,
+        # and this upload's rows are in by now
+        update["$set"]["row_count"] = await db[collection_name].estimated_document_count()
+        del update["$inc"]["row_count"]
+    await catalog.update_one({"_id": collection_name}, update, upsert=True)
+    catalog_cache.clear()
+
+
+async def get_collection_fields(collection_name: str, required: Iterable[str] = ()) -> List[str]:
+    try:
+        entry = await get_catalog_entry(collection_name)
+        if entry and not all(name in (column["name"] for column in entry["schema"]) for name in required):
+            # Another worker may have catalogued new fields since this one
+            # cached the entry; read it again rather than drop the filter
+            catalog_cache.invalidate(lambda key: key == ("entry", collection_name))
+            entry = await get_catalog_entry(collection_name)
+    except Exception as e:
+        logger.warning(f"Catalog lookup failed for '{collection_name}': {e}")
+        entry = None
+
+    if entry:
+        return [column["name"] for column in entry["schema"]]
+    return await sample_collection_fields(collection_name)
+
+
+async def sample_collection_fields(collection_name: str) -> List[str]:
     try:
         collection = db[collection_name]
         pipeline = [
@@ -113,6 +364,37 @@ def build_mongo_filter(params: QueryParams, fields: List[str]) -> Dict[str, Any]
     return mongo_filter
 
 
+def resolve_selected_fields(params: QueryParams, fields: List[str]) -> Optional[List[str]]:
+    if not params.fields and not params.exclude_fields:
+        return None
+
+    requested = list(params.fields or []) + list(params.exclude_fields or [])
+    unknown = [field for field in requested if field not in fields]
+    if unknown:
+        raise ValueError(f"Unknown fields requested: {unknown}")
+
+    selected = params.fields if params.fields else fields
+    excluded = set(params.exclude_fields or [])
+    selected = [field for field in selected if field not in excluded]
+    if not selected:
+        raise ValueError("Field selection excludes every field")
+    return selected
+
+
+def build_mongo_projection(params: QueryParams, fields: List[str]) -> Dict[str, Any]:
+    projection: Dict[str, Any] = {"_id": 0}
+
+    selected = resolve_selected_fields(params, fields)
+    if selected is None:
+        return projection
+
+    if params.fields:
+        projection.update({field: 1 for field in selected})
+    else:
+        projection.update({field: 0 for field in params.exclude_fields})
+    return projection
+
+
 def build_mongo_sort(params: QueryParams, fields: List[str]) -> List[tuple]:
     if not params.sort_by or params.sort_by not in fields:
         return [("_id", ASCENDING)]
@@ -121,11 +403,150 @@ def build_mongo_sort(params: QueryParams, fields: List[str]) -> List[tuple]:
     return [(params.sort_by, direction)]
 
 
-async def query_collection(collection_name: str, params: QueryParams) -> QueryResult:
+async def sort_uses_index(collection_name: str, sort_params: List[tuple]) -> bool:
+    field = sort_params[0][0]
+    if field == "_id":
+        return True
+
+    cache_key = ("index_fields", collection_name)
+    leading_fields = catalog_cache.get(cache_key)
+    if leading_fields is None:
+        indexes = await db[collection_name].list_indexes().to_list(length=None)
+        leading_fields = [next(iter(index["key"])) for index in indexes]
+        catalog_cache.set(cache_key, leading_fields)
+    return field in leading_fields
+
+
+async def use_combined_count(collection_name: str, sort_params: List[tuple], limit: int) -> bool:
+    # $sort inside $facet can't use an index, and the whole page comes back
+    # in one document, so the combined form only pays off for small pages
+    # that need an in-memory sort anyway
+    if not QUERY_COMBINED_COUNT or limit > QUERY_COMBINED_COUNT_MAX_LIMIT:
+        return False
     try:
-        collection = db[collection_name]
+        return not await sort_uses_index(collection_name, sort_params)
+    except Exception as e:
+        logger.warning(f"Index lookup failed for '{collection_name}': {e}")
+        return False
 
-        fields = await get_collection_fields(collection_name)
+
+async def fetch_page_with_count(
+    collection,
+    mongo_filter: Dict[str, Any],
+    sort_params: List[tuple],
+    skip: int,
+    limit: int,
+    projection: Dict[str, Any]
+) -> Tuple[int, List[Dict[str, Any]]]:
+    # One aggregate returns both the total and the requested page, so the
+    # filter is evaluated once and only a single round trip is paid.
+    pipeline = [
+        {"$match": mongo_filter},
+        {"$facet": {
+            "total": [{"$count": "count"}],
+            "data": [
+                {"$sort": dict(sort_params)},
+                {"$skip": skip},
+                {"$limit": limit},
+                {"$project": projection}
+            ]
+        }}
+    ]
+    describe_query(pipeline=pipeline)
+
+    with phase("fetch"):
+        result = await collection.aggregate(pipeline, **operation_options(QUERY_TIMEOUT_MS)).to_list(length=1)
+    if not result:
+        return 0, []
+
+    total = result[0].get("total") or []
+    total_count = total[0]["count"] if total else 0
+    return total_count, result[0].get("data", [])
+
+
+async def load_collection_frame(collection_name: str, max_rows: int):
+    import pandas as pd
+    from utils.frame_query import ABSENT_KEYS_COLUMN, build_frame
+
+    collection = db[collection_name]
+    if await collection.estimated_document_count() > max_rows:
+        return None
+
+    # Loaded in _id order, which is the default sort of the database path
+    cursor = collection.find({}, {"_id": 0}).sort("_id", ASCENDING)
+    documents = await cursor.to_list(length=max_rows + 1)
+    if len(documents) > max_rows:
+        return None
+
+    columns = {}
+    for doc in documents:
+        for key, value in doc.items():
+            if isinstance(value, ObjectId):
+                doc[key] = str(value)
+            columns.setdefault(key, None)
+    frame = build_frame(list(columns), [tuple(doc.get(key) for key in columns) for doc in documents])
+    if any(len(doc) < len(columns) for doc in documents):
+        # Keys a document doesn't have are left out of its result, as MongoDB
+        # does, rather than returned as null
+        frame[ABSENT_KEYS_COLUMN] = pd.Series(
+            [frozenset(key for key in columns if key not in doc) or None for doc in documents], dtype=object
+        )
+    return frame
+
+
+async def query_hot_collection(
+    collection_name: str,
+    params: QueryParams,
+    fields: List[str]
+) -> Optional[Tuple[int, List[Dict[str, Any]]]]:
+    frame = await hot_datasets.get(
+        ("mongodb", collection_name),
+        lambda max_rows: load_collection_frame(collection_name, max_rows)
+    )
+    if frame is None:
+        return None
+
+    from utils.frame_query import run_frame_query, UnsupportedFrameQuery
+
+    try:
+        return await asyncio.to_thread(
+            run_frame_query,
+            frame,
+            params,
+            fields,
+            resolve_selected_fields(params, fields),
+            text_cast=False,
+            nulls_first=True
+        )
+    except UnsupportedFrameQuery as e:
+        logger.info(f"Hot query on '{collection_name}' falls back to MongoDB: {e}")
+        return None
+
+
+async def fetch_collection_page(
+    collection_name: str,
+    params: QueryParams,
+    fields: Optional[List[str]] = None
+) -> Tuple[int, List[Dict[str, Any]]]:
+    # Identical concurrent queries share one lookup, count and page fetch.
+    # Callers only read the returned documents, so sharing them is safe.
+    return await query_flights.run(
+        ("mongodb", collection_name, canonical_dumps(params.model_dump())),
+        lambda: run_admitted("mongodb", "query", lambda: execute_collection_page(collection_name, params, fields))
+    )
+
+
+async def execute_collection_page(
+    collection_name: str,
+    params: QueryParams,
+    fields: Optional[List[str]] = None
+) -> Tuple[int, List[Dict[str, Any]]]:
+    collection = db[collection_name]
+
+    with phase("schema"):
+        referenced = referenced_fields(params)
+        if fields is None or not referenced.issubset(fields):
+            fields = await get_collection_fields(collection_name, referenced)
         if not fields:
             sample_doc = await collection.find_one()
             if sample_doc:
@@ -134,47 +555,147 @@ async def query_collection(collection_name: str, params: QueryParams) -> QueryRe
                 raise ValueError(f"Collection '{collection_name}' is empty or not found")
 
 
-        mongo_filter = build_mongo_filter(params, fields)
-
-        sort_params = build_mongo_sort(params, fields)
+    mongo_filter = build_mongo_filter(params, fields)
+
+    sort_params = build_mongo_sort(params, fields)
+
+    projection = build_mongo_projection(params, fields)
+
+    if hot_datasets.enabled_for(collection_name):
+        with phase("hot"):
+            hot_page = await query_hot_collection(collection_name, params, fields)
+        if hot_page is not None:
+            return hot_page
+
+    skip = (params.page - 1) * params.limit
+
+    if await use_combined_count(collection_name, sort_params, params.limit):
+        try:
+            return await fetch_page_with_count(
+                collection, mongo_filter, sort_params, skip, params.limit, projection
+            )
+        except OperationFailure as e:
+            if e.code not in FACET_TOO_LARGE_CODES:
+                raise
+            logger.info(f"Combined count for '{collection_name}' exceeded the document size limit, querying separately")
+
+    describe_query(
+        filter=mongo_filter, sort=dict(sort_params), projection=projection, skip=skip, limit=params.limit
+    )
+    options = operation_options(QUERY_TIMEOUT_MS)
+    with phase("count"):
+        total_count = await collection.count_documents(mongo_filter, **options)
+    with phase("fetch"):
+        cursor = collection.find(
+            mongo_filter, projection, max_time_ms=remaining_ms(QUERY_TIMEOUT_MS), comment=options.get("comment")
+        ).sort(sort_params).skip(skip).limit(params.limit)
+        documents = await cursor.to_list(length=params.limit)
+    return total_count, documents
 
-        total_count = await collection.count_documents(mongo_filter)
 
-        skip = (params.page - 1) * params.limit
-        total_pages = (total_count + params.limit - 1) // params.limit
+async def query_collection(
+    collection_name: str,
+    params: QueryParams,
+    fields: Optional[List[str]] = None
+) -> QueryResult:
+    try:
+        async with slow_queries.trace("mongodb", "query", collection_name):
+            total_count, documents = await fetch_collection_page(collection_name, params, fields)
+
+            with phase("serialize"):
+                data = []
+                for doc in documents:
+                    clean_doc = {}
+                    for key, value in doc.items():
+                        if isinstance(value, ObjectId):
+                            clean_doc[key] = str(value)
+                        else:
+                            clean_doc[key] = value
+                    data.append(clean_doc)
+
+                return QueryResult(data=data, **pagination_meta(total_count, params.page, params.limit))
 
-        cursor = collection.find(mongo_filter).sort(sort_params).skip(skip).limit(params.limit)
-        documents = await cursor.to_list(length=params.limit)
+    except Exception as e:
+        logger.error(f"Error querying collection '{collection_name}': {e}")
+        raise
 
-        data = []
-        for doc in documents:
-            if '_id' in doc and isinstance(doc['_id'], ObjectId):
-                doc.pop('_id')
 
-            clean_doc = {}
-            for key, value in doc.items():
-                if isinstance(value, ObjectId):
-                    clean_doc[key] = str(value)
-                else:
-                    clean_doc[key] = value
-            data.append(clean_doc)
-
-        return QueryResult(
-            data=data,
-            total_count=total_count,
-            page=params.page,
-            limit=params.limit,
-            total_pages=total_pages,
-            has_next=params.page < total_pages,
-            has_previous=params.page > 1
-        )
+async def query_collection_json(collection_name: str, params: QueryParams) -> bytes:
+    # Fast path: driver-decoded documents go straight to JSON bytes, with no
+    # cleanup copy and no per-row QueryResult validation.
+    try:
+        async with slow_queries.trace("mongodb", "query_json", collection_name):
+            total_count, documents = await fetch_collection_page(collection_name, params)
+            with phase("serialize"):
+                return query_result_json(dumps(documents), total_count, params.page, params.limit)
 
     except Exception as e:
         logger.error(f"Error querying collection '{collection_name}': {e}")
         raise
 
 
+async def record_ingest_stats(stats: Dict[str, Any], collection_name: str = MONGO_COLLECTION) -> None:
+    try:
+        await db[STATS_COLLECTION].insert_one({"_id": collection_name, **stats})
+    except DuplicateKeyError:
+        # The upload appended to an existing collection. Rebuilding the stats
+        # means reading the whole collection, so they keep the exact row
+        # count and are marked stale until a recompute is requested
+        await db[STATS_COLLECTION].update_one(
+            {"_id": collection_name}, {"$set": {"stale": True}, "$inc": {"row_count": stats["row_count"]}}
+        )
+        # A recompute already reading the collection may miss this batch
+        rerun_if_running(("mongo_stats", collection_name))
+
+
+async def recompute_collection_stats(collection_name: str) -> Dict[str, Any]:
+    # pandas is only needed here, so query-only paths never import it
+    import pandas as pd
+    from utils.column_stats import compute_dataframe_stats
+
+    collection = db[collection_name]
+    documents = await collection.find({}, {"_id": 0}).limit(STATS_RECOMPUTE_MAX_ROWS).to_list(length=None)
+
+    stats = await asyncio.to_thread(compute_dataframe_stats, pd.DataFrame(documents), "recompute")
+    if len(documents) >= STATS_RECOMPUTE_MAX_ROWS:
+        stats["row_count"] = await collection.estimated_document_count()
+        stats["sampled"] = True
+
+    await db[STATS_COLLECTION].replace_one({"_id": collection_name}, stats, upsert=True)
+    logger.info(f"Recomputed column statistics for collection '{collection_name}'")
+    return stats
+
+
 async def get_collection_stats(collection_name: str) -> Dict[str, Any]:
+    try:
+        stored = await db[STATS_COLLECTION].find_one({"_id": collection_name})
+        if stored is None:
+            return await sample_collection_stats(collection_name)
+
+        stats_result = await db.command("collStats", collection_name)
+        fields = [column["name"] for column in stored["columns"]]
+
+        return {
+            "collection_name": collection_name,
+            "total_documents": stored["row_count"],
+            "total_fields": len(fields),
+            "fields": fields,
+            "field_stats": {column["name"]: column for column in stored["columns"]},
+            "stats_source": stored.get("source"),
+            "stats_computed_at": stored.get("computed_at"),
+            "stats_sampled": stored.get("sampled", False),
+            "stats_stale": stored.get("stale", False),
+            "size_bytes": stats_result.get("size", 0),
+            "storage_size_bytes": stats_result.get("storageSize", 0),
+            "avg_doc_size": stats_result.get("avgObjSize", 0)
+        }
+
+    except Exception as e:
+        logger.error(f"Error getting collection stats for '{collection_name}': {e}")
+        raise
+
+
+async def sample_collection_stats(collection_name: str) -> Dict[str, Any]:
 
     try:
         collection = db[collection_name]
@@ -210,6 +731,7 @@ async def get_collection_stats(collection_name: str) -> Dict[str, Any]:
             "total_fields": len(fields),
             "fields": fields,
             "field_stats": field_stats,
+            "stats_source": "sample",
             "size_bytes": stats_result.get("size", 0),
             "storage_size_bytes": stats_result.get("storageSize", 0),
             "avg_doc_size": stats_result.get("avgObjSize", 0)
@@ -227,6 +749,7 @@ async def create_index(collection_name: str, field: str, index_type: str = "asce
         direction = ASCENDING if index_type.lower() == "ascending" else DESCENDING
 
         await collection.create_index([(field, direction)])
+        catalog_cache.invalidate(lambda key: key == ("index_fields", collection_name))
         logger.info(f"Created {index_type} index on field '{field}' in collection '{collection_name}'")
         return True
 
@@ -256,25 +779,173 @@ async def get_collection_indexes(collection_name: str) -> List[Dict[str, Any]]:
         return []
 
 
-async def aggregate_collection(collection_name: str, pipeline: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    try:
-        collection = db[collection_name]
+def has_write_stage(pipeline: List[Dict[str, Any]]) -> bool:
+    return bool(pipeline) and any(stage in pipeline[-1] for stage in WRITE_STAGES)
 
-        cursor = collection.aggregate(pipeline)
-        results = await cursor.to_list(length=None)
 
-        clean_results = []
-        for result in results:
-            clean_result = {}
-            for key, value in result.items():
-                if isinstance(value, ObjectId):
-                    clean_result[key] = str(value)
+def referenced_collections(value: Any) -> Set[str]:
+    """Collections a pipeline reads through $lookup, $graphLookup and
+    $unionWith, including those in sub-pipelines and $facet branches."""
+    found = set()
+    if isinstance(value, list):
+        for item in value:
+            found |= referenced_collections(item)
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            if key in LOOKUP_STAGES:
+                if isinstance(item, dict):
+                    item_source = item.get("from", item.get("coll"))
                 else:
-                    clean_result[key] = value
-            clean_results.append(clean_result)
+                    item_source = item
+                if isinstance(item_source, str):
+                    found.add(item_source)
+            found |= referenced_collections(item)
+    return found
+
+
+def normalize_pipeline(pipeline: List[Dict[str, Any]]) -> bytes:
+    # Compact serialization keeps stage and key order, which is significant
+    # for $sort and $project, so only whitespace and encoding differences
+    # collapse to the same cache key.
+    return dumps(pipeline)
+
+
+async def aggregate_collection(
+    collection_name: str,
+    pipeline: List[Dict[str, Any]],
+    allow_disk_use: bool = AGGREGATE_ALLOW_DISK_USE
+) -> List[Dict[str, Any]]:
+    try:
+        cacheable = not has_write_stage(pipeline)
+        sources = frozenset({collection_name} | referenced_collections(pipeline))
+        cache_key = (sources, normalize_pipeline(pipeline), allow_disk_use)
+        if cacheable:
+            cached = aggregate_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        collection = db[collection_name]
+
+        bounded_pipeline = pipeline
+        if cacheable:
+            # One extra document tells us the guard was exceeded without
+            # pulling the rest of the result set into memory
+            bounded_pipeline = pipeline + [{"$limit": AGGREGATE_MAX_RESULTS + 1}]
+
+        async with slow_queries.trace("mongodb", "aggregate", collection_name):
+            describe_query(pipeline=bounded_pipeline, allow_disk_use=allow_disk_use)
+            async with admit("mongodb", "aggregate"):
+                with phase("fetch"):
+                    cursor = collection.aggregate(
+                        bounded_pipeline,
+                        allowDiskUse=allow_disk_use,
+                        **operation_options(AGGREGATE_MAX_TIME_MS)
+                    )
+                    results = await cursor.to_list(length=AGGREGATE_MAX_RESULTS + 1)
+
+            if len(results) > AGGREGATE_MAX_RESULTS:
+                raise ValueError(
+                    f"Aggregation returned more than {AGGREGATE_MAX_RESULTS} documents; "
+                    f"add a $limit stage or use stream mode"
+                )
+
+            with phase("serialize"):
+                clean_results = []
+                for result in results:
+                    clean_result = {}
+                    for key, value in result.items():
+                        if isinstance(value, ObjectId):
+                            clean_result[key] = str(value)
+                        else:
+                            clean_result[key] = value
+                    clean_results.append(clean_result)
+
+        if cacheable:
+            aggregate_cache.set(cache_key, clean_results)
+        else:
+            # $out/$merge may have rewritten any collection
+            aggregate_cache.clear()
 
         return clean_results
 
     except Exception as e:
         logger.error(f"Error executing aggregation on collection '{collection_name}': {e}")
-        raise
\ No newline at end of file
+        raise
+
+
+async def stream_aggregate_collection(
+    collection_name: str,
+    pipeline: List[Dict[str, Any]],
+    allow_disk_use: bool = AGGREGATE_ALLOW_DISK_USE
+) -> AsyncIterator[Dict[str, Any]]:
+    collection = db[collection_name]
+    # The slot is held for the whole stream, since the cursor keeps the
+    # server busy until the last batch is read
+    async with admit("mongodb", "aggregate"):
+        cursor = collection.aggregate(
+            pipeline,
+            allowDiskUse=allow_disk_use,
+            batchSize=AGGREGATE_STREAM_BATCH_SIZE,
+            **operation_options(AGGREGATE_MAX_TIME_MS)
+        )
+        try:
+            async for document in cursor:
+                yield document
+        finally:
+            await cursor.close()
+
+
+async def get_collection_facets(collection_name: str, params: FacetParams) -> Dict[str, List[Dict[str, Any]]]:
+    try:
+        facet_fields = list(dict.fromkeys(params.fields))
+        if not facet_fields:
+            raise ValueError("Specify at least one facet field")
+        if len(facet_fields) > FACET_MAX_FIELDS:
+            raise ValueError(f"At most {FACET_MAX_FIELDS} facet fields per request")
+
+        top_n = max(1, min(params.top_n, FACET_MAX_VALUES))
+        cache_key = (frozenset([collection_name]), "facets", dumps(params.model_dump()))
+        cached = aggregate_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        fields = await get_collection_fields(collection_name, referenced_fields(params))
+        unknown = [field for field in facet_fields if field not in fields]
+        if unknown:
+            raise ValueError(f"Unknown facet fields: {unknown}")
+
+        mongo_filter = build_mongo_filter(
+            QueryParams(search=params.search, search_columns=params.search_columns, filters=params.filters),
+            fields
+        )
+
+        # $facet keys cannot contain dots or start with $, so branches are positional
+        pipeline = [
+            {"$match": mongo_filter},
+            {"$facet": {
+                f"f{index}": [{"$sortByCount": f"${field}"}, {"$limit": top_n}]
+                for index, field in enumerate(facet_fields)
+            }}
+        ]
+
+        collection = db[collection_name]
+        async with admit("mongodb", "aggregate"):
+            result = await collection.aggregate(pipeline, **operation_options(AGGREGATE_MAX_TIME_MS)).to_list(length=1)
+        branches = result[0] if result else {}
+
+        facets = {}
+        for index, field in enumerate(facet_fields):
+            facets[field] = [
+                {
+                    "value": str(bucket["_id"]) if isinstance(bucket["_id"], ObjectId) else bucket["_id"],
+                    "count": bucket["count"]
+                }
+                for bucket in branches.get(f"f{index}", [])
+            ]
+
+        aggregate_cache.set(cache_key, facets)
+        return facets
+
+    except Exception as e:
+        logger.error(f"Error computing facets for collection '{collection_name}': {e}")
+        raise
@@ -1,8 +1,8 @@
-import pandas as pd
 import re
+import asyncio
 import asyncpg
 
-from typing import Dict, List, Any, Tuple
+from typing import TYPE_CHECKING, Dict, Iterable, List, Any, Optional, Tuple
 from dotenv import load_dotenv
 import logging
 
@@ -11,17 +11,81 @@ from config import (
     SUPABASE_DB_PORT,
     SUPABASE_DB_NAME,
     SUPABASE_DB_USER,
-    SUPABASE_DB_PASSWORD
+    SUPABASE_DB_PASSWORD,
+    QUERY_COMBINED_COUNT,
+    QUERY_TIMEOUT_MS,
+    AGGREGATE_MAX_TIME_MS,
+    AGGREGATE_MAX_GROUPS,
+    AGGREGATE_CACHE_TTL,
+    AGGREGATE_CACHE_SIZE,
+    FACET_MAX_FIELDS,
+    FACET_MAX_VALUES,
+    STATS_RECOMPUTE_MAX_ROWS,
+    CATALOG_CACHE_TTL,
+    CATALOG_CACHE_SIZE,
+    SUPABASE_STATEMENT_CACHE_SIZE
     #SUPABASE_SERVICE_ROLE_KEY
 )
-from utils.database_connections import get_supabase_connection as get_connection
-from schemas.schema import QueryResult, QueryParams
+from utils.database_connections import (
+    get_supabase_connection as get_connection,
+    acquire_supabase_connection as acquire_connection,
+    release_supabase_connection as release_connection
+)
+from schemas.schema import QueryResult, QueryParams, TableAggregateParams, FacetParams, referenced_fields
+from utils.admission import admit, run_admitted
+from utils.background import rerun_if_running
+from utils.circuit_breaker import breakers
+from utils.health import health_monitor
+from utils.deadlines import remaining_seconds
+from utils.cache import StatementCacheStats, TTLCache
+from utils.hot_datasets import hot_datasets
+from utils.serialization import canonical_dumps, dumps, loads, pagination_meta, query_result_json
+from utils.single_flight import query_flights
+from utils.slow_queries import slow_queries, describe_query
+from utils.timing import phase
+
+if TYPE_CHECKING:
+    # pandas is only imported where a frame is built, so query-only paths never load it
+    import pandas as pd
 
 load_dotenv()
 logger = logging.getLogger(__name__)
 
+TOTAL_COUNT_COLUMN = "__total_count"
+STATS_TABLE = "_dataset_stats"
+CATALOG_TABLE = "_dataset_catalog"
+METADATA_TABLES = (STATS_TABLE, CATALOG_TABLE)
+
+# Postgres has no built-in HyperLogLog, so approx_distinct is an exact
+# COUNT(DISTINCT ...) unless an extension is added later.
+AGGREGATE_FUNCTIONS = {
+    "count": "COUNT({})",
+    "sum": "SUM({})",
+    "avg": "AVG({})",
+    "min": "MIN({})",
+    "max": "MAX({})",
+    "approx_distinct": "COUNT(DISTINCT {})",
+}
+
+COMPARISON_OPERATORS = {"gte": ">=", "gt": ">", "lte": "<=", "lt": "<", "eq": "=", "ne": "!="}
+PATTERN_OPERATORS = {"contains": "%{}%", "startswith": "{}%", "endswith": "%{}"}
+# information_schema spells out a few of the types infer_pg_type names
+PG_TYPE_NAMES = {"timestamp without time zone": "TIMESTAMP"}
+
+facet_cache = TTLCache(AGGREGATE_CACHE_TTL, AGGREGATE_CACHE_SIZE)
+catalog_cache = TTLCache(CATALOG_CACHE_TTL, CATALOG_CACHE_SIZE)
+statement_stats = StatementCacheStats(SUPABASE_STATEMENT_CACHE_SIZE)
+
+
+def invalidate_table_cache(table_name: str) -> None:
+    facet_cache.invalidate(lambda key: key[0] == table_name)
+    catalog_cache.invalidate(lambda key: key == ("columns", table_name))
+    hot_datasets.invalidate(("supabase", table_name))
+
+
+def infer_pg_type(series: "pd.Series"):
+    import pandas as pd
 
-def infer_pg_type(series: pd.Series):
     non_null_series = series.dropna()
     if len(non_null_series) == 0:
         return "TEXT"
@@ -49,9 +113,10 @@ def sanitize_column_name(col_name: str) -> str:
 
 
 async def test_connection():
+    if breakers["supabase"].is_open:
+        return False
     try:
-        conn = await get_connection()
-        await conn.close()
+        await ping()
         logger.info("Supabase connection successful")
         return True
     except Exception as e:
@@ -59,7 +124,43 @@ async def test_connection():
         return False
 
 
-async def create_table_and_insert(table_name: str, df: pd.DataFrame):
+async def ping() -> None:
+    conn = await get_connection()
+    try:
+        await conn.fetchval("SELECT 1")
+    finally:
+        await conn.close()
+
+
+async def ping_pool() -> None:
+    conn = await acquire_connection()
+    try:
+        await conn.fetchval("SELECT 1")
+    finally:
+        await release_connection(conn)
+
+
+# The breaker probes with a fresh connection so it works while the pool is
+# refused; routine health checks reuse a pooled one
+breakers["supabase"].probe = ping
+health_monitor.register("supabase", ping_pool)
+
+
+async def explain_query(table_name: str, query: Dict[str, Any]) -> Any:
+    # Plain EXPLAIN plans the statement without running it again
+    conn = await acquire_connection()
+    try:
+        plan = await conn.fetchval(f"EXPLAIN (FORMAT JSON) {query['sql']}", *query["params"])
+    finally:
+        await release_connection(conn)
+    return loads(plan)
+
+
+slow_queries.register_explainer("supabase", explain_query)
+
+
+async def create_table_and_insert(table_name: str, df: "pd.DataFrame"):
+    import pandas as pd
 
     table_name = sanitize_column_name(table_name)
 
@@ -68,9 +169,10 @@ async def create_table_and_insert(table_name: str, df: pd.DataFrame):
 
     df.columns = [sanitize_column_name(col) for col in df.columns]
     column_defs = []
-    for col in df.columns:
-        pg_type = infer_pg_type(df[col])
-        column_defs.append(f'"{col}" {pg_type}')
+    with phase("infer"):
+        for col in df.columns:
+            pg_type = infer_pg_type(df[col])
+            column_defs.append(f'"{col}" {pg_type}')
 
     create_stmt = f'''
     CREATE TABLE IF NOT EXISTS "{table_name}" (
@@ -83,49 +185,51 @@ async def create_table_and_insert(table_name: str, df: pd.DataFrame):
     logger.info(f"Creating table: {table_name}")
     logger.info(f"Columns: {list(df.columns)}")
 
-    conn = None
-    try:
-        conn = await get_connection()
-        await conn.execute("CREATE EXTENSION IF NOT EXISTS \"uuid-ossp\";")
+    async with admit("supabase", "upload"):
+        conn = None
+        try:
+            conn = await acquire_connection()
+            await conn.execute("CREATE EXTENSION IF NOT EXISTS \"uuid-ossp\";")
 
-        await conn.execute(create_stmt)
-        logger.info(f" Table '{table_name}' created successfully")
+            await conn.execute(create_stmt)
+            logger.info(f" Table '{table_name}' created successfully")
 
-        records = df.to_dict(orient="records")
+            records = df.to_dict(orient="records")
 
-        if records:
+            if records:
 
-            clean_records = []
-            for record in records:
-                clean_record = {}
-                for key, value in record.items():
-                    if pd.isna(value):
-                        clean_record[key] = None
-                    else:
-                        clean_record[key] = value
-                clean_records.append(clean_record)
+                clean_records = []
+                for record in records:
+                    clean_record = {}
+                    for key, value in record.items():
+                        if pd.isna(value):
+                            clean_record[key] = None
+                        else:
+                            clean_record[key] = value
+                    clean_records.append(clean_record)
 
-            keys = list(clean_records[0].keys())
-            placeholders = ", ".join(f"${i + 1}" for i in range(len(keys)))
-            columns = ", ".join(f'"{k}"' for k in keys)
+                keys = list(clean_records[0].keys())
+                placeholders = ", ".join(f"${i + 1}" for i in range(len(keys)))
+                columns = ", ".join(f'"{k}"' for k in keys)
 
-            insert_stmt = f'INSERT INTO "{table_name}" ({columns}) VALUES ({placeholders})'
+                insert_stmt = f'INSERT INTO "{table_name}" ({columns}) VALUES ({placeholders})'
 
-            values_list = [tuple(record[key] for key in keys) for record in clean_records]
+                values_list = [tuple(record[key] for key in keys) for record in clean_records]
 
-            await conn.executemany(insert_stmt, values_list)
-            logger.info(f"Inserted {len(clean_records)} records into '{table_name}'")
+                await conn.executemany(insert_stmt, values_list)
+                invalidate_table_cache(table_name)
+                logger.info(f"Inserted {len(clean_records)} records into '{table_name}'")
 
-    except asyncpg.exceptions.PostgresError as e:
-        logger.error(f" PostgreSQL Error: {e}")
-        raise
-    except Exception as e:
-        logger.error(f" Unexpected error: {e}")
-        raise
-    finally:
-        if conn:
-            await conn.close()
-            logger.info(" Database connection closed")
+        except asyncpg.exceptions.PostgresError as e:
+            logger.error(f" PostgreSQL Error: {e}")
+            raise
+        except Exception as e:
+            logger.error(f" Unexpected error: {e}")
+            raise
+        finally:
+            if conn:
+                await release_connection(conn)
+                logger.info(" Database connection released")
 
 def get_supabase_config():
 
@@ -143,24 +247,188 @@ def get_supabase_config():
 
     return config
 
-async def get_table_columns(table_name: str) -> List[str]:
-    conn = await get_connection()
+async def ensure_catalog_table(conn) -> None:
+    await conn.execute(f'''
+    CREATE TABLE IF NOT EXISTS "{CATALOG_TABLE}" (
+        dataset TEXT PRIMARY KEY,
+        backend TEXT NOT NULL DEFAULT 'supabase',
+        schema JSONB NOT NULL,
+        row_count BIGINT NOT NULL,
+        byte_size BIGINT NOT NULL,
+        upload_count INTEGER NOT NULL DEFAULT 1,
+        source_filename TEXT,
+        content_hash TEXT,
+        load_timings_ms JSONB,
+        created_at TIMESTAMPTZ DEFAULT NOW(),
+        updated_at TIMESTAMPTZ DEFAULT NOW()
+    );
+    ''')
+
+
+def catalog_row_to_dict(row) -> Dict[str, Any]:
+    entry = dict(row)
+    entry["name"] = entry.pop("dataset")
+    for key in ("schema", "load_timings_ms"):
+        if entry.get(key) is not None:
+            entry[key] = loads(entry[key])
+    return entry
+
+
+async def get_catalog_entry(table_name: str) -> Optional[Dict[str, Any]]:
+    cached = catalog_cache.get(("entry", table_name))
+    if cached is not None:
+        return cached or None
+
+    conn = await acquire_connection()
     try:
-        query = """
-        SELECT column_name 
-        FROM information_schema.columns 
-        WHERE table_name = $1 
+        row = await conn.fetchrow(f'SELECT * FROM "{CATALOG_TABLE}" WHERE dataset = $1', table_name)
+    except asyncpg.exceptions.UndefinedTableError:
+        row = None
+    finally:
+        await release_connection(conn)
+
+    entry = catalog_row_to_dict(row) if row else None
+    # Misses are cached too (as {}), so uncatalogued tables don't pay an
+    # extra lookup on every query
+    catalog_cache.set(("entry", table_name), entry or {})
+    return entry
+
+
+async def list_catalog(page: int = 1, limit: int = 50) -> QueryResult:
+    cache_key = ("list", page, limit)
+    cached = catalog_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    conn = await acquire_connection()
+    try:
+        rows = await conn.fetch(
+            f'''
+            SELECT dataset, backend, row_count, byte_size, upload_count, source_filename,
+                   content_hash, load_timings_ms, created_at, updated_at,
+                   COUNT(*) OVER() AS "{TOTAL_COUNT_COLUMN}"
+            FROM "{CATALOG_TABLE}"
+            ORDER BY dataset
+            LIMIT $1 OFFSET $2
+            ''',
+            limit, (page - 1) * limit
+        )
+        total_count = rows[0][TOTAL_COUNT_COLUMN] if rows else await conn.fetchval(
+            f'SELECT COUNT(*) FROM "{CATALOG_TABLE}"'
+        )
+    except asyncpg.exceptions.UndefinedTableError:
+        rows, total_count = [], 0
+    finally:
+        await release_connection(conn)
+
+    entries = []
+    for row in rows:
+        entry = catalog_row_to_dict(row)
+        entry.pop(TOTAL_COUNT_COLUMN, None)
+        entries.append(entry)
+
+    result = QueryResult(data=entries, **pagination_meta(total_count, page, limit))
+    catalog_cache.set(cache_key, result)
+    return result
+
+
+async def warm_catalog_cache() -> int:
+    conn = await acquire_connection()
+    try:
+        rows = await conn.fetch(
+            f'SELECT * FROM "{CATALOG_TABLE}" ORDER BY updated_at DESC LIMIT $1', CATALOG_CACHE_SIZE // 2
+        )
+    except asyncpg.exceptions.UndefinedTableError:
+        rows = []
+    finally:
+        await release_connection(conn)
+
+    for row in rows:
+        entry = catalog_row_to_dict(row)
+        catalog_cache.set(("entry", entry["name"]), entry)
+    return len(rows)
+
+
+async def fetch_table_schema(conn, table_name: str) -> List[Dict[str, str]]:
+    rows = await conn.fetch(
+        """
+        SELECT column_name, data_type
+        FROM information_schema.columns
+        WHERE table_name = $1
         AND table_schema = 'public'
         ORDER BY ordinal_position
-        """
-        rows = await conn.fetch(query, table_name)
-        return [row['column_name'] for row in rows if row['column_name'] != 'id']
+        """,
+        table_name
+    )
+    return [
+        {"name": row["column_name"], "type": PG_TYPE_NAMES.get(row["data_type"], row["data_type"].upper())}
+        for row in rows
+        if row["column_name"] != "id"
+    ]
+
+
+async def record_catalog_entry(table_name: str, entry: Dict[str, Any]) -> None:
+    table_name = sanitize_column_name(table_name)
+
+    conn = await acquire_connection()
+    try:
+        await ensure_catalog_table(conn)
+        # The table itself is the source of truth: an append of a subset of
+        # columns leaves the others in place
+        schema = await fetch_table_schema(conn, table_name)
+
+        # One statement, so concurrent first uploads can't both take the new
+        # entry path. A new entry counts the table, which may hold rows from
+        # before the catalog; an existing one adds this upload's rows.
+        await conn.execute(
+            f'''
+            INSERT INTO "{CATALOG_TABLE}" AS catalog
+                (dataset, schema, row_count, byte_size, source_filename, content_hash, load_timings_ms)
+            VALUES ($1, $2::jsonb, (SELECT COUNT(*) FROM "{table_name}"), $4, $5, $6, $7::jsonb)
+            ON CONFLICT (dataset) DO UPDATE SET
+                schema = EXCLUDED.schema,
+                row_count = catalog.row_count + $3,
+                byte_size = catalog.byte_size + EXCLUDED.byte_size,
+                upload_count = catalog.upload_count + 1,
+                source_filename = EXCLUDED.source_filename,
+                content_hash = EXCLUDED.content_hash,
+                load_timings_ms = EXCLUDED.load_timings_ms,
+                updated_at = NOW()
+            ''',
+            table_name,
+            dumps(schema).decode(),
+            entry["row_count"],
+            entry["byte_size"],
+            entry["source_filename"],
+            entry["content_hash"],
+            dumps(entry["load_timings_ms"]).decode()
+        )
     finally:
-        await conn.close()
+        await release_connection(conn)
+
+    catalog_cache.clear()
+
+
+async def get_table_columns(table_name: str, required: Iterable[str] = ()) -> List[str]:
+    # Another worker may have added columns since this one cached the
+    # schema; a query naming one it doesn't know reads the table again
+    # rather than dropping the filter
+    cached = catalog_cache.get(("columns", table_name))
+    if cached is not None and all(name in cached for name in required):
+        return cached
+
+    conn = await acquire_connection()
+    try:
+        columns = [column["name"] for column in await fetch_table_schema(conn, table_name)]
+    finally:
+        await release_connection(conn)
+
+    catalog_cache.set(("columns", table_name), columns)
+    return columns
 
 
 async def list_tables() -> List[str]:
-    conn = await get_connection()
+    conn = await acquire_connection()
     try:
         query = """
         SELECT table_name 
@@ -170,88 +438,77 @@ async def list_tables() -> List[str]:
         ORDER BY table_name
         """
         rows = await conn.fetch(query)
-        return [row['table_name'] for row in rows]
+        return [row['table_name'] for row in rows if row['table_name'] not in METADATA_TABLES]
     finally:
-        await conn.close()
+        await release_connection(conn)
 
 
 def build_where_clause(params: QueryParams, columns: List[str]) -> Tuple[str, List[Any]]:
+    # The SQL text depends only on the query's shape: columns and operators
+    # are emitted in sorted order, the search term is bound once, and "in"
+    # lists bind as a single array. Equivalent requests therefore reuse one
+    # prepared statement from asyncpg's cache instead of re-planning.
     where_parts = []
     query_params = []
-    param_counter = 1
+
+    def bind(value: Any) -> str:
+        query_params.append(value)
+        return f"${len(query_params)}"
 
     if params.search and params.search.strip():
-        search_term = f"%{params.search.strip()}%"
         search_cols = params.search_columns if params.search_columns else columns
-
-        valid_search_cols = [col for col in search_cols if col in columns]
+        valid_search_cols = sorted({col for col in search_cols if col in columns})
 
         if valid_search_cols:
-            search_conditions = []
-            for col in valid_search_cols:
-                search_conditions.append(f'CAST("{col}" AS TEXT) ILIKE ${param_counter}')
-                query_params.append(search_term)
-                param_counter += 1
-
+            placeholder = bind(f"%{params.search.strip()}%")
+            search_conditions = [f'CAST("{col}" AS TEXT) ILIKE {placeholder}' for col in valid_search_cols]
             where_parts.append(f"({' OR '.join(search_conditions)})")
 
     if params.filters:
-        for field, value in params.filters.items():
+        for field in sorted(params.filters):
             if field not in columns:
                 continue
 
-            if isinstance(value, dict):
-                for operator, filter_value in value.items():
-                    if operator == "gte":
-                        where_parts.append(f'"{field}" >= ${param_counter}')
-                        query_params.append(filter_value)
-                        param_counter += 1
-                    elif operator == "gt":
-                        where_parts.append(f'"{field}" > ${param_counter}')
-                        query_params.append(filter_value)
-                        param_counter += 1
-                    elif operator == "lte":
-                        where_parts.append(f'"{field}" <= ${param_counter}')
-                        query_params.append(filter_value)
-                        param_counter += 1
-                    elif operator == "lt":
-                        where_parts.append(f'"{field}" < ${param_counter}')
-                        query_params.append(filter_value)
-                        param_counter += 1
-                    elif operator == "in" and isinstance(filter_value, list):
-                        placeholders = [f"${param_counter + i}" for i in range(len(filter_value))]
-                        where_parts.append(f'"{field}" IN ({", ".join(placeholders)})')
-                        query_params.extend(filter_value)
-                        param_counter += len(filter_value)
-                    elif operator == "contains":
-                        where_parts.append(f'CAST("{field}" AS TEXT) ILIKE ${param_counter}')
-                        query_params.append(f"%{filter_value}%")
-                        param_counter += 1
-                    elif operator == "startswith":
-                        where_parts.append(f'CAST("{field}" AS TEXT) ILIKE ${param_counter}')
-                        query_params.append(f"{filter_value}%")
-                        param_counter += 1
-                    elif operator == "endswith":
-                        where_parts.append(f'CAST("{field}" AS TEXT) ILIKE ${param_counter}')
-                        query_params.append(f"%{filter_value}")
-                        param_counter += 1
-                    elif operator == "eq":
-                        where_parts.append(f'"{field}" = ${param_counter}')
-                        query_params.append(filter_value)
-                        param_counter += 1
-                    elif operator == "ne":
-                        where_parts.append(f'"{field}" != ${param_counter}')
-                        query_params.append(filter_value)
-                        param_counter += 1
-            else:
-                where_parts.append(f'"{field}" = ${param_counter}')
-                query_params.append(value)
-                param_counter += 1
+            value = params.filters[field]
+            if not isinstance(value, dict):
+                where_parts.append(f'"{field}" = {bind(value)}')
+                continue
+
+            for operator in sorted(value):
+                filter_value = value[operator]
+                if operator in COMPARISON_OPERATORS:
+                    where_parts.append(f'"{field}" {COMPARISON_OPERATORS[operator]} {bind(filter_value)}')
+                elif operator == "in" and isinstance(filter_value, list):
+                    # Postgres infers the array type from the column
+                    where_parts.append(f'"{field}" = ANY({bind(filter_value)})')
+                elif operator in PATTERN_OPERATORS:
+                    pattern = PATTERN_OPERATORS[operator].format(filter_value)
+                    where_parts.append(f'CAST("{field}" AS TEXT) ILIKE {bind(pattern)}')
 
     where_clause = " AND ".join(where_parts) if where_parts else ""
     return where_clause, query_params
 
 
+def resolve_selected_columns(params: QueryParams, columns: List[str]) -> List[str]:
+    requested = list(params.fields or []) + list(params.exclude_fields or [])
+    unknown = [col for col in requested if col not in columns]
+    if unknown:
+        raise ValueError(f"Unknown columns requested: {unknown}")
+
+    selected = params.fields if params.fields else columns
+    excluded = set(params.exclude_fields or [])
+    selected = [col for col in selected if col not in excluded]
+    if not selected:
+        raise ValueError("Column selection excludes every column")
+    return selected
+
+
+def build_select_list(params: QueryParams, columns: List[str]) -> str:
+    # Columns come from get_table_columns, which never includes "id", so the
+    # primary key is left out by the database rather than popped afterwards.
+    return ", ".join(f'"{col}"' for col in resolve_selected_columns(params, columns))
+
+
 def build_order_clause(params: QueryParams, columns: List[str]) -> str:
     if not params.sort_by or params.sort_by not in columns:
         return 'ORDER BY "id"'
@@ -260,59 +517,330 @@ def build_order_clause(params: QueryParams, columns: List[str]) -> str:
     return f'ORDER BY "{params.sort_by}" {order}'
 
 
-async def query_table(table_name: str, params: QueryParams) -> QueryResult:
-    conn = await get_connection()
+async def prepare_table_query(
+    table_name: str,
+    params: QueryParams,
+    columns: Optional[List[str]] = None
+) -> Tuple[str, List[Any], str, str]:
+    referenced = referenced_fields(params)
+    if columns is None or not referenced.issubset(columns):
+        columns = await get_table_columns(table_name, referenced)
+    if not columns:
+        raise ValueError(f"Table '{table_name}' not found or has no columns")
+
+    where_clause, query_params = build_where_clause(params, columns)
+
+    order_clause = build_order_clause(params, columns)
+
+    select_list = build_select_list(params, columns)
+
+    return where_clause, query_params, order_clause, select_list
+
 
+async def load_table_frame(table_name: str, columns: List[str], max_rows: int) -> Optional["pd.DataFrame"]:
+    from utils.frame_query import build_frame
+
+    conn = await acquire_connection()
     try:
-        columns = await get_table_columns(table_name)
-        if not columns:
-            raise ValueError(f"Table '{table_name}' not found or has no columns")
+        select_list = ", ".join(f'"{col}"' for col in columns)
+        # Loaded in id order, which is the default sort of the database path
+        rows = await conn.fetch(f'SELECT {select_list} FROM "{table_name}" ORDER BY "id" LIMIT $1', max_rows + 1)
+    finally:
+        await release_connection(conn)
+
+    if len(rows) > max_rows:
+        return None
+    return build_frame(columns, [tuple(row) for row in rows])
+
+
+async def query_hot_table(
+    table_name: str,
+    params: QueryParams,
+    columns: Optional[List[str]] = None
+) -> Optional[Tuple[int, List[Dict[str, Any]]]]:
+    if not hot_datasets.enabled_for(table_name):
+        return None
+
+    referenced = referenced_fields(params)
+    if columns is None or not referenced.issubset(columns):
+        columns = await get_table_columns(table_name, referenced)
+    if not columns:
+        return None
+    selected = resolve_selected_columns(params, columns)
+
+    frame = await hot_datasets.get(
+        ("supabase", table_name),
+        lambda max_rows: load_table_frame(table_name, columns, max_rows)
+    )
+    if frame is None:
+        return None
+
+    from utils.frame_query import run_frame_query, UnsupportedFrameQuery
+
+    try:
+        return await asyncio.to_thread(
+            run_frame_query,
+            frame,
+            params,
+            columns,
+            selected,
+            text_cast=True,
+            nulls_first=False
+        )
+    except UnsupportedFrameQuery as e:
+        logger.info(f"Hot query on '{table_name}' falls back to Postgres: {e}")
+        return None
+
+
+async def query_table(
+    table_name: str,
+    params: QueryParams,
+    columns: Optional[List[str]] = None
+) -> QueryResult:
+    async with slow_queries.trace("supabase", "query", table_name):
+        return await query_flights.run(
+            ("supabase", table_name, "result", canonical_dumps(params.model_dump())),
+            lambda: run_admitted("supabase", "query", lambda: execute_table_query(table_name, params, columns))
+        )
+
 
-        where_clause, query_params = build_where_clause(params, columns)
+async def execute_table_query(
+    table_name: str,
+    params: QueryParams,
+    columns: Optional[List[str]] = None
+) -> QueryResult:
+    hot_page = None
+    if hot_datasets.enabled_for(table_name):
+        with phase("hot"):
+            hot_page = await query_hot_table(table_name, params, columns)
+    if hot_page is not None:
+        total_count, data = hot_page
+        return QueryResult(data=data, **pagination_meta(total_count, params.page, params.limit))
 
-        order_clause = build_order_clause(params, columns)
+    conn = await acquire_connection()
+
+    try:
+        with phase("schema"):
+            where_clause, query_params, order_clause, select_list = await prepare_table_query(table_name, params, columns)
 
         count_query = f'SELECT COUNT(*) as total FROM "{table_name}"'
         if where_clause:
             count_query += f" WHERE {where_clause}"
 
-        total_count = await conn.fetchval(count_query, *query_params)
-
         offset = (params.page - 1) * params.limit
-        total_pages = (total_count + params.limit - 1) // params.limit
+        count_params = list(query_params)
+
+        if QUERY_COMBINED_COUNT:
+            # The window count rides along with the page rows, so the filter
+            # is evaluated once and only one round trip is paid.
+            select_list += f', COUNT(*) OVER() AS "{TOTAL_COUNT_COLUMN}"'
 
         main_query = f'''
-        SELECT * FROM "{table_name}"
+        SELECT {select_list} FROM "{table_name}"
         {f"WHERE {where_clause}" if where_clause else ""}
         {order_clause}
         LIMIT ${len(query_params) + 1} OFFSET ${len(query_params) + 2}
         '''
 
         query_params.extend([params.limit, offset])
+        describe_query(sql=main_query, params=list(query_params))
+
+        if QUERY_COMBINED_COUNT:
+            statement_stats.record(main_query)
+            with phase("fetch"):
+                rows = await conn.fetch(main_query, *query_params, timeout=remaining_seconds(QUERY_TIMEOUT_MS))
+            if rows:
+                total_count = rows[0][TOTAL_COUNT_COLUMN]
+            elif offset == 0:
+                total_count = 0
+            else:
+                # Paged past the end: no row carries the window count
+                statement_stats.record(count_query)
+                with phase("count"):
+                    total_count = await conn.fetchval(count_query, *count_params, timeout=remaining_seconds(QUERY_TIMEOUT_MS))
+        else:
+            statement_stats.record(count_query)
+            with phase("count"):
+                total_count = await conn.fetchval(count_query, *count_params, timeout=remaining_seconds(QUERY_TIMEOUT_MS))
+            statement_stats.record(main_query)
+            with phase("fetch"):
+                rows = await conn.fetch(main_query, *query_params, timeout=remaining_seconds(QUERY_TIMEOUT_MS))
+
+        with phase("serialize"):
+            data = [dict(row) for row in rows]
+
+            for item in data:
+                item.pop(TOTAL_COUNT_COLUMN, None)
+
+            return QueryResult(data=data, **pagination_meta(total_count, params.page, params.limit))
+
+    finally:
+        await release_connection(conn)
+
+
+async def query_table_json(table_name: str, params: QueryParams) -> bytes:
+    async with slow_queries.trace("supabase", "query_json", table_name):
+        return await query_flights.run(
+            ("supabase", table_name, "json", canonical_dumps(params.model_dump())),
+            lambda: run_admitted("supabase", "query", lambda: execute_table_query_json(table_name, params))
+        )
+
+
+async def execute_table_query_json(table_name: str, params: QueryParams) -> bytes:
+    # Fast path: Postgres renders the page as a JSON array, which is passed
+    # through as bytes without building dicts or validating QueryResult.
+    hot_page = None
+    if hot_datasets.enabled_for(table_name):
+        with phase("hot"):
+            hot_page = await query_hot_table(table_name, params)
+    if hot_page is not None:
+        total_count, data = hot_page
+        return query_result_json(dumps(data), total_count, params.page, params.limit)
+
+    conn = await acquire_connection()
+
+    try:
+        with phase("schema"):
+            where_clause, query_params, order_clause, select_list = await prepare_table_query(table_name, params)
+
+        where_sql = f"WHERE {where_clause}" if where_clause else ""
+        offset = (params.page - 1) * params.limit
+
+        json_query = f'''
+        SELECT
+            (SELECT COUNT(*) FROM "{table_name}" {where_sql}) AS total,
+            COALESCE(
+                (SELECT json_agg(page) FROM (
+                    SELECT {select_list} FROM "{table_name}"
+                    {where_sql}
+                    {order_clause}
+                    LIMIT ${len(query_params) + 1} OFFSET ${len(query_params) + 2}
+                ) page),
+                '[]'::json
+            )::text AS data
+        '''
+
+        describe_query(sql=json_query, params=[*query_params, params.limit, offset])
+        statement_stats.record(json_query)
+        # Count and page are one statement, rendered to JSON by Postgres
+        with phase("fetch"):
+            row = await conn.fetchrow(json_query, *query_params, params.limit, offset, timeout=remaining_seconds(QUERY_TIMEOUT_MS))
+
+        with phase("serialize"):
+            return query_result_json(row["data"].encode(), row["total"], params.page, params.limit)
 
-        rows = await conn.fetch(main_query, *query_params)
+    finally:
+        await release_connection(conn)
+
+
+async def ensure_stats_table(conn) -> None:
+    await conn.execute(f'''
+    CREATE TABLE IF NOT EXISTS "{STATS_TABLE}" (
+        dataset TEXT PRIMARY KEY,
+        row_count BIGINT NOT NULL,
+        stats JSONB NOT NULL,
+        computed_at TIMESTAMPTZ DEFAULT NOW()
+    );
+    ''')
 
-        data = [dict(row) for row in rows]
 
-        for item in data:
-            item.pop('id', None)
+async def record_ingest_stats(table_name: str, stats: Dict[str, Any]) -> None:
+    # Match the names create_table_and_insert gives the table and its columns
+    table_name = sanitize_column_name(table_name)
+    stats = {
+        **stats,
+        "columns": [{**column, "name": sanitize_column_name(column["name"])} for column in stats["columns"]]
+    }
 
-        return QueryResult(
-            data=data,
-            total_count=total_count,
-            page=params.page,
-            limit=params.limit,
-            total_pages=total_pages,
-            has_next=params.page < total_pages,
-            has_previous=params.page > 1
+    conn = await acquire_connection()
+    try:
+        await ensure_stats_table(conn)
+        # An upload appending to an existing table keeps the exact row count
+        # and marks the stats stale; rebuilding them means reading the whole
+        # table, which only happens when a recompute is requested
+        await conn.execute(
+            f'''
+            INSERT INTO "{STATS_TABLE}" AS stored (dataset, row_count, stats) VALUES ($1, $2, $3::jsonb)
+            ON CONFLICT (dataset) DO UPDATE SET
+                row_count = stored.row_count + EXCLUDED.row_count,
+                stats = stored.stats || jsonb_build_object('row_count', stored.row_count + EXCLUDED.row_count, 'stale', true)
+            ''',
+            table_name, stats["row_count"], dumps(stats).decode()
         )
+    finally:
+        await release_connection(conn)
+
+    # A recompute already reading the table may miss this batch
+    rerun_if_running(("supabase_stats", table_name))
+
+
+async def recompute_table_stats(table_name: str) -> Dict[str, Any]:
+    import pandas as pd
+    from utils.column_stats import compute_dataframe_stats
 
+    columns = [col for col in await get_table_columns(table_name) if col != "created_at"]
+    if not columns:
+        raise ValueError(f"Table '{table_name}' not found or has no columns")
+
+    conn = await acquire_connection()
+    try:
+        select_list = ", ".join(f'"{col}"' for col in columns)
+        rows = await conn.fetch(f'SELECT {select_list} FROM "{table_name}" LIMIT $1', STATS_RECOMPUTE_MAX_ROWS)
+
+        df = pd.DataFrame([tuple(row) for row in rows], columns=columns)
+        stats = await asyncio.to_thread(compute_dataframe_stats, df, "recompute")
+        if len(rows) >= STATS_RECOMPUTE_MAX_ROWS:
+            stats["row_count"] = await conn.fetchval(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass($1)", f'"{table_name}"'
+            )
+            stats["sampled"] = True
+
+        await ensure_stats_table(conn)
+        await conn.execute(
+            f'''
+            INSERT INTO "{STATS_TABLE}" (dataset, row_count, stats, computed_at) VALUES ($1, $2, $3::jsonb, NOW())
+            ON CONFLICT (dataset) DO UPDATE
+            SET row_count = EXCLUDED.row_count, stats = EXCLUDED.stats, computed_at = EXCLUDED.computed_at
+            ''',
+            table_name, stats["row_count"], dumps(stats).decode()
+        )
     finally:
-        await conn.close()
+        await release_connection(conn)
+
+    logger.info(f"Recomputed column statistics for table '{table_name}'")
+    return stats
 
 
 async def get_table_stats(table_name: str) -> Dict[str, Any]:
-    conn = await get_connection()
+    conn = await acquire_connection()
+    try:
+        stored = await conn.fetchval(f'SELECT stats FROM "{STATS_TABLE}" WHERE dataset = $1', table_name)
+    except asyncpg.exceptions.UndefinedTableError:
+        stored = None
+    finally:
+        await release_connection(conn)
+
+    if stored is None:
+        return await sample_table_stats(table_name)
+
+    stats = loads(stored)
+    columns = [column["name"] for column in stats["columns"]]
+
+    return {
+        "table_name": table_name,
+        "total_rows": stats["row_count"],
+        "total_columns": len(columns),
+        "columns": columns,
+        "column_stats": {column["name"]: column for column in stats["columns"]},
+        "stats_source": stats.get("source"),
+        "stats_computed_at": stats.get("computed_at"),
+        "stats_sampled": stats.get("sampled", False),
+        "stats_stale": stats.get("stale", False)
+    }
+
+
+async def sample_table_stats(table_name: str) -> Dict[str, Any]:
+    conn = await acquire_connection()
 
     try:
         stats_query = f'SELECT COUNT(*) as total_rows FROM "{table_name}"'
@@ -339,8 +867,174 @@ async def get_table_stats(table_name: str) -> Dict[str, Any]:
             "total_rows": total_rows,
             "total_columns": len(columns),
             "columns": columns,
-            "column_stats": column_stats
+            "column_stats": column_stats,
+            "stats_source": "sample"
         }
 
     finally:
-        await conn.close()
\ No newline at end of file
+        await release_connection(conn)
+
+
+def build_aggregate_query(
+    table_name: str,
+    params: TableAggregateParams,
+    columns: List[str]
+) -> Tuple[str, List[Any]]:
+    unknown = [col for col in params.group_by if col not in columns]
+    if unknown:
+        raise ValueError(f"Unknown group_by columns: {unknown}")
+
+    if not params.group_by and not params.metrics:
+        raise ValueError("Specify at least one group_by column or metric")
+
+    group_list = ", ".join(f'"{col}"' for col in params.group_by)
+    select_parts = [f'"{col}"' for col in params.group_by]
+    output_names = list(params.group_by)
+
+    for metric in params.metrics:
+        function = metric.function.lower()
+        if function not in AGGREGATE_FUNCTIONS:
+            raise ValueError(
+                f"Unsupported metric function '{metric.function}'; "
+                f"expected one of {list(AGGREGATE_FUNCTIONS)}"
+            )
+
+        if metric.column is None:
+            if function != "count":
+                raise ValueError(f"Metric '{function}' requires a column")
+            argument = "*"
+        elif metric.column not in columns:
+            raise ValueError(f"Unknown metric column: '{metric.column}'")
+        else:
+            argument = f'"{metric.column}"'
+
+        alias = sanitize_column_name(metric.alias or (f"{function}_{metric.column}" if metric.column else function))
+        if alias in output_names:
+            raise ValueError(f"Duplicate output name '{alias}'; set a distinct alias")
+        output_names.append(alias)
+
+        select_parts.append(f'{AGGREGATE_FUNCTIONS[function].format(argument)} AS "{alias}"')
+
+    where_params = QueryParams(
+        search=params.search,
+        search_columns=params.search_columns,
+        filters=params.filters
+    )
+    where_clause, query_params = build_where_clause(where_params, columns)
+
+    query = f'SELECT {", ".join(select_parts)} FROM "{table_name}"'
+    if where_clause:
+        query += f" WHERE {where_clause}"
+    if params.group_by:
+        query += f" GROUP BY {group_list}"
+
+    order = "DESC" if params.sort_order.lower() == "desc" else "ASC"
+    if params.sort_by and params.sort_by in output_names:
+        query += f' ORDER BY "{params.sort_by}" {order}'
+    elif params.group_by:
+        query += f" ORDER BY {group_list}"
+
+    limit = max(1, min(params.limit, AGGREGATE_MAX_GROUPS))
+    query += f" LIMIT ${len(query_params) + 1}"
+    query_params.append(limit)
+
+    return query, query_params
+
+
+async def aggregate_table(table_name: str, params: TableAggregateParams) -> List[Dict[str, Any]]:
+    async with slow_queries.trace("supabase", "aggregate", table_name):
+        with phase("schema"):
+            metric_columns = [metric.column for metric in params.metrics if metric.column]
+            columns = await get_table_columns(table_name, referenced_fields(params).union(params.group_by, metric_columns))
+        if not columns:
+            raise ValueError(f"Table '{table_name}' not found or has no columns")
+
+        query, query_params = build_aggregate_query(table_name, params, columns)
+        describe_query(sql=query, params=list(query_params))
+
+        async with admit("supabase", "aggregate"):
+            conn = await acquire_connection()
+            try:
+                statement_stats.record(query)
+                with phase("fetch"):
+                    rows = await conn.fetch(query, *query_params, timeout=remaining_seconds(AGGREGATE_MAX_TIME_MS))
+                with phase("serialize"):
+                    return [dict(row) for row in rows]
+            finally:
+                await release_connection(conn)
+
+
+def build_facet_query(
+    table_name: str,
+    params: FacetParams,
+    facet_columns: List[str],
+    columns: List[str]
+) -> Tuple[str, List[Any]]:
+    quoted = [f'"{col}"' for col in facet_columns]
+    grouping = f"GROUPING({', '.join(quoted)})"
+
+    where_params = QueryParams(
+        search=params.search,
+        search_columns=params.search_columns,
+        filters=params.filters
+    )
+    where_clause, query_params = build_where_clause(where_params, columns)
+
+    # One scan builds every facet: each column is its own grouping set, the
+    # GROUPING() bitmask tells the sets apart and ROW_NUMBER keeps the top N
+    query = f'''
+    SELECT * FROM (
+        SELECT {", ".join(quoted)},
+               {grouping} AS "__facet",
+               COUNT(*) AS "__count",
+               ROW_NUMBER() OVER (PARTITION BY {grouping} ORDER BY COUNT(*) DESC) AS "__rank"
+        FROM "{table_name}"
+        {f"WHERE {where_clause}" if where_clause else ""}
+        GROUP BY GROUPING SETS ({", ".join(f"({col})" for col in quoted)})
+    ) facets
+    WHERE "__rank" <= ${len(query_params) + 1}
+    ORDER BY "__facet", "__rank"
+    '''
+    query_params.append(max(1, min(params.top_n, FACET_MAX_VALUES)))
+
+    return query, query_params
+
+
+async def get_table_facets(table_name: str, params: FacetParams) -> Dict[str, List[Dict[str, Any]]]:
+    facet_columns = list(dict.fromkeys(params.fields))
+    if not facet_columns:
+        raise ValueError("Specify at least one facet column")
+    if len(facet_columns) > FACET_MAX_FIELDS:
+        raise ValueError(f"At most {FACET_MAX_FIELDS} facet columns per request")
+
+    cache_key = (table_name, dumps(params.model_dump()))
+    cached = facet_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    columns = await get_table_columns(table_name, referenced_fields(params))
+    unknown = [col for col in facet_columns if col not in columns]
+    if unknown:
+        raise ValueError(f"Unknown facet columns: {unknown}")
+
+    query, query_params = build_facet_query(table_name, params, facet_columns, columns)
+
+    # Column i is the only one grouped in its set, so its bit is the only zero
+    all_bits = (1 << len(facet_columns)) - 1
+    masks = {all_bits ^ (1 << (len(facet_columns) - 1 - index)): col for index, col in enumerate(facet_columns)}
+
+    async with admit("supabase", "aggregate"):
+        conn = await acquire_connection()
+        try:
+            statement_stats.record(query)
+            rows = await conn.fetch(query, *query_params, timeout=remaining_seconds(AGGREGATE_MAX_TIME_MS))
+        finally:
+            await release_connection(conn)
+
+    facets = {col: [] for col in facet_columns}
+    for row in rows:
+        col = masks[row["__facet"]]
+        facets[col].append({"value": row[col], "count": row["__count"]})
+
+    facet_cache.set(cache_key, facets)
+    return facets
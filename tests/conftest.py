@@ -0,0 +1,37 @@
+import os
+
+# config reads the environment at import; nothing here should reach a real server
+os.environ.setdefault("MONGO_URI", "mongodb://localhost:1/?serverSelectionTimeoutMS=300")
+os.environ.setdefault("MONGO_DB", "test")
+os.environ.setdefault("MONGO_COLLECTION", "uploads")
+os.environ.setdefault("WARMUP_ENABLED", "false")
+
+import pytest
+
+from benchmarks.fakes import FakeMongoDatabase, FakePostgres
+
+
+@pytest.fixture
+def fakes(monkeypatch):
+    """In-memory MongoDB and Postgres behind the services, undone after the test."""
+    import services.mongo_service as mongo_service
+    import services.supabase_service as supabase_service
+
+    mongo = FakeMongoDatabase()
+    postgres = FakePostgres()
+    monkeypatch.setattr(mongo_service, "db", mongo)
+    monkeypatch.setattr(supabase_service, "acquire_connection", postgres.acquire)
+    monkeypatch.setattr(supabase_service, "release_connection", postgres.release)
+    supabase_service.catalog_cache.clear()
+    mongo_service.catalog_cache.clear()
+    return mongo, postgres
+
+
+@pytest.fixture
+def client(fakes):
+    """The app over the in-memory backends; the lifespan isn't run."""
+    from fastapi.testclient import TestClient
+
+    import main
+
+    return TestClient(main.app)
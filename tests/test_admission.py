@@ -0,0 +1,73 @@
+import asyncio
+import time
+
+import pytest
+
+from utils.admission import AdmissionController, AdmissionRejected
+from utils.deadlines import deadline_var
+
+
+async def hold(controller: AdmissionController, release: asyncio.Event) -> None:
+    async with controller.slot():
+        await release.wait()
+
+
+def test_full_queue_is_shed_immediately():
+    controller = AdmissionController("mongodb query", max_concurrent=1, max_queue=1, max_wait=5)
+
+    async def scenario():
+        release = asyncio.Event()
+        running = asyncio.ensure_future(hold(controller, release))
+        waiting = asyncio.ensure_future(hold(controller, release))
+        await asyncio.sleep(0.01)
+        assert (controller.active, controller.queued) == (1, 1)
+        with pytest.raises(AdmissionRejected) as rejected:
+            async with controller.slot():
+                pass
+        release.set()
+        await asyncio.gather(running, waiting)
+        return rejected.value
+
+    rejected = asyncio.run(scenario())
+    assert rejected.retry_after >= 1
+    assert rejected.to_http().status_code == 503
+    assert rejected.to_http().headers == {"Retry-After": str(rejected.retry_after)}
+    stats = controller.stats()
+    assert (stats["admitted"], stats["rejected"], stats["active"], stats["queued"]) == (2, 1, 0, 0)
+
+
+@pytest.mark.parametrize("max_wait, deadline_in", [(0.02, None), (5, 0.02)])
+def test_waiting_is_bounded_by_max_wait_and_the_request_deadline(max_wait, deadline_in):
+    controller = AdmissionController("supabase query", max_concurrent=1, max_queue=10, max_wait=max_wait)
+
+    async def scenario():
+        release = asyncio.Event()
+        running = asyncio.ensure_future(hold(controller, release))
+        await asyncio.sleep(0)
+        if deadline_in is not None:
+            deadline_var.set(time.monotonic() + deadline_in)
+        started = time.perf_counter()
+        with pytest.raises(AdmissionRejected):
+            async with controller.slot():
+                pass
+        waited = time.perf_counter() - started
+        release.set()
+        await running
+        return waited
+
+    assert asyncio.run(scenario()) < 1
+    assert controller.queued == 0
+
+
+def test_disabled_controller_admits_everything():
+    controller = AdmissionController("mongodb upload", max_concurrent=1, max_queue=0, max_wait=0, enabled=False)
+
+    async def scenario():
+        release = asyncio.Event()
+        holders = [asyncio.ensure_future(hold(controller, release)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        release.set()
+        await asyncio.gather(*holders)
+
+    asyncio.run(scenario())
+    assert controller.stats()["rejected"] == 0
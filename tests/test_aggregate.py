@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+
+from services import mongo_service
+
+
+@pytest.fixture
+def orders(fakes):
+    mongo, _ = fakes
+    collection = mongo["orders"]
+    calls = []
+    original = collection.aggregate
+
+    def aggregate(pipeline, **kwargs):
+        calls.append(pipeline)
+        return original(pipeline, **kwargs)
+
+    collection.aggregate = aggregate
+
+    async def fill():
+        for amount in range(5):
+            await collection.insert_one({"amount": amount})
+
+    asyncio.run(fill())
+    mongo_service.aggregate_cache.clear()
+    yield calls
+    mongo_service.aggregate_cache.clear()
+
+
+def test_read_only_pipelines_are_bounded_and_cached(orders):
+    pipeline = [{"$match": {}}]
+    first = asyncio.run(mongo_service.aggregate_collection("orders", pipeline))
+    second = asyncio.run(mongo_service.aggregate_collection("orders", [{"$match": {}}]))
+
+    assert first == second and len(first) == 5
+    assert len(orders) == 1
+    assert orders[0][-1] == {"$limit": mongo_service.AGGREGATE_MAX_RESULTS + 1}
+
+
+def test_write_stages_skip_and_clear_the_cache(orders):
+    asyncio.run(mongo_service.aggregate_collection("orders", [{"$match": {}}]))
+    for _ in range(2):
+        asyncio.run(mongo_service.aggregate_collection("orders", [{"$match": {}}, {"$out": "copy"}]))
+
+    assert len(orders) == 3
+    assert orders[1] == [{"$match": {}}, {"$out": "copy"}]
+    assert len(mongo_service.aggregate_cache) == 0
+
+
+def test_oversized_results_are_rejected(orders, monkeypatch):
+    monkeypatch.setattr(mongo_service, "AGGREGATE_MAX_RESULTS", 3)
+    with pytest.raises(ValueError, match="more than 3 documents"):
+        asyncio.run(mongo_service.aggregate_collection("orders", [{"$match": {}}]))
+
+
+def test_stream_mode_yields_every_document(orders, monkeypatch):
+    monkeypatch.setattr(mongo_service, "AGGREGATE_MAX_RESULTS", 3)
+
+    async def collect():
+        return [document async for document in mongo_service.stream_aggregate_collection("orders", [{"$match": {}}])]
+
+    assert [document["amount"] for document in asyncio.run(collect())] == [0, 1, 2, 3, 4]
+
+
+def test_pipelines_are_invalidated_by_the_collections_they_read(orders):
+    pipeline = [
+        {"$lookup": {"from": "customers", "as": "c", "pipeline": [
+            {"$unionWith": {"coll": "refunds", "pipeline": [
+                {"$graphLookup": {"from": "regions", "startWith": "$r", "connectFromField": "r",
+                                  "connectToField": "_id", "as": "tree"}}
+            ]}}
+        ]}}
+    ]
+    assert mongo_service.referenced_collections(pipeline) == {"customers", "refunds", "regions"}
+    assert mongo_service.referenced_collections([{"$facet": {"all": [{"$unionWith": "returns"}]}}]) == {"returns"}
+
+    for changed in ("customers", "refunds", "regions"):
+        asyncio.run(mongo_service.aggregate_collection("orders", pipeline))
+        mongo_service.invalidate_collection_cache(changed)
+    asyncio.run(mongo_service.aggregate_collection("orders", pipeline))
+    mongo_service.invalidate_collection_cache("unrelated")
+    asyncio.run(mongo_service.aggregate_collection("orders", pipeline))
+
+    assert len(orders) == 4
@@ -0,0 +1,73 @@
+import asyncio
+
+from utils.background import cancel_all, rerun_if_running, spawn, spawn_coalesced
+
+
+def test_spawn_deduplicates_running_tasks_by_key():
+    async def scenario():
+        started = []
+
+        async def work(tag):
+            started.append(tag)
+            await asyncio.sleep(1)
+
+        first = spawn(work("first"), key="job")
+        second = spawn(work("second"), key="job")
+        await asyncio.sleep(0)
+        await cancel_all()
+        return first, second, started
+
+    first, second, started = asyncio.run(scenario())
+    assert first is second
+    assert started == ["first"]
+
+
+def test_requests_during_a_coalesced_run_add_one_rerun():
+    async def scenario():
+        runs = []
+
+        async def recompute():
+            runs.append(len(runs))
+            await asyncio.sleep(0.02)
+
+        first = spawn_coalesced(recompute, key="stats")
+        await asyncio.sleep(0)
+        second = spawn_coalesced(recompute, key="stats")
+        rerun_if_running("stats")
+        await first
+        rerun_if_running("stats")
+        return first, second, runs
+
+    first, second, runs = asyncio.run(scenario())
+    assert first is second
+    assert runs == [0, 1]
+
+
+def test_cancel_all_stops_every_background_task():
+    async def scenario():
+        async def forever():
+            while True:
+                await asyncio.sleep(0.01)
+
+        tasks = [spawn(forever(), key="loop"), spawn(forever())]
+        await asyncio.sleep(0.02)
+        await cancel_all()
+        return tasks
+
+    assert all(task.cancelled() for task in asyncio.run(scenario()))
+
+
+def test_lifespan_shutdown_leaves_no_background_tasks(monkeypatch, tmp_path):
+    import main
+    from utils import background
+    from utils.spool import write_spool
+
+    monkeypatch.setattr(write_spool, "directory", str(tmp_path))
+
+    async def scenario():
+        async with main.lifespan(main.app):
+            await asyncio.sleep(0)
+            assert background._tasks
+        return dict(background._tasks)
+
+    assert asyncio.run(scenario()) == {}
@@ -0,0 +1,45 @@
+import asyncio
+
+from services import supabase_service
+
+
+def test_batch_reports_each_item_and_shares_schema_lookups(client, fakes, monkeypatch):
+    mongo, postgres = fakes
+    asyncio.run(mongo["people"].insert_one({"name": "ada", "age": 36}))
+    postgres.tables["sales"] = [{"region": "north", "total": 10}, {"region": "south", "total": 20}]
+
+    lookups = []
+    original = supabase_service.get_table_columns
+
+    async def get_table_columns(table_name, required=()):
+        lookups.append((table_name, sorted(required)))
+        return await original(table_name, required)
+
+    monkeypatch.setattr(supabase_service, "get_table_columns", get_table_columns)
+
+    response = client.post("/api/batch/query", json={"queries": [
+        {"backend": "supabase", "dataset": "sales", "params": {"limit": 1}},
+        {"backend": "supabase", "dataset": "sales", "params": {"page": 2, "limit": 1}},
+        {"backend": "mongodb", "dataset": "people"},
+        {"backend": "supabase", "dataset": "sales", "params": {"fields": ["missing"]}},
+    ]})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["succeeded"], body["failed"]) == (3, 1)
+    assert [item["status_code"] for item in body["results"]] == [200, 200, 200, 400]
+    assert [item["result"]["data"] for item in body["results"][:2]] == [
+        [{"region": "north", "total": 10}], [{"region": "south", "total": 20}]
+    ]
+    assert body["results"][2]["result"]["data"][0]["name"] == "ada"
+    # The item naming an unknown field reads the schema again before failing
+    assert lookups == [("sales", []), ("sales", ["missing"])]
+
+
+def test_empty_and_oversized_batches_are_rejected(client, monkeypatch):
+    import handlers.batch_handler
+
+    assert client.post("/api/batch/query", json={"queries": []}).status_code == 400
+    monkeypatch.setattr(handlers.batch_handler, "BATCH_QUERY_MAX_ITEMS", 1)
+    item = {"backend": "mongodb", "dataset": "people"}
+    assert client.post("/api/batch/query", json={"queries": [item, item]}).status_code == 400
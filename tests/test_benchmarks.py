@@ -0,0 +1,45 @@
+import sys
+
+import pandas as pd
+
+from benchmarks import run
+from benchmarks.datasets import generate_frame
+
+
+def test_percentile_is_nearest_rank():
+    values = [float(value) for value in range(1, 101)]
+    assert run.percentile(values, 0.50) == 50
+    assert run.percentile(values, 0.99) == 99
+    assert run.percentile([3.0], 0.99) == 3
+    assert run.percentile([], 0.5) == 0
+
+
+def test_compare_flags_only_regressions_beyond_tolerance():
+    baseline = {"mongo_query": {"rows_per_sec": 1000, "p50_ms": 2.0, "p99_ms": 10.0, "peak_rss_mb": 100}}
+    results = {
+        "mongo_query": {"rows_per_sec": 850, "p50_ms": 2.1, "p99_ms": 8.0, "peak_rss_mb": 100},
+        "upload": {"rows_per_sec": 1}
+    }
+    regressions = run.compare(results, baseline, tolerance=0.10)
+    assert regressions == ["mongo_query.rows_per_sec: 1000 -> 850 (-15.0%)"]
+    assert results["mongo_query"]["change"] == {"rows_per_sec": -15.0, "p50_ms": 5.0, "p99_ms": -20.0, "peak_rss_mb": 0.0}
+    assert "change" not in results["upload"]
+
+
+def test_generated_datasets_are_reproducible():
+    first = generate_frame(50, 6, seed=7)
+    pd.testing.assert_frame_equal(first, generate_frame(50, 6, seed=7))
+    assert not first.equals(generate_frame(50, 6, seed=8))
+    assert first.shape == (50, 6)
+
+
+def test_every_scenario_runs_against_the_fakes(monkeypatch):
+    monkeypatch.setattr(sys, "argv", [
+        "run", "--rows", "200", "--columns", "4", "--iterations", "10",
+        "--upload-iterations", "1", "--warmup", "1", "--concurrency", "2"
+    ])
+    results = run.run_workers(run.parse_args())
+    assert list(results) == list(run.SCENARIOS)
+    for scenario, result in results.items():
+        assert (scenario, result["errors"]) == (scenario, 0)
+        assert result["operations"] > 0
@@ -0,0 +1,30 @@
+from utils.cache import StatementCacheStats, TTLCache
+
+
+def test_ttl_cache_counts_hits_and_expires(monkeypatch):
+    import utils.cache
+
+    now = [100.0]
+    monkeypatch.setattr(utils.cache.time, "monotonic", lambda: now[0])
+    cache = TTLCache(ttl=10, max_entries=2)
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    now[0] += 11
+    assert cache.get("a") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_statement_stats_mirror_an_lru():
+    stats = StatementCacheStats(capacity=2)
+    hits = [stats.record(query) for query in ("q1", "q2", "q1", "q3", "q2")]
+    assert hits == [False, False, True, False, False]
+    assert stats.stats()["cached_statements"] == 2
+
+
+def test_statement_estimate_is_not_exported_as_a_cache():
+    import main
+    from utils.metrics import metrics
+
+    lines = metrics.render().splitlines()
+    assert not any('cache="supabase_statements"' in line for line in lines)
+    assert "# TYPE supabase_statement_cache_estimated_hits_total counter" in lines
@@ -0,0 +1,124 @@
+import asyncio
+
+import pandas as pd
+
+from benchmarks.fakes import FakeCursor
+from schemas.schema import QueryParams
+from services import mongo_service, supabase_service
+from utils.serialization import loads
+
+
+def catalog_entry(df: pd.DataFrame) -> dict:
+    return {
+        "source_filename": "people.csv",
+        "content_hash": "0" * 64,
+        "byte_size": 100,
+        "row_count": len(df),
+        "schema": [{"name": str(col), "type": str(dtype)} for col, dtype in df.dtypes.items()],
+        "load_timings_ms": {}
+    }
+
+
+def stored_supabase_schema(postgres) -> list:
+    upserts = [args for query, args in postgres.statements if f'INSERT INTO "{supabase_service.CATALOG_TABLE}"' in query]
+    return loads(upserts[-1][1])
+
+
+async def upload_table(name: str, df: pd.DataFrame) -> None:
+    await supabase_service.create_table_and_insert(name, df.copy(deep=False))
+    await supabase_service.record_catalog_entry(name, catalog_entry(df))
+
+
+def test_subset_append_keeps_the_full_table_schema(fakes):
+    _, postgres = fakes
+    full = pd.DataFrame({"name": ["a", "b"], "age": [30, 40], "score": [1.5, 2.5]})
+
+    async def scenario():
+        await upload_table("people", full)
+        await upload_table("people", full[["name"]])
+        return await supabase_service.get_table_columns("people")
+
+    columns = asyncio.run(scenario())
+    assert stored_supabase_schema(postgres) == [
+        {"name": "name", "type": "TEXT"},
+        {"name": "age", "type": "BIGINT"},
+        {"name": "score", "type": "DOUBLE PRECISION"},
+        {"name": "created_at", "type": "TIMESTAMP"}
+    ]
+    assert columns == ["name", "age", "score", "created_at"]
+
+
+def test_table_columns_come_from_the_table_not_the_catalog(fakes):
+    async def scenario():
+        await upload_table("people", pd.DataFrame({"name": ["a"], "age": [30]}))
+        supabase_service.catalog_cache.clear()
+        supabase_service.catalog_cache.set(("entry", "people"), {"name": "people", "schema": [{"name": "stale"}]})
+        return await supabase_service.get_table_columns("people")
+
+    assert asyncio.run(scenario()) == ["name", "age", "created_at"]
+
+
+def test_first_mongo_catalog_entry_counts_existing_documents(fakes):
+    mongo, _ = fakes
+    collection = mongo_service.MONGO_COLLECTION
+    df = pd.DataFrame({"name": ["a", "b"], "age": [30, 40]})
+
+    async def scenario():
+        for legacy in ({"name": "x", "city": "Oslo"}, {"name": "y", "city": "Rome"}, {"name": "z", "city": "Lima"}):
+            await mongo[collection].insert_one(legacy)
+        for _ in range(2):
+            await mongo_service.insert_many_mongo(df.to_dict(orient="records"))
+            await mongo_service.record_catalog_entry(catalog_entry(df), collection)
+        return await mongo[mongo_service.CATALOG_COLLECTION].find_one({"_id": collection})
+
+    entry = asyncio.run(scenario())
+    assert entry["row_count"] == 7
+    assert entry["upload_count"] == 2
+    assert [column["name"] for column in entry["schema"]] == ["name", "city", "age"]
+
+
+def test_stale_table_schema_is_refreshed_for_unknown_filters(fakes):
+    async def scenario():
+        await upload_table("people", pd.DataFrame({"name": ["a"], "age": [30]}))
+        # Cached by a worker before another one added "age"
+        supabase_service.catalog_cache.set(("columns", "people"), ["name"])
+        unfiltered = await supabase_service.get_table_columns("people")
+        return unfiltered, await supabase_service.prepare_table_query("people", QueryParams(filters={"age": 30}))
+
+    unfiltered, (where_clause, values, _, _) = asyncio.run(scenario())
+    assert unfiltered == ["name"]
+    assert (where_clause, values) == ('"age" = $1', [30])
+
+
+def test_stale_collection_entry_is_refreshed_for_unknown_filters(fakes):
+    mongo, _ = fakes
+    collection = mongo["people"]
+    filters = []
+
+    def find(query=None, projection=None, **kwargs):
+        filters.append(query)
+        return FakeCursor(collection.documents)
+
+    collection.find = find
+
+    async def scenario():
+        await collection.insert_one({"name": "a", "age": 30})
+        await mongo_service.record_catalog_entry(catalog_entry(pd.DataFrame({"name": ["a"], "age": [30]})), "people")
+        # Cached by a worker before another one catalogued "age"
+        mongo_service.catalog_cache.set(("entry", "people"), {"name": "people", "schema": [{"name": "name"}]})
+        await mongo_service.execute_collection_page("people", QueryParams(filters={"age": 30}))
+
+    asyncio.run(scenario())
+    assert filters == [{"age": 30}]
+
+
+def test_supabase_catalog_is_upserted_in_one_statement(fakes):
+    _, postgres = fakes
+    df = pd.DataFrame({"name": ["a", "b"]})
+    asyncio.run(upload_table("people", df))
+
+    catalog_statements = [query for query, _ in postgres.statements if supabase_service.CATALOG_TABLE in query]
+    [upsert] = [query for query in catalog_statements if "INSERT" in query]
+    assert 'VALUES ($1, $2::jsonb, (SELECT COUNT(*) FROM "people")' in upsert
+    assert "row_count = catalog.row_count + $3" in upsert
+    assert not any(query.lstrip().startswith("SELECT") for query in catalog_statements)
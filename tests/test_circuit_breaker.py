@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+from pymongo.errors import ConnectionFailure
+
+from utils import circuit_breaker
+from utils.admission import admit
+from utils.background import cancel_all
+from utils.circuit_breaker import CircuitBreaker, CircuitOpen
+
+
+def breaker(**kwargs) -> CircuitBreaker:
+    options = {"failure_threshold": 2, "reset_seconds": 0.05, "max_reset_seconds": 1, "enabled": True}
+    options.update(kwargs)
+    return CircuitBreaker("MongoDB", (ConnectionFailure,), **options)
+
+
+def test_consecutive_outages_open_the_circuit():
+    circuit = breaker()
+    circuit.record_failure(ConnectionFailure("refused"))
+    circuit.check()
+    circuit.record_failure(ConnectionFailure("refused"))
+
+    with pytest.raises(CircuitOpen) as rejected:
+        circuit.check()
+    assert rejected.value.retry_after == 1
+    assert rejected.value.to_http().status_code == 503
+    assert circuit.stats()["state"] == "open"
+    assert circuit.stats()["last_error"] == "ConnectionFailure: refused"
+
+
+def test_trial_call_after_the_reset_delay(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", lambda: now[0])
+    circuit = breaker()
+    for _ in range(2):
+        circuit.record_failure(ConnectionFailure("refused"))
+
+    now[0] += 0.06
+    circuit.check()
+    assert circuit.state == "half_open"
+    circuit.record_failure(ConnectionFailure("still down"))
+    assert (circuit.state, circuit.current_reset) == ("open", 0.1)
+
+    now[0] += 0.11
+    circuit.check()
+    circuit.record_success()
+    assert (circuit.state, circuit.current_reset) == ("closed", 0.05)
+
+
+def test_background_probe_closes_the_circuit():
+    circuit = breaker(reset_seconds=0.01)
+    attempts = []
+
+    async def probe():
+        attempts.append(len(attempts))
+        if len(attempts) == 1:
+            raise ConnectionFailure("still down")
+
+    circuit.probe = probe
+
+    async def scenario():
+        for _ in range(2):
+            circuit.record_failure(ConnectionFailure("refused"))
+        with pytest.raises(CircuitOpen):
+            circuit.check()
+        for _ in range(50):
+            if circuit.state == "closed":
+                break
+            await asyncio.sleep(0.01)
+        await cancel_all()
+
+    asyncio.run(scenario())
+    assert circuit.state == "closed"
+    assert attempts == [0, 1]
+
+
+def test_admit_counts_outages_but_not_query_errors(monkeypatch):
+    circuit = breaker()
+    monkeypatch.setitem(circuit_breaker.breakers, "mongodb", circuit)
+
+    async def fail(error):
+        async with admit("mongodb", "query"):
+            raise error
+
+    async def scenario():
+        for error in (ConnectionFailure("refused"), ValueError("bad filter"), ConnectionFailure("refused")):
+            with pytest.raises(type(error)):
+                await fail(error)
+        assert circuit.state == "closed"
+        with pytest.raises(ConnectionFailure):
+            await fail(ConnectionFailure("refused"))
+        with pytest.raises(CircuitOpen):
+            await fail(ValueError("never runs"))
+
+    asyncio.run(scenario())
@@ -0,0 +1,97 @@
+import asyncio
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from services import mongo_service, supabase_service
+from utils.column_stats import compute_column_stats, compute_dataframe_stats, hll_distinct_estimate
+from utils.serialization import dumps
+
+
+@pytest.mark.parametrize("distinct", [0, 1, 100, 50_000])
+def test_hll_estimate_is_close(distinct):
+    series = pd.Series(np.arange(distinct).repeat(2))
+    assert hll_distinct_estimate(series) == pytest.approx(distinct, rel=0.03)
+
+
+def test_numeric_stats_cover_the_whole_column():
+    series = pd.Series([1.0, 2.0, None, 3.0, np.inf] + [4.0] * 200, name="score")
+    stats = compute_column_stats(series)
+    assert (stats["null_count"], stats["non_null_count"]) == (1, 204)
+    assert (stats["min"], stats["max"]) == (1.0, 4.0)
+    assert sum(stats["histogram"]["counts"]) == 203
+    assert stats["top_values"][0] == {"value": 4.0, "count": 200}
+
+
+def test_stats_are_json_serializable():
+    df = pd.DataFrame({
+        "when": pd.to_datetime(["2024-01-01", "2024-02-01", None]),
+        "flag": [True, False, True],
+        "nested": [{"a": 1}, {"a": 2}, None],
+        "empty": [None, None, None],
+    })
+    stats = compute_dataframe_stats(df)
+    by_name = {column["name"]: column for column in stats["columns"]}
+
+    assert (by_name["when"]["min"], by_name["when"]["max"]) == ("2024-01-01T00:00:00", "2024-02-01T00:00:00")
+    assert "histogram" not in by_name["flag"]
+    assert by_name["nested"]["distinct_estimate"] == 2
+    assert by_name["empty"]["non_null_count"] == 0
+    dumps(stats)
+
+
+def test_append_marks_collection_stats_stale_without_recomputing(fakes, monkeypatch):
+    mongo, _ = fakes
+    recomputed = []
+
+    async def recompute(collection_name):
+        recomputed.append(collection_name)
+
+    monkeypatch.setattr(mongo_service, "recompute_collection_stats", recompute)
+
+    async def scenario():
+        for rows in (3, 2):
+            await mongo_service.record_ingest_stats(compute_dataframe_stats(pd.DataFrame({"a": range(rows)})), "people")
+        await asyncio.sleep(0)
+        return await mongo[mongo_service.STATS_COLLECTION].find_one({"_id": "people"})
+
+    stored = asyncio.run(scenario())
+    assert (stored["row_count"], stored["stale"]) == (5, True)
+    assert stored["columns"][0]["non_null_count"] == 3
+    assert recomputed == []
+
+
+def test_append_marks_table_stats_stale_in_the_upsert(fakes):
+    _, postgres = fakes
+    asyncio.run(supabase_service.record_ingest_stats("people", compute_dataframe_stats(pd.DataFrame({"a": [1]}))))
+    [upsert] = [query for query, _ in postgres.statements if f'INSERT INTO "{supabase_service.STATS_TABLE}"' in query]
+    assert "row_count = stored.row_count + EXCLUDED.row_count" in upsert
+    assert "'stale', true" in upsert
+
+
+def test_append_during_a_recompute_runs_it_again(fakes, monkeypatch):
+    from handlers.mongo_handler import MongoHandler
+
+    runs = []
+
+    async def recompute(collection_name):
+        runs.append(collection_name)
+        await asyncio.sleep(0.02)
+
+    async def get_stats(collection_name):
+        return {}
+
+    monkeypatch.setattr("handlers.mongo_handler.recompute_collection_stats", recompute)
+    monkeypatch.setattr("handlers.mongo_handler.get_collection_stats", get_stats)
+
+    async def scenario():
+        stats = compute_dataframe_stats(pd.DataFrame({"a": [1]}))
+        await mongo_service.record_ingest_stats(stats, "people")
+        await MongoHandler.handle_get_collection_stats("people", recompute=True)
+        await asyncio.sleep(0)
+        await mongo_service.record_ingest_stats(stats, "people")
+        await asyncio.sleep(0.1)
+
+    asyncio.run(scenario())
+    assert runs == ["people", "people"]
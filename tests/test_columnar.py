@@ -0,0 +1,60 @@
+import asyncio
+
+import msgpack
+import pyarrow as pa
+import pytest
+from bson import ObjectId
+
+from utils.columnar import to_arrow_ipc, to_columns
+from utils.responses import negotiate_format
+
+
+@pytest.mark.parametrize("accept, expected", [
+    (None, "json"),
+    ("*/*", "json"),
+    ("application/vnd.apache.arrow.stream", "arrow"),
+    ("application/x-msgpack", "msgpack"),
+    ("application/msgpack;q=0.5, application/vnd.apache.arrow.stream;q=0.9", "arrow"),
+    ("application/json;q=1, application/msgpack;q=0.2", "json"),
+])
+def test_negotiate_format(accept, expected):
+    assert negotiate_format(accept) == expected
+
+
+def test_to_columns_pads_missing_keys():
+    owner = ObjectId()
+    assert to_columns([{"a": 1}, {"b": owner}]) == {"a": [1, None], "b": [None, str(owner)]}
+
+
+def test_mixed_type_columns_fall_back_to_text():
+    table = pa.ipc.open_stream(to_arrow_ipc([{"v": 1}, {"v": "one"}])).read_all()
+    assert table.column("v").to_pylist() == ["1", "one"]
+
+
+@pytest.fixture
+def people(fakes):
+    mongo, _ = fakes
+
+    async def fill():
+        for age in (30, 40):
+            await mongo["people"].insert_one({"name": f"user{age}", "age": age})
+
+    asyncio.run(fill())
+
+
+def test_arrow_response(client, people):
+    response = client.get(
+        "/api/mongodb/collections/people/query", headers={"Accept": "application/vnd.apache.arrow.stream"}
+    )
+    assert response.status_code == 200
+    assert response.headers["x-total-count"] == "2"
+    columns = pa.ipc.open_stream(response.content).read_all().to_pydict()
+    assert (columns["name"], columns["age"]) == (["user30", "user40"], [30, 40])
+
+
+def test_msgpack_response(client, people):
+    response = client.get("/api/mongodb/collections/people/query", headers={"Accept": "application/msgpack"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/msgpack"
+    columns = msgpack.unpackb(response.content)
+    assert (columns["name"], columns["age"]) == (["user30", "user40"], [30, 40])
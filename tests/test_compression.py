@@ -0,0 +1,63 @@
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from utils.compression import CompressionMiddleware, choose_encoding, zstandard
+
+BODY = b'{"data":[' + b",".join(b'{"n":%d}' % n for n in range(2000)) + b"]}"
+
+
+async def large(request):
+    return Response(BODY, media_type="application/json")
+
+
+async def small(request):
+    return Response(b"{}", media_type="application/json")
+
+
+async def streamed(request):
+    async def chunks():
+        for start in range(0, len(BODY), 4096):
+            yield BODY[start:start + 4096]
+    return StreamingResponse(chunks(), media_type="application/json")
+
+
+async def encoded(request):
+    return Response(BODY, headers={"Content-Encoding": "identity"})
+
+
+@pytest.fixture
+def client():
+    app = Starlette(routes=[Route(f"/{view.__name__}", view) for view in (large, small, streamed, encoded)])
+    app.add_middleware(CompressionMiddleware, minimum_size=500, offload_size=1 << 20)
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("accept_encoding, expected", [
+    ("", None),
+    ("gzip", "gzip"),
+    ("gzip;q=0, deflate", None),
+    ("br, gzip;q=0.5", "gzip"),
+])
+def test_choose_encoding(accept_encoding, expected):
+    assert choose_encoding(accept_encoding) == expected
+
+
+@pytest.mark.parametrize("path", ["/large", "/streamed"])
+def test_bodies_are_gzipped(client, path):
+    response = client.get(path, headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert response.content == BODY
+
+
+def test_small_and_already_encoded_bodies_pass_through(client):
+    assert "content-encoding" not in client.get("/small", headers={"Accept-Encoding": "gzip"}).headers
+    assert client.get("/encoded", headers={"Accept-Encoding": "gzip"}).headers["content-encoding"] == "identity"
+
+
+@pytest.mark.skipif(zstandard is None, reason="zstandard is not installed")
+def test_zstd_is_preferred():
+    assert choose_encoding("gzip, zstd") == "zstd"
@@ -0,0 +1,85 @@
+import asyncio
+import time
+
+import pytest
+
+from utils import deadlines
+from utils.deadlines import DeadlineExceeded, deadline_var, operation_id_var, remaining_ms, set_deadline
+from utils.disconnect import DisconnectCancellationMiddleware
+
+
+def test_remaining_time_follows_the_request_deadline(monkeypatch):
+    monkeypatch.setattr(deadlines, "QUERY_MAX_TIMEOUT_MS", 1000)
+
+    async def scenario():
+        outside = remaining_ms(5000)
+        set_deadline(60_000)
+        capped = remaining_ms(5000)
+        deadline_var.set(time.monotonic() - 1)
+        with pytest.raises(DeadlineExceeded):
+            remaining_ms(5000)
+        return outside, capped
+
+    outside, capped = asyncio.run(scenario())
+    assert outside == 1000
+    assert 900 < capped <= 1000
+
+
+def test_deadline_exceeded_maps_to_504(client, monkeypatch):
+    from services import mongo_service
+
+    async def too_slow(*args, **kwargs):
+        raise DeadlineExceeded()
+
+    monkeypatch.setattr(mongo_service, "execute_collection_page", too_slow)
+    response = client.get("/api/mongodb/collections/people/query", params={"timeout_ms": 5})
+    assert response.status_code == 504
+
+
+def run_middleware(path: str):
+    events = []
+
+    async def app(scope, receive, send):
+        events.append(("operation", operation_id_var.get() is not None))
+        await receive()
+        try:
+            await asyncio.sleep(1)
+            events.append("finished")
+        except asyncio.CancelledError:
+            events.append("cancelled")
+            raise
+
+    async def scenario():
+        messages = [{"type": "http.request", "body": b"", "more_body": False}, {"type": "http.disconnect"}]
+
+        async def receive():
+            await asyncio.sleep(0.01)
+            return messages.pop(0) if messages else await asyncio.sleep(10)
+
+        async def send(message):
+            pass
+
+        middleware = DisconnectCancellationMiddleware(app, skip_prefixes=("/api/upload",))
+        started = time.perf_counter()
+        await asyncio.wait_for(middleware({"type": "http", "method": "GET", "path": path}, receive, send), 2)
+        return time.perf_counter() - started
+
+    return asyncio.run(scenario()), events
+
+
+def test_disconnect_cancels_the_handler():
+    elapsed, events = run_middleware("/api/mongodb/collections/people/query")
+    assert events == [("operation", True), "cancelled"]
+    assert elapsed < 0.5
+
+
+def test_skipped_prefixes_run_to_completion():
+    _, events = run_middleware("/api/upload/upload")
+    assert events == [("operation", False), "finished"]
+
+
+def test_pooled_connections_have_no_blanket_statement_timeout():
+    # Deadlines apply per query; uploads and stats recomputes share the pool
+    from utils.database_connections import supabase_connect_kwargs
+
+    assert "statement_timeout" not in supabase_connect_kwargs()["server_settings"]
@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+from benchmarks.fakes import FakeCursor, FakePostgresConnection, FakeRecord
+from schemas.schema import FacetParams
+from services import mongo_service, supabase_service
+from services.supabase_service import build_facet_query
+
+
+def test_facet_query_uses_one_grouping_sets_scan():
+    query, query_params = build_facet_query(
+        "people", FacetParams(fields=["city", "team"], top_n=5, filters={"team": "red"}), ["city", "team"],
+        ["city", "team", "salary"]
+    )
+    assert 'GROUP BY GROUPING SETS (("city"), ("team"))' in query
+    assert 'GROUPING("city", "team") AS "__facet"' in query
+    assert 'WHERE "__rank" <= $2' in query
+    assert query_params == ["red", 5]
+
+
+@pytest.fixture
+def people(fakes, monkeypatch):
+    _, postgres = fakes
+    postgres.tables["people"] = [{"city": "Oslo", "team": "red"}]
+    queries = []
+
+    async def fetch(self, query, *args, **kwargs):
+        if "GROUPING SETS" not in query:
+            return await original(self, query, *args, **kwargs)
+        queries.append(query)
+        # GROUPING() sets the bit of each column left out of the set
+        return [
+            FakeRecord(city="Oslo", team=None, __facet=1, __count=3),
+            FakeRecord(city="Rome", team=None, __facet=1, __count=1),
+            FakeRecord(city=None, team="red", __facet=2, __count=4),
+        ]
+
+    original = FakePostgresConnection.fetch
+    monkeypatch.setattr(FakePostgresConnection, "fetch", fetch)
+    supabase_service.facet_cache.clear()
+    yield queries
+    supabase_service.facet_cache.clear()
+
+
+def test_table_facets_are_split_by_grouping_mask_and_cached(people):
+    params = FacetParams(fields=["city", "team", "city"])
+    facets = asyncio.run(supabase_service.get_table_facets("people", params))
+    assert facets == {
+        "city": [{"value": "Oslo", "count": 3}, {"value": "Rome", "count": 1}],
+        "team": [{"value": "red", "count": 4}]
+    }
+    assert asyncio.run(supabase_service.get_table_facets("people", params)) == facets
+    assert len(people) == 1
+
+
+def test_collection_facets_map_positional_branches(fakes, monkeypatch):
+    mongo, _ = fakes
+    collection = mongo["people"]
+    pipelines = []
+
+    original = collection.aggregate
+
+    def aggregate(pipeline, **kwargs):
+        if "$facet" not in pipeline[-1]:
+            return original(pipeline, **kwargs)
+        pipelines.append(pipeline)
+        return FakeCursor([{"f0": [{"_id": "Oslo", "count": 2}], "f1": [{"_id": "red", "count": 2}]}])
+
+    asyncio.run(collection.insert_one({"city": "Oslo", "team": "red"}))
+    monkeypatch.setattr(collection, "aggregate", aggregate)
+    mongo_service.aggregate_cache.clear()
+
+    facets = asyncio.run(mongo_service.get_collection_facets("people", FacetParams(fields=["city", "team"], top_n=3)))
+    mongo_service.aggregate_cache.clear()
+
+    assert facets == {"city": [{"value": "Oslo", "count": 2}], "team": [{"value": "red", "count": 2}]}
+    assert pipelines[0][-1]["$facet"]["f1"] == [{"$sortByCount": "$team"}, {"$limit": 3}]
+
+
+@pytest.mark.parametrize("fields, message", [([], "at least one"), (["country"], "Unknown facet")])
+def test_invalid_facet_requests_are_rejected(people, fields, message):
+    with pytest.raises(ValueError, match=message):
+        asyncio.run(supabase_service.get_table_facets("people", FacetParams(fields=fields)))
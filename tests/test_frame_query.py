@@ -0,0 +1,175 @@
+import asyncio
+import datetime
+
+import pytest
+
+from schemas.schema import QueryParams
+from utils.frame_query import UnsupportedFrameQuery, build_frame, pg_float_text, pg_text, run_frame_query
+from utils.hot_datasets import HotDatasetStore, hot_datasets
+from utils.serialization import dumps, loads
+
+CREATED = datetime.datetime(2024, 1, 2, 3, 4, 5, 250000)
+ROWS = [
+    {"n": 5, "score": 5.0, "label": "alpha", "flag": True, "created_at": CREATED},
+    {"n": None, "score": 1.5, "label": "beta", "flag": None, "created_at": CREATED},
+    {"n": 7, "score": None, "label": None, "flag": False, "created_at": CREATED},
+]
+COLUMNS = list(ROWS[0])
+
+
+def frame_query(params: QueryParams, text_cast: bool = True):
+    frame = build_frame(COLUMNS, [tuple(row.values()) for row in ROWS])
+    return run_frame_query(frame, params, COLUMNS, None, text_cast=text_cast, nulls_first=False)
+
+
+def test_hot_table_json_matches_database_path(fakes, monkeypatch):
+    import services.supabase_service as supabase_service
+
+    _, postgres = fakes
+    postgres.tables["people"] = [dict(row) for row in ROWS]
+    params = QueryParams(page=1, limit=10)
+
+    from_database = asyncio.run(supabase_service.execute_table_query_json("people", params))
+    monkeypatch.setattr(hot_datasets, "all_datasets", True)
+    from_hot_tier = asyncio.run(supabase_service.execute_table_query_json("people", params))
+
+    assert loads(from_hot_tier) == loads(from_database)
+    assert loads(from_hot_tier)["data"][0]["n"] == 5
+    hot_datasets.invalidate(("supabase", "people"))
+
+
+def test_hot_table_result_keeps_driver_types(fakes, monkeypatch):
+    import services.supabase_service as supabase_service
+
+    _, postgres = fakes
+    postgres.tables["typed"] = [dict(row) for row in ROWS]
+    monkeypatch.setattr(hot_datasets, "all_datasets", True)
+
+    result = asyncio.run(supabase_service.execute_table_query("typed", QueryParams(page=1, limit=10)))
+
+    assert result.data == ROWS
+    assert type(result.data[0]["n"]) is int
+    assert type(result.data[0]["created_at"]) is datetime.datetime
+    hot_datasets.invalidate(("supabase", "typed"))
+
+
+def test_hot_collection_serializes_datetimes(fakes, monkeypatch):
+    import services.mongo_service as mongo_service
+
+    mongo, _ = fakes
+    asyncio.run(mongo["events"].insert_many([dict(row) for row in ROWS]))
+    monkeypatch.setattr(hot_datasets, "all_datasets", True)
+
+    body = loads(asyncio.run(mongo_service.query_collection_json("events", QueryParams(page=1, limit=10))))
+
+    assert [row["created_at"] for row in body["data"]] == ["2024-01-02T03:04:05.250000"] * 3
+    assert [row["n"] for row in body["data"]] == [5, None, 7]
+    hot_datasets.invalidate(("mongodb", "events"))
+
+
+def test_nullable_integers_stay_integers():
+    _, data = frame_query(QueryParams(page=1, limit=10, filters={"n": {"gte": 5}}))
+
+    assert [row["n"] for row in data] == [5, 7]
+    assert all(type(row["n"]) is int for row in data)
+    dumps(data)
+
+
+@pytest.mark.parametrize("search, columns, expected", [
+    ("5.0", ["n", "score"], []),
+    ("5", ["n"], ["alpha"]),
+    ("1.5", ["n", "score"], ["beta"]),
+    ("true", ["flag"], ["alpha"]),
+    ("03:04:05.25", ["created_at"], ["alpha", "beta", None]),
+    ("05.250", ["created_at"], []),
+])
+def test_search_matches_postgres_text_casts(search, columns, expected):
+    _, data = frame_query(QueryParams(page=1, limit=10, search=search, search_columns=columns))
+
+    assert [row["label"] for row in data] == expected
+
+
+def test_like_wildcards_fall_back_to_the_database():
+    with pytest.raises(UnsupportedFrameQuery):
+        frame_query(QueryParams(page=1, limit=10, search="al%a"))
+
+
+def test_text_sort_falls_back_to_the_database():
+    with pytest.raises(UnsupportedFrameQuery):
+        frame_query(QueryParams(page=1, limit=10, sort_by="label"))
+
+
+@pytest.mark.parametrize("value, text", [
+    (5.0, "5"),
+    (-0.0, "-0"),
+    (0.0001, "0.0001"),
+    (0.00001, "1e-05"),
+    (123456789012345.0, "123456789012345"),
+    (1e15, "1e+15"),
+    (1.5e16, "1.5e+16"),
+    (float("inf"), "Infinity"),
+])
+def test_pg_float_text(value, text):
+    assert pg_float_text(value) == text
+
+
+def test_pg_text():
+    assert pg_text(True) == "true"
+    assert pg_text(CREATED) == "2024-01-02 03:04:05.25"
+    assert pg_text(datetime.datetime(2024, 1, 2)) == "2024-01-02 00:00:00"
+
+
+def test_hot_frames_expire(monkeypatch):
+    store = HotDatasetStore("*", 100, 1024 * 1024, 60, max_age_seconds=30)
+    loads_done = []
+
+    async def loader(max_rows):
+        loads_done.append(max_rows)
+        return build_frame(COLUMNS, [tuple(row.values()) for row in ROWS])
+
+    now = [1000.0]
+    monkeypatch.setattr("utils.hot_datasets.time.monotonic", lambda: now[0])
+
+    asyncio.run(store.get("key", loader))
+    asyncio.run(store.get("key", loader))
+    assert len(loads_done) == 1
+
+    now[0] += 31
+    asyncio.run(store.get("key", loader))
+    assert len(loads_done) == 2
+    assert store.stats()["datasets"] == 1
+
+
+def test_hot_collection_leaves_out_keys_a_document_lacks(fakes, monkeypatch):
+    import services.mongo_service as mongo_service
+
+    mongo, _ = fakes
+    documents = [{"name": "a", "age": 1}, {"name": "b"}, {"name": "c", "age": None}]
+    asyncio.run(mongo["sparse"].insert_many([dict(document) for document in documents]))
+    monkeypatch.setattr(hot_datasets, "all_datasets", True)
+
+    body = loads(asyncio.run(mongo_service.query_collection_json("sparse", QueryParams(page=1, limit=10))))
+    assert [{key: value for key, value in row.items() if key != "_id"} for row in body["data"]] == documents
+
+    body = loads(asyncio.run(mongo_service.query_collection_json("sparse", QueryParams(fields=["age"]))))
+    assert body["data"] == [{"age": 1}, {}, {"age": None}]
+    hot_datasets.invalidate(("mongodb", "sparse"))
+
+
+def test_load_locks_are_dropped_once_no_load_is_running():
+    store = HotDatasetStore("*", 100, 1024 * 1024, 60, max_age_seconds=30)
+
+    async def too_big(max_rows):
+        return None
+
+    async def broken(max_rows):
+        raise ConnectionError("backend down")
+
+    async def scenario():
+        await asyncio.gather(*(store.get(f"dataset{i}", too_big) for i in range(50)))
+        with pytest.raises(ConnectionError):
+            await store.get("broken", broken)
+        store.invalidate("dataset0")
+
+    asyncio.run(scenario())
+    assert (store._locks, store._lock_users, store._versions) == ({}, {}, {})
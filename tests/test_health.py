@@ -0,0 +1,52 @@
+import asyncio
+
+import main
+from utils import circuit_breaker
+from utils.circuit_breaker import CircuitBreaker
+from utils.health import HealthMonitor
+
+
+def test_status_is_cached_between_checks():
+    monitor = HealthMonitor(interval=30, timeout=0.05)
+    pings = []
+
+    async def ping():
+        pings.append(1)
+
+    async def hang():
+        await asyncio.sleep(1)
+
+    monitor.register("mongodb", ping)
+    monitor.register("supabase", hang)
+    asyncio.run(monitor.check_all())
+
+    assert [monitor.is_connected("mongodb") for _ in range(3)] == [True] * 3
+    assert len(pings) == 1
+    status = monitor.snapshot()["supabase"]
+    assert not status["connected"]
+    assert status["error"].startswith("TimeoutError")
+
+
+def test_open_circuit_is_reported_without_pinging(monkeypatch):
+    monitor = HealthMonitor(interval=30, timeout=1)
+    breaker = CircuitBreaker("MongoDB", (ConnectionError,), failure_threshold=1, reset_seconds=30,
+                             max_reset_seconds=60, enabled=True)
+    breaker.record_failure(ConnectionError("refused"))
+    monkeypatch.setitem(circuit_breaker.breakers, "mongodb", breaker)
+
+    async def ping():
+        raise AssertionError("pinged an open circuit")
+
+    monitor.register("mongodb", ping)
+    asyncio.run(monitor.check("mongodb"))
+    assert monitor.snapshot()["mongodb"]["error"] == "circuit open"
+
+
+def test_health_endpoint_reads_the_cached_status(client, monkeypatch):
+    monitor = HealthMonitor(interval=30, timeout=1)
+    monitor.status = {
+        "mongodb": {"connected": True, "latency_ms": 1.0, "error": None, "checked_at": 0},
+        "supabase": {"connected": False, "latency_ms": None, "error": "circuit open", "checked_at": 0}
+    }
+    monkeypatch.setattr(main, "health_monitor", monitor)
+    assert client.get("/Database_health").json()["status"] == "degraded"
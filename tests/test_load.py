@@ -0,0 +1,85 @@
+import argparse
+import asyncio
+import json
+
+import pytest
+
+from benchmarks import load
+
+
+def load_args(**kwargs) -> argparse.Namespace:
+    options = {"rate": 100, "duration": 1, "requests": None, "replay": False, "speed": 1.0, "seed": 42,
+               "connections": 1, "timeout": 5, "mix": None, "collection": "uploads", "table": "uploads"}
+    options.update(kwargs)
+    return argparse.Namespace(**options)
+
+
+def test_targets_substitute_the_sequence_number():
+    request = load.PreparedRequest({
+        "method": "GET", "path": "/api/mongodb/collections/load_{n}/query",
+        "params": {"page": 1, "filters": {"name": "user{n}"}}
+    })
+    assert request.name == "GET /api/mongodb/collections/load_{n}/query"
+    assert request.target(7) == (
+        "/api/mongodb/collections/load_7/query?page=1&filters=%7B%22name%22%3A+%22user7%22%7D"
+    )
+
+
+def test_upload_requests_carry_a_generated_csv():
+    request = load.PreparedRequest({"path": "/api/upload/upload", "method": "POST", "upload": {"rows": 3, "columns": 2}})
+    assert request.headers["Content-Type"].endswith(f"boundary={load.BOUNDARY}")
+    assert b'filename="load.csv"' in request.body
+    assert request.body.endswith(f"--{load.BOUNDARY}--\r\n".encode())
+
+
+def test_mix_skips_lines_without_a_path(tmp_path):
+    path = tmp_path / "mix.jsonl"
+    path.write_text(json.dumps({"name": "recorded", "method": "GET"}) + "\n\n" + json.dumps({"path": "/health"}) + "\n")
+    assert load.load_mix(str(path)) == [{"path": "/health"}]
+    path.write_text(json.dumps({"name": "recorded"}) + "\n")
+    with pytest.raises(SystemExit):
+        load.load_mix(str(path))
+
+
+def test_schedule_is_open_loop_and_reproducible():
+    requests = [load.PreparedRequest({"path": "/a", "weight": 3}), load.PreparedRequest({"path": "/b", "weight": 1})]
+    plan = load.schedule(requests, load_args(rate=10, duration=2))
+    assert [offset for offset, _ in plan] == [i / 10 for i in range(20)]
+    assert [request.path for _, request in plan] == [
+        request.path for _, request in load.schedule(requests, load_args(rate=10, duration=2))
+    ]
+
+    replayed = [load.PreparedRequest({"path": "/a", "offset_ms": 0}), load.PreparedRequest({"path": "/b", "offset_ms": 500})]
+    assert [offset for offset, _ in load.schedule(replayed, load_args(replay=True, speed=2))] == [0, 0.25]
+
+
+async def serve(delay: float):
+    async def handle(reader, writer):
+        while await reader.readline():
+            while (await reader.readline()) not in (b"\r\n", b""):
+                pass
+            await asyncio.sleep(delay)
+            writer.write(b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n2\r\nok\r\n0\r\n\r\n")
+            await writer.drain()
+        writer.close()
+
+    return await asyncio.start_server(handle, "127.0.0.1", 0)
+
+
+def test_corrected_latency_includes_the_wait_behind_a_slow_server(tmp_path):
+    path = tmp_path / "mix.jsonl"
+    path.write_text(json.dumps({"name": "health", "path": "/health"}) + "\n")
+
+    async def scenario():
+        server = await serve(0.05)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            return await load.run_load(load_args(url=f"http://127.0.0.1:{port}", mix=str(path), requests=4))
+
+    recorder, elapsed = asyncio.run(scenario())
+    report = load.summarize(recorder.samples["health"], elapsed)
+    assert (report["requests"], report["errors"], report["statuses"], report["bytes"]) == (4, 0, {"200": 4}, 8)
+    # One connection, a request every 10 ms and 50 ms per response: the
+    # queue grows while service time stays flat
+    assert report["service_ms"]["max"] < 100
+    assert report["corrected_ms"]["max"] >= 150
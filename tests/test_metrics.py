@@ -0,0 +1,59 @@
+import pytest
+
+from utils.metrics import Counter, Metric, MetricsRegistry
+
+
+def test_metric_requires_samples():
+    with pytest.raises(TypeError):
+        Metric("abstract", "Has no samples")
+
+
+def test_counters_only_go_up():
+    registry = MetricsRegistry()
+    uploads = registry.counter("uploads_total", "Uploads", ("backend",))
+    uploads.inc("mongodb")
+    uploads.inc("mongodb", amount=2)
+    assert not hasattr(Counter, "set")
+    assert 'uploads_total{backend="mongodb"} 3' in registry.render()
+
+
+def test_counter_function_reads_totals_at_scrape_time():
+    registry = MetricsRegistry()
+    totals = {("mongodb", "query"): 1}
+    registry.counter_function("rejected_total", "Shed operations", ("backend", "kind"), lambda: dict(totals))
+    totals[("mongodb", "query")] = 4
+
+    lines = registry.render().splitlines()
+    assert "# TYPE rejected_total counter" in lines
+    assert 'rejected_total{backend="mongodb",kind="query"} 4' in lines
+
+
+def test_failing_counter_function_is_left_out():
+    registry = MetricsRegistry()
+
+    def broken():
+        raise RuntimeError("component gone")
+
+    registry.counter_function("broken_total", "Never readable", (), broken)
+    registry.gauge("up", "Still rendered").set(1)
+    assert registry.render().splitlines()[-1] == "up 1"
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    latency = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        latency.observe(value)
+
+    lines = registry.render().splitlines()
+    assert 'latency_seconds_bucket{le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{le="1.0"} 2' in lines
+    assert 'latency_seconds_bucket{le="+Inf"} 3' in lines
+    assert "latency_seconds_count 3" in lines
+
+
+def test_metric_names_are_unique():
+    registry = MetricsRegistry()
+    registry.counter("uploads_total", "Uploads")
+    with pytest.raises(ValueError):
+        registry.gauge("uploads_total", "Uploads again")
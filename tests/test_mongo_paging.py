@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+from pymongo.errors import OperationFailure
+
+from schemas.schema import QueryParams
+from services import mongo_service
+
+FIELDS = ["name", "age"]
+
+
+@pytest.fixture
+def people(fakes):
+    mongo, _ = fakes
+    collection = mongo["people"]
+    calls = []
+    for aggregate_or_find in ("aggregate", "find"):
+        original = getattr(collection, aggregate_or_find)
+
+        def spy(*args, _name=aggregate_or_find, _original=original, **kwargs):
+            calls.append(_name)
+            return _original(*args, **kwargs)
+
+        setattr(collection, aggregate_or_find, spy)
+
+    async def fill():
+        for age in range(25):
+            await collection.insert_one({"name": f"user{age}", "age": age})
+
+    asyncio.run(fill())
+    return collection, calls
+
+
+def page(params: QueryParams):
+    return asyncio.run(mongo_service.execute_collection_page("people", params, FIELDS))
+
+
+def test_unindexed_sort_uses_the_combined_query(people):
+    _, calls = people
+    total, documents = page(QueryParams(limit=10, sort_by="age"))
+    assert (total, len(documents), calls) == (25, 10, ["aggregate"])
+
+
+@pytest.mark.parametrize("params", [QueryParams(limit=10), QueryParams(limit=10, sort_by="name")])
+def test_indexed_sort_queries_separately(people, params):
+    _, calls = people
+    asyncio.run(mongo_service.create_index("people", "name"))
+    total, documents = page(params)
+    assert (total, len(documents), calls) == (25, 10, ["find"])
+
+
+def test_large_pages_query_separately(people, monkeypatch):
+    _, calls = people
+    monkeypatch.setattr(mongo_service, "QUERY_COMBINED_COUNT_MAX_LIMIT", 5)
+    total, documents = page(QueryParams(limit=10, sort_by="age"))
+    assert (total, len(documents), calls) == (25, 10, ["find"])
+
+
+def test_oversized_combined_result_falls_back(people):
+    collection, calls = people
+
+    def too_large(*args, **kwargs):
+        calls.append("aggregate")
+        raise OperationFailure("BSONObjectTooLarge", code=10334)
+
+    collection.aggregate = too_large
+    total, documents = page(QueryParams(limit=10, sort_by="age"))
+    assert (total, len(documents), calls) == (25, 10, ["aggregate", "find"])
@@ -0,0 +1,43 @@
+import json
+import os
+import subprocess
+import sys
+
+import main
+from benchmarks.startup import HEAVY_MODULES
+
+QUERY_WORKER = f"""
+import asyncio, json, sys
+import main
+from handlers.mongo_handler import MongoHandler
+try:
+    asyncio.run(MongoHandler.handle_get_collection_stats("uploads", recompute=True))
+    recompute = "allowed"
+except ValueError as e:
+    recompute = str(e)
+print(json.dumps({{
+    "loaded": [name for name in {HEAVY_MODULES!r} if name in sys.modules],
+    "routes": [route.path for route in main.app.routes],
+    "recompute": recompute
+}}))
+"""
+
+
+def run_query_profile() -> dict:
+    env = {**os.environ, "APP_PROFILE": "query"}
+    completed = subprocess.run([sys.executable, "-c", QUERY_WORKER], env=env, capture_output=True, text=True)
+    assert completed.returncode == 0, completed.stderr
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def test_query_profile_serves_reads_without_the_upload_stack():
+    result = run_query_profile()
+    assert "pandas" not in result["loaded"]
+    assert "pyarrow" not in result["loaded"]
+    assert not any(path.startswith("/api/upload") for path in result["routes"])
+    assert any(path.startswith("/api/mongodb") for path in result["routes"])
+    assert result["recompute"] == "Statistics can't be recomputed in the query profile"
+
+
+def test_full_profile_mounts_the_upload_route():
+    assert any(route.path.startswith("/api/upload") for route in main.app.routes)
@@ -0,0 +1,30 @@
+import pytest
+
+from schemas.schema import QueryParams
+from services.mongo_service import build_mongo_projection
+from services.supabase_service import build_select_list
+
+FIELDS = ["name", "age", "city"]
+
+
+def test_mongo_projection_includes_or_excludes_fields():
+    assert build_mongo_projection(QueryParams(), FIELDS) == {"_id": 0}
+    assert build_mongo_projection(QueryParams(fields=["name", "age"]), FIELDS) == {"_id": 0, "name": 1, "age": 1}
+    assert build_mongo_projection(QueryParams(exclude_fields=["city"]), FIELDS) == {"_id": 0, "city": 0}
+
+
+def test_select_list_names_only_selected_columns():
+    assert build_select_list(QueryParams(), FIELDS) == '"name", "age", "city"'
+    assert build_select_list(QueryParams(fields=["age", "name", "city"], exclude_fields=["city"]), FIELDS) == '"age", "name"'
+
+
+@pytest.mark.parametrize("params", [
+    QueryParams(fields=["salary"]),
+    QueryParams(exclude_fields=["salary"]),
+    QueryParams(exclude_fields=FIELDS)
+])
+def test_invalid_selections_are_rejected(params):
+    with pytest.raises(ValueError):
+        build_mongo_projection(params, FIELDS)
+    with pytest.raises(ValueError):
+        build_select_list(params, FIELDS)
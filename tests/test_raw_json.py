@@ -0,0 +1,62 @@
+import asyncio
+import datetime
+
+import pytest
+from bson import ObjectId
+
+import routes.mongo_route
+import routes.supabase_route
+
+ROWS = [
+    {"name": "ada", "age": 36, "score": 1.5, "joined": datetime.datetime(2024, 1, 2, 3, 4, 5)},
+    {"name": "alan", "age": 41, "score": None, "joined": datetime.datetime(2023, 6, 7)},
+]
+
+
+@pytest.fixture
+def people(fakes):
+    mongo, postgres = fakes
+
+    async def fill():
+        for row in ROWS:
+            await mongo["people"].insert_one({**row, "owner": ObjectId()})
+
+    asyncio.run(fill())
+    postgres.tables["people"] = [dict(row) for row in ROWS]
+
+
+@pytest.mark.parametrize("backend, path, route", [
+    ("mongodb", "/api/mongodb/collections/people/query", routes.mongo_route),
+    ("supabase", "/api/supabase/tables/people/query", routes.supabase_route),
+])
+def test_raw_json_matches_the_model_response(client, people, monkeypatch, backend, path, route):
+    monkeypatch.setattr(route, "QUERY_RAW_JSON", False)
+    validated = client.get(path, params={"limit": 5})
+    monkeypatch.setattr(route, "QUERY_RAW_JSON", True)
+    raw = client.get(path, params={"limit": 5})
+
+    assert validated.status_code == raw.status_code == 200
+    assert raw.headers["content-type"] == "application/json"
+    assert raw.json() == validated.json()
+    assert raw.json()["total_count"] == 2
+
+
+def test_raw_json_renders_binary_values(client, fakes, monkeypatch):
+    from bson import Binary
+
+    mongo, _ = fakes
+    asyncio.run(mongo["blobs"].insert_one({"name": "a", "tag": Binary(b"ab"), "raw": b"cd"}))
+    path = "/api/mongodb/collections/blobs/query"
+
+    monkeypatch.setattr(routes.mongo_route, "QUERY_RAW_JSON", False)
+    validated = client.get(path)
+    monkeypatch.setattr(routes.mongo_route, "QUERY_RAW_JSON", True)
+    raw = client.get(path)
+
+    assert validated.status_code == raw.status_code == 200
+    assert raw.json() == validated.json()
+
+    asyncio.run(mongo["blobs"].insert_one({"name": "b", "tag": Binary(b"\xff\x00")}))
+    raw = client.get(path)
+    assert raw.status_code == 200
+    assert raw.json()["data"][1]["tag"] == "/wA="
@@ -0,0 +1,150 @@
+import asyncio
+
+import pytest
+
+from schemas.schema import QueryParams
+from services import mongo_service
+from utils.deadlines import DeadlineExceeded, deadline_var, operation_id_var, set_deadline
+from utils.single_flight import SingleFlight
+from utils.slow_queries import QueryTrace, describe_query, trace_var
+from utils.timing import phase
+
+
+def counting_factory(calls, result="page", delay=0.02, error=None):
+    async def factory():
+        calls.append(result)
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        return result
+    return factory
+
+
+def test_identical_concurrent_calls_share_one_execution():
+    flights, calls = SingleFlight(), []
+
+    async def scenario():
+        return await asyncio.gather(
+            flights.run("a", counting_factory(calls)),
+            flights.run("a", counting_factory(calls)),
+            flights.run("b", counting_factory(calls, "other"))
+        )
+
+    assert asyncio.run(scenario()) == ["page", "page", "other"]
+    assert calls == ["page", "other"]
+    assert flights.stats() == {"enabled": True, "executed": 2, "coalesced": 1, "in_flight": 0}
+
+
+def test_errors_reach_every_waiter_and_are_not_cached():
+    flights, calls = SingleFlight(), []
+
+    async def scenario():
+        results = await asyncio.gather(
+            flights.run("a", counting_factory(calls, error=ValueError("bad filter"))),
+            flights.run("a", counting_factory(calls)),
+            return_exceptions=True
+        )
+        return results, await flights.run("a", counting_factory(calls, "retry"))
+
+    results, retry = asyncio.run(scenario())
+    assert [type(result) for result in results] == [ValueError, ValueError]
+    assert retry == "retry"
+
+
+def test_flight_survives_until_the_last_waiter_leaves():
+    flights, calls = SingleFlight(), []
+
+    async def scenario():
+        first = asyncio.ensure_future(flights.run("a", counting_factory(calls, delay=0.05)))
+        second = asyncio.ensure_future(flights.run("a", counting_factory(calls)))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second, first.cancelled()
+
+    assert asyncio.run(scenario()) == ("page", True)
+
+
+def test_flight_is_cancelled_when_every_waiter_leaves():
+    flights = SingleFlight()
+    started = []
+
+    async def scenario():
+        async def factory():
+            started.append(asyncio.current_task())
+            await asyncio.sleep(1)
+
+        waiter = asyncio.ensure_future(flights.run("a", factory))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        await asyncio.sleep(0)
+        return started[0]
+
+    assert asyncio.run(scenario()).cancelled()
+    assert flights.stats()["in_flight"] == 0
+
+
+def test_disabled_runs_every_call():
+    flights, calls = SingleFlight(enabled=False), []
+
+    async def scenario():
+        await asyncio.gather(flights.run("a", counting_factory(calls)), flights.run("a", counting_factory(calls)))
+
+    asyncio.run(scenario())
+    assert len(calls) == 2
+
+
+def test_reordered_filters_coalesce(monkeypatch):
+    calls = []
+
+    async def execute(collection_name, params, fields=None):
+        calls.append(params.filters)
+        await asyncio.sleep(0.02)
+        return 0, []
+
+    monkeypatch.setattr(mongo_service, "execute_collection_page", execute)
+
+    async def scenario():
+        await asyncio.gather(
+            mongo_service.fetch_collection_page("people", QueryParams(filters={"name": "a", "age": {"gte": 1, "lt": 9}})),
+            mongo_service.fetch_collection_page("people", QueryParams(filters={"age": {"lt": 9, "gte": 1}, "name": "a"}))
+        )
+
+    asyncio.run(scenario())
+    assert len(calls) == 1
+
+
+def test_short_deadline_leader_does_not_cut_off_followers():
+    flights = SingleFlight()
+    seen = []
+
+    async def factory():
+        seen.append((deadline_var.get(), operation_id_var.get()))
+        with phase("fetch"):
+            await asyncio.sleep(0.05)
+        describe_query(filter={"name": "a"})
+        return "page"
+
+    async def request(timeout_ms, delay):
+        await asyncio.sleep(delay)
+        set_deadline(timeout_ms)
+        operation_id_var.set(f"request-{timeout_ms}")
+        trace = QueryTrace("mongodb", "query", "people")
+        trace_var.set(trace)
+        try:
+            return await flights.run("a", factory), trace
+        except DeadlineExceeded as e:
+            return e, trace
+
+    async def scenario():
+        return await asyncio.gather(request(1, 0), request(30_000, 0.001))
+
+    (leader, leader_trace), (follower, follower_trace) = asyncio.run(scenario())
+    assert isinstance(leader, DeadlineExceeded)
+    assert follower == "page"
+    assert follower_trace.query == {"filter": {"name": "a"}}
+    assert follower_trace.phases["fetch"] >= 50
+    assert "fetch" not in leader_trace.phases
+    [(_, operation_id)] = seen
+    assert operation_id not in (None, "request-1", "request-30000")
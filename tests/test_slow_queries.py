@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+from bson import ObjectId
+
+from utils.background import cancel_all
+from utils.slow_queries import SlowQueryLog, describe_query
+from utils.timing import phase
+
+
+def test_fast_queries_are_not_recorded():
+    log = SlowQueryLog(threshold_ms=1000, capacity=10)
+
+    async def scenario():
+        async with log.trace("mongodb", "query", "people"):
+            with phase("fetch"):
+                pass
+
+    asyncio.run(scenario())
+    assert (log.traced, log.recorded, log.list()) == (1, 0, [])
+
+
+def test_slow_query_records_phases_query_and_plan():
+    log = SlowQueryLog(threshold_ms=0, capacity=10)
+    explained = []
+
+    async def explainer(dataset, query):
+        explained.append((dataset, query))
+        return {"winningPlan": {"stage": "COLLSCAN"}, "id": ObjectId("0" * 24)}
+
+    log.register_explainer("mongodb", explainer)
+
+    async def scenario():
+        async with log.trace("mongodb", "query", "people"):
+            with phase("fetch"):
+                await asyncio.sleep(0.01)
+            describe_query(filter={"age": {"$gt": 30}})
+        await asyncio.sleep(0.01)
+        await cancel_all()
+
+    asyncio.run(scenario())
+    [entry] = log.list()
+    assert set(entry["phases_ms"]) == {"fetch"}
+    assert entry["total_ms"] >= entry["phases_ms"]["fetch"] >= 10
+    assert entry["query"] == {"filter": {"age": {"$gt": 30}}}
+    assert explained == [("people", {"filter": {"age": {"$gt": 30}}})]
+    assert entry["plan_status"] == "captured"
+    assert entry["plan"]["id"] == "0" * 24
+    assert log.explaining == set()
+
+
+def test_one_plan_per_dataset_at_a_time():
+    log = SlowQueryLog(threshold_ms=0, capacity=10)
+    release = None
+
+    async def explainer(dataset, query):
+        await release.wait()
+        raise RuntimeError("explain not allowed")
+
+    log.register_explainer("supabase", explainer)
+
+    async def scenario():
+        nonlocal release
+        release = asyncio.Event()
+        for _ in range(2):
+            async with log.trace("supabase", "query", "people"):
+                describe_query(sql="SELECT 1")
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.sleep(0.01)
+        await cancel_all()
+
+    asyncio.run(scenario())
+    second, first = log.list()
+    assert first["plan_status"] == "failed: RuntimeError: explain not allowed"
+    assert second["plan_status"].startswith("skipped")
+
+
+def test_failed_queries_are_recorded_and_reraised():
+    log = SlowQueryLog(threshold_ms=0, capacity=2, explain=False)
+
+    async def scenario():
+        for dataset in ("a", "b", "c"):
+            with pytest.raises(ValueError):
+                async with log.trace("mongodb", "aggregate", dataset):
+                    raise ValueError("bad stage")
+
+    asyncio.run(scenario())
+    assert [entry["dataset"] for entry in log.list()] == ["c", "b"]
+    assert log.list(limit=1)[0]["error"] == "ValueError: bad stage"
+    assert log.list(backend="supabase") == []
+    assert log.clear() == 2
+
+
+def test_disabled_log_does_not_trace():
+    log = SlowQueryLog(threshold_ms=0, capacity=10, enabled=False)
+
+    async def scenario():
+        async with log.trace("mongodb", "query", "people") as trace:
+            assert trace is None
+
+    asyncio.run(scenario())
+    assert log.stats()["traced"] == 0
@@ -0,0 +1,122 @@
+import asyncio
+import os
+import time
+
+import pandas as pd
+from bson import ObjectId
+
+from handlers.upload_handler import UploadHandler
+from services import mongo_service
+from utils.spool import WriteSpool
+
+
+def make_spool(directory, **kwargs) -> WriteSpool:
+    options = {"initial_backoff": 0, "max_backoff": 60, "max_attempts": 3, "poll_seconds": 30}
+    options.update(kwargs)
+    return WriteSpool(str(directory), **options)
+
+
+def frame() -> pd.DataFrame:
+    return pd.DataFrame({"id": [1, 2, 3, 4], "name": ["a", "b", "c", "d"]})
+
+
+def test_concurrent_replay_writes_each_entry_once(tmp_path):
+    writes = []
+
+    async def writer(manifest, df):
+        await asyncio.sleep(0.05)
+        writes.append(manifest["id"])
+
+    async def scenario():
+        spools = [make_spool(tmp_path) for _ in range(3)]
+        for spool in spools:
+            spool.register("mongodb", writer)
+        entry_id = await spools[0].put("mongodb", "uploads", frame(), {})
+        await asyncio.gather(*(spool.replay_due() for spool in spools))
+        return entry_id
+
+    entry_id = asyncio.run(scenario())
+    assert writes == [entry_id]
+    assert os.listdir(tmp_path) == []
+
+
+def test_failed_replay_releases_claim(tmp_path):
+    async def writer(manifest, df):
+        raise ConnectionError("backend down")
+
+    async def scenario():
+        spool = make_spool(tmp_path)
+        spool.register("supabase", writer)
+        entry_id = await spool.put("supabase", "people", frame(), {})
+        spool.initial_backoff = 1
+        await spool.replay_due()
+        return spool, entry_id
+
+    spool, entry_id = asyncio.run(scenario())
+    assert not os.path.exists(spool.claim_path(entry_id))
+    [manifest] = spool.pending()
+    assert manifest["attempts"] == 1
+    assert manifest["last_error"] == "ConnectionError: backend down"
+    assert manifest["next_attempt_at"] > time.time()
+
+
+def test_stale_claim_is_released(tmp_path):
+    async def scenario():
+        spool = make_spool(tmp_path, claim_timeout=60)
+        entry_id = await spool.put("mongodb", "uploads", frame(), {})
+        assert spool.claim(entry_id)["id"] == entry_id
+        return spool, entry_id
+
+    spool, entry_id = asyncio.run(scenario())
+    assert spool.pending() == []
+    stale = time.time() - 120
+    os.utime(spool.claim_path(entry_id), (stale, stale))
+    assert [manifest["id"] for manifest in spool.pending()] == [entry_id]
+
+
+def test_stats_do_not_touch_the_disk(tmp_path, monkeypatch):
+    async def writer(manifest, df):
+        pass
+
+    async def scenario():
+        spool = make_spool(tmp_path)
+        spool.register("mongodb", writer)
+        await spool.put("mongodb", "uploads", frame(), {})
+        with monkeypatch.context() as patch:
+            patch.setattr(os, "listdir", None)
+            before = spool.stats()
+        await spool.replay_due()
+        return before, spool.stats()
+
+    before, after = asyncio.run(scenario())
+    assert (before["pending"], before["pending_rows"]) == (1, 4)
+    assert (after["pending"], after["pending_rows"], after["replayed"]) == (0, 0, 1)
+
+
+def test_replay_after_partial_insert_does_not_duplicate(tmp_path, fakes):
+    mongo, _ = fakes
+    batch_id = str(ObjectId())
+    df = frame()
+
+    async def scenario():
+        # The first attempt got half the rows in before failing
+        await mongo_service.insert_many_mongo(df.head(2).to_dict(orient="records"), batch_id)
+        spools = [make_spool(tmp_path) for _ in range(2)]
+        for spool in spools:
+            spool.register("mongodb", UploadHandler.replay_spooled_write)
+        metadata = {"catalog_entry": {"row_count": len(df)}, "column_stats": None, "timings": {}, "batch_id": batch_id}
+        await spools[0].put("mongodb", mongo_service.MONGO_COLLECTION, df, metadata)
+        await asyncio.gather(*(spool.replay_due() for spool in spools))
+
+    asyncio.run(scenario())
+    documents = mongo[mongo_service.MONGO_COLLECTION].documents
+    assert sorted(document["id"] for document in documents) == [1, 2, 3, 4]
+    assert [document["_id"] for document in documents] == sorted(document["_id"] for document in documents)
+
+
+def test_batch_document_ids_are_stable():
+    batch_id = str(ObjectId())
+    first = mongo_service.batch_document_ids(batch_id, 3)
+    assert first == mongo_service.batch_document_ids(batch_id, 3)
+    assert len(set(first)) == 3
+    assert set(first).isdisjoint(mongo_service.batch_document_ids(str(ObjectId()), 3))
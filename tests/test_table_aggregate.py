@@ -0,0 +1,43 @@
+import pytest
+
+from schemas.schema import AggregateMetric, TableAggregateParams
+from services.supabase_service import AGGREGATE_MAX_GROUPS, build_aggregate_query
+
+COLUMNS = ["city", "team", "salary"]
+
+
+def test_group_by_with_metrics():
+    params = TableAggregateParams(
+        group_by=["city"],
+        metrics=[AggregateMetric(function="count"), AggregateMetric(function="AVG", column="salary", alias="mean pay")],
+        filters={"team": "red"},
+        sort_by="mean_pay",
+        sort_order="desc",
+        limit=50
+    )
+    query, query_params = build_aggregate_query("people", params, COLUMNS)
+
+    assert query.startswith('SELECT "city", COUNT(*) AS "count", AVG("salary") AS "mean_pay" FROM "people" WHERE ')
+    assert query.endswith(' GROUP BY "city" ORDER BY "mean_pay" DESC LIMIT $2')
+    assert query_params == ["red", 50]
+
+
+def test_groups_are_ordered_by_default_and_capped():
+    query, query_params = build_aggregate_query(
+        "people", TableAggregateParams(group_by=["city", "team"], limit=10 ** 9), COLUMNS
+    )
+    assert query == 'SELECT "city", "team" FROM "people" GROUP BY "city", "team" ORDER BY "city", "team" LIMIT $1'
+    assert query_params == [AGGREGATE_MAX_GROUPS]
+
+
+@pytest.mark.parametrize("params, message", [
+    (TableAggregateParams(), "at least one"),
+    (TableAggregateParams(group_by=["country"]), "Unknown group_by"),
+    (TableAggregateParams(metrics=[AggregateMetric(function="median", column="salary")]), "Unsupported metric"),
+    (TableAggregateParams(metrics=[AggregateMetric(function="sum")]), "requires a column"),
+    (TableAggregateParams(metrics=[AggregateMetric(function="sum", column="bonus")]), "Unknown metric column"),
+    (TableAggregateParams(group_by=["city"], metrics=[AggregateMetric(function="count", alias="city")]), "Duplicate"),
+])
+def test_invalid_requests_are_rejected(params, message):
+    with pytest.raises(ValueError, match=message):
+        build_aggregate_query("people", params, COLUMNS)
@@ -0,0 +1,56 @@
+import os
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from utils.profiler import ProfilingMiddleware
+from utils.timing import ServerTimingMiddleware, phase, server_timing
+
+
+def make_app(middleware, **options) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/people")
+    async def people():
+        with phase("fetch"):
+            time.sleep(0.02)
+        with phase("serialize"):
+            pass
+        with phase("fetch"):
+            pass
+        return {"count": 1}
+
+    app.add_middleware(middleware, **options)
+    return app
+
+
+def test_server_timing_format():
+    assert server_timing({"fetch": 12.345}, 20) == "fetch;dur=12.3, total;dur=20.0"
+
+
+def test_phases_are_reported_in_server_timing():
+    response = TestClient(make_app(ServerTimingMiddleware)).get("/people")
+    metrics = dict(metric.split(";dur=") for metric in response.headers["server-timing"].split(", "))
+    assert list(metrics) == ["fetch", "serialize", "total"]
+    assert float(metrics["total"]) >= float(metrics["fetch"]) >= 20
+
+
+def test_phases_outside_a_request_are_ignored():
+    with phase("fetch"):
+        pass
+
+
+def test_requested_profile_is_written_as_collapsed_stacks(tmp_path):
+    client = TestClient(make_app(ProfilingMiddleware, directory=str(tmp_path), interval_ms=1, sample_rate=0))
+    assert "x-profile-output" not in client.get("/people").headers
+    assert os.listdir(tmp_path) == []
+
+    path = client.get("/people", headers={"X-Profile": "1"}).headers["x-profile-output"]
+    assert os.path.dirname(path) == str(tmp_path)
+    assert path.endswith("_GET_people.folded")
+    with open(path) as f:
+        lines = f.read().splitlines()
+    assert lines
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    assert any("people (" in line for line in lines)
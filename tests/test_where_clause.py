@@ -0,0 +1,28 @@
+from schemas.schema import QueryParams
+from services.supabase_service import build_where_clause
+
+COLUMNS = ["name", "age", "city"]
+
+
+def test_equivalent_requests_share_one_statement():
+    first = build_where_clause(QueryParams(filters={"name": "a", "age": {"lte": 60, "gte": 18}}), COLUMNS)
+    second = build_where_clause(QueryParams(filters={"age": {"gte": 21, "lte": 65}, "name": "b"}), COLUMNS)
+    assert first[0] == second[0]
+    assert (first[1], second[1]) == ([18, 60, "a"], [21, 65, "b"])
+
+
+def test_in_lists_bind_as_one_array():
+    short = build_where_clause(QueryParams(filters={"city": {"in": ["Oslo"]}}), COLUMNS)
+    long = build_where_clause(QueryParams(filters={"city": {"in": ["Oslo", "Rome", "Lima"]}}), COLUMNS)
+    assert short[0] == long[0] == '"city" = ANY($1)'
+    assert long[1] == [["Oslo", "Rome", "Lima"]]
+
+
+def test_search_term_is_bound_once():
+    clause, values = build_where_clause(QueryParams(search=" ann ", search_columns=["name", "city", "missing"]), COLUMNS)
+    assert clause == '(CAST("city" AS TEXT) ILIKE $1 OR CAST("name" AS TEXT) ILIKE $1)'
+    assert values == ["%ann%"]
+
+
+def test_unknown_columns_are_ignored():
+    assert build_where_clause(QueryParams(filters={"missing": 1}), COLUMNS) == ("", [])
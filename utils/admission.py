@@ -0,0 +1,197 @@
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Tuple
+
+import asyncpg
+from fastapi import HTTPException
+from pymongo.errors import ExecutionTimeout
+
+from config import (
+    ADMISSION_ENABLED,
+    ADMISSION_QUEUE_SIZE,
+    ADMISSION_MAX_WAIT_MS,
+    MONGO_QUERY_CONCURRENCY,
+    MONGO_AGGREGATE_CONCURRENCY,
+    MONGO_UPLOAD_CONCURRENCY,
+    SUPABASE_QUERY_CONCURRENCY,
+    SUPABASE_AGGREGATE_CONCURRENCY,
+    SUPABASE_UPLOAD_CONCURRENCY
+)
+from utils.circuit_breaker import CircuitOpen, breakers
+from utils.deadlines import DeadlineExceeded, deadline_var
+from utils.metrics import backend_operation_duration
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, name: str, retry_after: int):
+        super().__init__(f"{name} is overloaded, retry in {retry_after}s")
+        self.name = name
+        self.retry_after = retry_after
+
+    def to_http(self) -> HTTPException:
+        return HTTPException(
+            status_code=503,
+            detail=str(self),
+            headers={"Retry-After": str(self.retry_after)}
+        )
+
+
+class AdmissionController:
+    """Bound the concurrent operations of one kind against one backend.
+
+    Up to ``max_concurrent`` operations run at once and at most
+    ``max_queue`` more wait for a slot. Operations that find the queue full,
+    or that wait longer than ``max_wait`` seconds, are rejected so the
+    caller can shed load instead of piling onto a saturated backend.
+    """
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int, max_wait: float, enabled: bool = True):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.enabled = enabled
+        self.semaphore = asyncio.Semaphore(max_concurrent)
+        self.active = 0
+        self.queued = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_observed_wait = 0.0
+        self.avg_hold = 0.0
+
+    def retry_after(self) -> int:
+        # Roughly how long the current backlog takes to drain
+        backlog = (self.queued + 1) / max(self.max_concurrent, 1)
+        return max(1, min(60, math.ceil(self.avg_hold * backlog)))
+
+    def reject(self) -> AdmissionRejected:
+        self.rejected += 1
+        return AdmissionRejected(self.name, self.retry_after())
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        if not self.enabled:
+            yield
+            return
+
+        started = time.perf_counter()
+        if self.semaphore.locked():
+            if self.queued >= self.max_queue:
+                raise self.reject()
+            max_wait = self.max_wait
+            deadline = deadline_var.get()
+            if deadline is not None:
+                max_wait = min(max_wait, max(deadline - time.monotonic(), 0))
+            self.queued += 1
+            try:
+                await asyncio.wait_for(self.semaphore.acquire(), timeout=max_wait)
+            except asyncio.TimeoutError:
+                raise self.reject()
+            finally:
+                self.queued -= 1
+        else:
+            # A free slot is taken without yielding to the event loop
+            await self.semaphore.acquire()
+
+        waited = time.perf_counter() - started
+        self.admitted += 1
+        self.total_wait += waited
+        self.max_observed_wait = max(self.max_observed_wait, waited)
+        self.active += 1
+        acquired = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self.semaphore.release()
+            held = time.perf_counter() - acquired
+            self.avg_hold = held if self.admitted == 1 else 0.9 * self.avg_hold + 0.1 * held
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "active": self.active,
+            "queued": self.queued,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "avg_wait_ms": round(self.total_wait / self.admitted * 1000, 2) if self.admitted else 0.0,
+            "max_wait_ms": round(self.max_observed_wait * 1000, 2)
+        }
+
+
+CONCURRENCY_LIMITS = {
+    ("mongodb", "query"): MONGO_QUERY_CONCURRENCY,
+    ("mongodb", "aggregate"): MONGO_AGGREGATE_CONCURRENCY,
+    ("mongodb", "upload"): MONGO_UPLOAD_CONCURRENCY,
+    ("supabase", "query"): SUPABASE_QUERY_CONCURRENCY,
+    ("supabase", "aggregate"): SUPABASE_AGGREGATE_CONCURRENCY,
+    ("supabase", "upload"): SUPABASE_UPLOAD_CONCURRENCY,
+}
+
+controllers: Dict[Tuple[str, str], AdmissionController] = {
+    key: AdmissionController(
+        f"{key[0]} {key[1]}",
+        limit,
+        ADMISSION_QUEUE_SIZE,
+        ADMISSION_MAX_WAIT_MS / 1000,
+        enabled=ADMISSION_ENABLED
+    )
+    for key, limit in CONCURRENCY_LIMITS.items()
+}
+
+
+# Called when an admitted operation is cancelled, to stop the server-side
+# work that cancelling the local await alone does not stop
+cancel_hooks: Dict[str, Callable[[], None]] = {}
+
+
+@asynccontextmanager
+async def admit(backend: str, kind: str) -> AsyncIterator[None]:
+    """Run one backend operation under its circuit breaker and admission slot.
+
+    A backend whose circuit is open is refused before any waiting. Driver
+    time limits (maxTimeMS, asyncpg timeouts) surface as DeadlineExceeded
+    so routes can answer 504, and cancellation runs the backend's cancel
+    hook.
+    """
+    breaker = breakers[backend]
+    breaker.check()
+    async with controllers[(backend, kind)].slot():
+        started = time.perf_counter()
+        outcome = "ok"
+        try:
+            try:
+                yield
+            except (asyncio.TimeoutError, ExecutionTimeout, asyncpg.exceptions.QueryCanceledError) as e:
+                raise DeadlineExceeded(f"{backend} {kind} exceeded its deadline") from e
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            hook = cancel_hooks.get(backend)
+            if hook is not None:
+                hook()
+            raise
+        except Exception as e:
+            outcome = "timeout" if isinstance(e, DeadlineExceeded) else "error"
+            if breaker.is_outage(e):
+                breaker.record_failure(e)
+            elif not isinstance(e, CircuitOpen):
+                # Any answer from the backend, even an error, shows it is up
+                breaker.record_success()
+            raise
+        else:
+            breaker.record_success()
+        finally:
+            backend_operation_duration.observe(time.perf_counter() - started, backend, kind, outcome)
+
+
+async def run_admitted(backend: str, kind: str, operation: Callable[[], Awaitable[Any]]) -> Any:
+    async with admit(backend, kind):
+        return await operation()
+
+
+def admission_stats() -> Dict[str, Dict[str, Any]]:
+    return {f"{backend}.{kind}": controller.stats() for (backend, kind), controller in controllers.items()}
@@ -0,0 +1,71 @@
+import asyncio
+import logging
+from typing import Callable, Coroutine, Dict, Hashable, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+_tasks: Dict[Hashable, asyncio.Task] = {}
+_reruns: Set[Hashable] = set()
+
+
+def spawn(coro: Coroutine, key: Optional[Hashable] = None) -> asyncio.Task:
+    """Run ``coro`` in the background, keeping a reference until it finishes.
+
+    When ``key`` is given and a task with the same key is still running, the
+    new coroutine is discarded and the running task is returned instead.
+    """
+    if key is not None:
+        running = _tasks.get(key)
+        if running is not None and not running.done():
+            coro.close()
+            return running
+
+    task = asyncio.create_task(coro)
+    task_key = key if key is not None else task
+    _tasks[task_key] = task
+
+    def finished(done: asyncio.Task) -> None:
+        if _tasks.get(task_key) is done:
+            del _tasks[task_key]
+        if not done.cancelled() and done.exception() is not None:
+            logger.error(f"Background task {task_key!r} failed: {done.exception()}")
+
+    task.add_done_callback(finished)
+    return task
+
+
+def spawn_coalesced(factory: Callable[[], Coroutine], key: Hashable) -> asyncio.Task:
+    """Run ``factory()`` in the background under ``key``, again if asked while running.
+
+    Unlike ``spawn``, a request arriving while the task runs isn't dropped:
+    the task runs ``factory()`` once more when the current run finishes, so
+    changes that landed mid-run are picked up. Any number of requests during
+    one run add a single rerun.
+    """
+    running = _tasks.get(key)
+    if running is not None and not running.done():
+        _reruns.add(key)
+        return running
+
+    async def run() -> None:
+        while True:
+            _reruns.discard(key)
+            await factory()
+            if key not in _reruns:
+                return
+
+    return spawn(run(), key=key)
+
+
+def rerun_if_running(key: Hashable) -> None:
+    """Have the ``spawn_coalesced`` task for ``key``, if one is running, run again."""
+    running = _tasks.get(key)
+    if running is not None and not running.done():
+        _reruns.add(key)
+
+
+async def cancel_all() -> None:
+    tasks = list(_tasks.values())
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
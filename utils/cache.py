@@ -0,0 +1,91 @@
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+class TTLCache:
+    """Small in-process LRU cache whose entries expire after ``ttl`` seconds."""
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.ttl <= 0 or self.max_entries <= 0:
+            return
+
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, predicate: Callable[[Hashable], bool]) -> int:
+        stale = [key for key in self._entries if predicate(key)]
+        for key in stale:
+            del self._entries[key]
+        return len(stale)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+class StatementCacheStats:
+    """Estimate how often generated SQL hits asyncpg's statement cache.
+
+    asyncpg keeps an LRU of prepared statements per connection, keyed by
+    the query text, but exposes no counters. The same LRU is mirrored here
+    over all executed text. Pooled connections each hold their own cache,
+    so this is an upper bound on the real per-connection hit rate.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.executions = 0
+        self.hits = 0
+        self._statements: "OrderedDict[str, None]" = OrderedDict()
+
+    def record(self, query: str) -> bool:
+        self.executions += 1
+        hit = query in self._statements
+        if hit:
+            self.hits += 1
+            self._statements.move_to_end(query)
+        elif self.capacity > 0:
+            self._statements[query] = None
+            while len(self._statements) > self.capacity:
+                self._statements.popitem(last=False)
+        return hit
+
+    def stats(self) -> dict:
+        return {
+            "executions": self.executions,
+            "hits": self.hits,
+            "hit_rate": round(self.hits / self.executions, 4) if self.executions else 0.0,
+            "cached_statements": len(self._statements),
+            "capacity": self.capacity
+        }
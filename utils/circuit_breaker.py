@@ -0,0 +1,162 @@
+import asyncio
+import logging
+import math
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Type
+
+import asyncpg
+from fastapi import HTTPException
+from pymongo.errors import ConnectionFailure
+
+from config import (
+    CIRCUIT_BREAKER_ENABLED,
+    CIRCUIT_FAILURE_THRESHOLD,
+    CIRCUIT_RESET_SECONDS,
+    CIRCUIT_MAX_RESET_SECONDS,
+    CIRCUIT_PROBE_TIMEOUT_SECONDS
+)
+from utils.background import spawn
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpen(Exception):
+    def __init__(self, name: str, retry_after: int):
+        super().__init__(f"{name} is unavailable, retry in {retry_after}s")
+        self.name = name
+        self.retry_after = retry_after
+
+    def to_http(self) -> HTTPException:
+        return HTTPException(
+            status_code=503,
+            detail=str(self),
+            headers={"Retry-After": str(self.retry_after)}
+        )
+
+
+class CircuitBreaker:
+    """Fail fast while a backend is unreachable.
+
+    ``failure_threshold`` consecutive outage errors open the circuit and
+    calls are rejected at once. While open, a background probe checks the
+    backend, starting after ``reset_seconds`` and backing off up to
+    ``max_reset_seconds``. The circuit is half-open while a probe runs and
+    closes again when one succeeds. Without a probe, the first call after
+    the reset delay is let through as the trial.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        outage_errors: Tuple[Type[BaseException], ...],
+        failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+        reset_seconds: float = CIRCUIT_RESET_SECONDS,
+        max_reset_seconds: float = CIRCUIT_MAX_RESET_SECONDS,
+        enabled: bool = CIRCUIT_BREAKER_ENABLED
+    ):
+        self.name = name
+        self.outage_errors = outage_errors
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.max_reset_seconds = max_reset_seconds
+        self.enabled = enabled
+        self.probe: Optional[Callable[[], Awaitable[Any]]] = None
+        self.state = CLOSED
+        self.failures = 0
+        self.current_reset = reset_seconds
+        self.retry_at = 0.0
+        self.opened_count = 0
+        self.rejected = 0
+        self.last_error: Optional[str] = None
+
+    @property
+    def is_open(self) -> bool:
+        return self.enabled and self.state != CLOSED
+
+    def check(self) -> None:
+        if not self.is_open:
+            return
+        if self.state == OPEN and self.probe is None and time.monotonic() >= self.retry_at:
+            self.state = HALF_OPEN
+            return
+        self.rejected += 1
+        retry_after = max(1, math.ceil(self.retry_at - time.monotonic()))
+        raise CircuitOpen(self.name, retry_after)
+
+    def is_outage(self, error: BaseException) -> bool:
+        return isinstance(error, self.outage_errors)
+
+    def record_success(self) -> None:
+        if self.state != CLOSED:
+            logger.info(f"Circuit for {self.name} closed")
+        self.state = CLOSED
+        self.failures = 0
+        self.current_reset = self.reset_seconds
+
+    def record_failure(self, error: BaseException) -> None:
+        if not self.enabled:
+            return
+        self.failures += 1
+        self.last_error = f"{type(error).__name__}: {error}"
+        if self.state == HALF_OPEN:
+            self.current_reset = min(self.current_reset * 2, self.max_reset_seconds)
+            self.trip()
+        elif self.state == CLOSED and self.failures >= self.failure_threshold:
+            self.trip()
+
+    def trip(self) -> None:
+        if self.state != OPEN:
+            logger.warning(f"Circuit for {self.name} opened after {self.failures} failures: {self.last_error}")
+        if self.state == CLOSED:
+            self.opened_count += 1
+        self.state = OPEN
+        self.retry_at = time.monotonic() + self.current_reset
+        if self.probe is not None:
+            spawn(self.probe_until_healthy(), key=("circuit_probe", self.name))
+
+    async def probe_until_healthy(self) -> None:
+        while self.state != CLOSED:
+            await asyncio.sleep(max(self.retry_at - time.monotonic(), 0))
+            self.state = HALF_OPEN
+            try:
+                await asyncio.wait_for(self.probe(), timeout=CIRCUIT_PROBE_TIMEOUT_SECONDS)
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+                self.current_reset = min(self.current_reset * 2, self.max_reset_seconds)
+                self.state = OPEN
+                self.retry_at = time.monotonic() + self.current_reset
+                logger.info(f"Probe for {self.name} failed, next in {self.current_reset:.0f}s: {e}")
+            else:
+                self.record_success()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state if self.enabled else "disabled",
+            "consecutive_failures": self.failures,
+            "times_opened": self.opened_count,
+            "rejected": self.rejected,
+            "retry_in_seconds": round(max(self.retry_at - time.monotonic(), 0), 1) if self.is_open else 0,
+            "last_error": self.last_error
+        }
+
+
+breakers: Dict[str, CircuitBreaker] = {
+    "mongodb": CircuitBreaker("MongoDB", (ConnectionFailure,)),
+    "supabase": CircuitBreaker(
+        "Supabase",
+        (
+            OSError,
+            asyncpg.exceptions.ConnectionDoesNotExistError,
+            asyncpg.exceptions.CannotConnectNowError,
+            asyncpg.exceptions.ConnectionFailureError
+        )
+    ),
+}
+
+
+def circuit_stats() -> Dict[str, Dict[str, Any]]:
+    return {backend: breaker.stats() for backend, breaker in breakers.items()}
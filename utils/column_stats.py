@@ -0,0 +1,105 @@
+import datetime
+from typing import Any, Dict
+
+import numpy as np
+import pandas as pd
+
+from config import STATS_TOP_K, STATS_HISTOGRAM_BINS
+
+HLL_PRECISION = 14
+
+
+def hll_distinct_estimate(series: pd.Series, precision: int = HLL_PRECISION) -> int:
+    """HyperLogLog estimate of the number of distinct values in ``series``."""
+    if series.empty:
+        return 0
+
+    try:
+        hashes = pd.util.hash_pandas_object(series, index=False).to_numpy(dtype=np.uint64)
+    except TypeError:
+        # Unhashable cells (nested documents) are counted by their text form
+        hashes = pd.util.hash_pandas_object(series.astype(str), index=False).to_numpy(dtype=np.uint64)
+    register_count = 1 << precision
+    suffix_bits = 64 - precision
+
+    register_index = (hashes >> np.uint64(suffix_bits)).astype(np.int64)
+    suffix = hashes & np.uint64((1 << suffix_bits) - 1)
+
+    bit_length = np.zeros(len(suffix), dtype=np.int64)
+    nonzero = suffix > 0
+    bit_length[nonzero] = np.floor(np.log2(suffix[nonzero].astype(np.float64))).astype(np.int64) + 1
+    rank = suffix_bits - bit_length + 1
+
+    registers = np.zeros(register_count, dtype=np.int64)
+    maxima = pd.Series(rank).groupby(register_index).max()
+    registers[maxima.index.to_numpy()] = maxima.to_numpy()
+
+    alpha = 0.7213 / (1 + 1.079 / register_count)
+    estimate = alpha * register_count ** 2 / np.sum(np.power(2.0, -registers))
+
+    empty_registers = int(np.count_nonzero(registers == 0))
+    if estimate <= 2.5 * register_count and empty_registers:
+        # Small-range correction (linear counting)
+        estimate = register_count * np.log(register_count / empty_registers)
+
+    return int(round(estimate))
+
+
+def to_python(value: Any) -> Any:
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not np.isfinite(value):
+        return None
+    return value
+
+
+def compute_column_stats(series: pd.Series) -> Dict[str, Any]:
+    non_null = series.dropna()
+    stats: Dict[str, Any] = {
+        "name": str(series.name),
+        "data_type": str(series.dtype),
+        "null_count": int(len(series) - len(non_null)),
+        "non_null_count": int(len(non_null)),
+        "distinct_estimate": hll_distinct_estimate(non_null),
+    }
+    if non_null.empty:
+        return stats
+
+    if pd.api.types.is_numeric_dtype(non_null) and not pd.api.types.is_bool_dtype(non_null):
+        values = non_null.to_numpy(dtype=np.float64)
+        values = values[np.isfinite(values)]
+        if len(values):
+            counts, edges = np.histogram(values, bins=STATS_HISTOGRAM_BINS)
+            stats.update({
+                "min": to_python(values.min()),
+                "max": to_python(values.max()),
+                "mean": to_python(values.mean()),
+                "std": to_python(values.std()),
+                "histogram": {"edges": edges.tolist(), "counts": counts.tolist()},
+            })
+    elif pd.api.types.is_datetime64_any_dtype(non_null):
+        stats.update({"min": to_python(non_null.min()), "max": to_python(non_null.max())})
+
+    try:
+        top_values = non_null.value_counts().head(STATS_TOP_K)
+        stats["top_values"] = [
+            {"value": to_python(value), "count": int(count)} for value, count in top_values.items()
+        ]
+    except TypeError:
+        # Unhashable cells (nested documents) have no meaningful value counts
+        pass
+
+    return stats
+
+
+def compute_dataframe_stats(df: pd.DataFrame, source: str = "ingest") -> Dict[str, Any]:
+    """Full-column statistics for every column, computed with vectorized pandas/NumPy."""
+    return {
+        "row_count": int(len(df)),
+        "column_count": int(len(df.columns)),
+        "columns": [compute_column_stats(df[col]) for col in df.columns],
+        "source": source,
+        "computed_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+    }
@@ -0,0 +1,57 @@
+import datetime
+import uuid
+from decimal import Decimal
+from typing import Any, Dict, List
+
+from bson import ObjectId
+
+
+def to_columns(rows: List[Dict[str, Any]]) -> Dict[str, List[Any]]:
+    """Pivot row dicts into column lists, padding missing keys with None."""
+    names: Dict[str, None] = {}
+    for row in rows:
+        for key in row:
+            names.setdefault(key, None)
+
+    columns = {name: [None] * len(rows) for name in names}
+    for index, row in enumerate(rows):
+        for key, value in row.items():
+            columns[key][index] = str(value) if isinstance(value, ObjectId) else value
+    return columns
+
+
+def _arrow_column(values: List[Any]):
+    import pyarrow as pa
+
+    try:
+        return pa.array(values)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Mixed-type columns (common in schemaless collections) fall back to text
+        return pa.array([None if value is None else str(value) for value in values], type=pa.string())
+
+
+def to_arrow_ipc(rows: List[Dict[str, Any]]) -> bytes:
+    # pyarrow is imported lazily so JSON-only workers never pay for it
+    import pyarrow as pa
+
+    columns = to_columns(rows)
+    table = pa.table({name: _arrow_column(values) for name, values in columns.items()})
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def _msgpack_default(value: Any) -> Any:
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (Decimal, uuid.UUID, ObjectId)):
+        return str(value)
+    raise TypeError(f"Type is not MessagePack serializable: {type(value).__name__}")
+
+
+def to_msgpack(rows: List[Dict[str, Any]]) -> bytes:
+    import msgpack
+
+    return msgpack.packb(to_columns(rows), default=_msgpack_default, use_bin_type=True)
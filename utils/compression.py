@@ -0,0 +1,144 @@
+import asyncio
+import zlib
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from config import (
+    COMPRESSION_MIN_SIZE,
+    COMPRESSION_GZIP_LEVEL,
+    COMPRESSION_ZSTD_LEVEL,
+    COMPRESSION_OFFLOAD_SIZE
+)
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    accepted = {}
+    for part in accept_encoding.split(","):
+        coding, *coding_params = [piece.strip() for piece in part.split(";")]
+        quality = 1.0
+        for coding_param in coding_params:
+            if coding_param.startswith("q="):
+                try:
+                    quality = float(coding_param[2:])
+                except ValueError:
+                    quality = 0.0
+        if coding:
+            accepted[coding.lower()] = quality
+
+    # zstd is preferred when both are acceptable: faster at a similar ratio
+    candidates = ["zstd", "gzip"] if zstandard is not None else ["gzip"]
+    candidates = [coding for coding in candidates if accepted.get(coding, 0.0) > 0]
+    if not candidates:
+        return None
+    return max(candidates, key=lambda coding: accepted[coding])
+
+
+class StreamCompressor:
+    def __init__(self, encoding: str, gzip_level: int, zstd_level: int):
+        if encoding == "zstd":
+            self._compressobj = zstandard.ZstdCompressor(level=zstd_level).compressobj()
+            self._sync_flush = zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        else:
+            self._compressobj = zlib.compressobj(gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self._sync_flush = zlib.Z_SYNC_FLUSH
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        # Non-final chunks are sync-flushed so clients can decode them as they arrive
+        output = self._compressobj.compress(data)
+        if final:
+            return output + self._compressobj.flush()
+        return output + self._compressobj.flush(self._sync_flush)
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = COMPRESSION_MIN_SIZE,
+        gzip_level: int = COMPRESSION_GZIP_LEVEL,
+        zstd_level: int = COMPRESSION_ZSTD_LEVEL,
+        offload_size: int = COMPRESSION_OFFLOAD_SIZE
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.zstd_level = zstd_level
+        self.offload_size = offload_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = CompressionResponder(self, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+
+class CompressionResponder:
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send: Send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.downstream_send = send
+        self.start_message: Optional[Message] = None
+        self.compressor: Optional[StreamCompressor] = None
+        self.passthrough = False
+
+    async def compress(self, data: bytes, final: bool) -> bytes:
+        # Large bodies are compressed off the event loop; zlib and zstandard
+        # both release the GIL while they work
+        if len(data) >= self.middleware.offload_size:
+            return await asyncio.to_thread(self.compressor.compress, data, final)
+        return self.compressor.compress(data, final)
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            return
+
+        if message["type"] != "http.response.body":
+            await self.downstream_send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.compressor is None and not self.passthrough:
+            headers = MutableHeaders(scope=self.start_message)
+            if "content-encoding" in headers or (not more_body and len(body) < self.middleware.minimum_size):
+                self.passthrough = True
+                await self.downstream_send(self.start_message)
+            else:
+                self.compressor = StreamCompressor(
+                    self.encoding, self.middleware.gzip_level, self.middleware.zstd_level
+                )
+                headers["Content-Encoding"] = self.encoding
+                headers.add_vary_header("Accept-Encoding")
+
+                if not more_body:
+                    compressed = await self.compress(body, final=True)
+                    headers["Content-Length"] = str(len(compressed))
+                    await self.downstream_send(self.start_message)
+                    await self.downstream_send({"type": "http.response.body", "body": compressed})
+                    return
+
+                del headers["Content-Length"]
+                await self.downstream_send(self.start_message)
+
+        if self.passthrough:
+            await self.downstream_send(message)
+            return
+
+        compressed = await self.compress(body, final=not more_body)
+        await self.downstream_send({"type": "http.response.body", "body": compressed, "more_body": more_body})
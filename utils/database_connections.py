@@ -1,22 +1,114 @@
-import motor.motor_asyncio
 import ssl
+import asyncio
 import asyncpg
+from pymongo import monitoring
+from typing import Any, Dict, Optional
 
 from config import (
     MONGO_URI, MONGO_DB,
     SUPABASE_DB_HOST, SUPABASE_DB_PORT,
-    SUPABASE_DB_NAME, SUPABASE_DB_USER, SUPABASE_DB_PASSWORD
+    SUPABASE_DB_NAME, SUPABASE_DB_USER, SUPABASE_DB_PASSWORD,
+    SUPABASE_POOL_MIN_SIZE, SUPABASE_POOL_MAX_SIZE, SUPABASE_STATEMENT_CACHE_SIZE
 )
+from utils.circuit_breaker import breakers
 
-mongo_client = motor.motor_asyncio.AsyncIOMotorClient(MONGO_URI)
-mongo_db = mongo_client[MONGO_DB]
 
-async def get_supabase_connection():
+class MongoPoolStats(monitoring.ConnectionPoolListener):
+    """Connection pool counters, which Motor does not expose otherwise.
+
+    pymongo calls these from its own threads; plain integer updates are
+    precise enough for metrics.
+    """
+
+    def __init__(self):
+        self.open = 0
+        self.checked_out = 0
+        self.waiting = 0
+        self.checkout_failures = 0
+        self.cleared = 0
+
+    def pool_created(self, event) -> None:
+        pass
+
+    def pool_ready(self, event) -> None:
+        pass
+
+    def pool_cleared(self, event) -> None:
+        self.cleared += 1
+
+    def pool_closed(self, event) -> None:
+        pass
+
+    def connection_created(self, event) -> None:
+        self.open += 1
+
+    def connection_ready(self, event) -> None:
+        pass
+
+    def connection_closed(self, event) -> None:
+        self.open -= 1
+
+    def connection_check_out_started(self, event) -> None:
+        self.waiting += 1
+
+    def connection_check_out_failed(self, event) -> None:
+        self.waiting -= 1
+        self.checkout_failures += 1
+
+    def connection_checked_out(self, event) -> None:
+        self.waiting -= 1
+        self.checked_out += 1
+
+    def connection_checked_in(self, event) -> None:
+        self.checked_out -= 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "open": self.open,
+            "checked_out": self.checked_out,
+            "waiting": self.waiting,
+            "checkout_failures": self.checkout_failures,
+            "cleared": self.cleared
+        }
+
+
+class LazyMongoDatabase:
+    """The Motor database, with the client built on first use.
+
+    Importing this module then costs neither the Motor import nor the
+    client's background monitor threads, which matters for replicas that
+    have to come up quickly.
+    """
+
+    client = None
+
+    def database(self):
+        if self.client is None:
+            import motor.motor_asyncio
+
+            self.client = motor.motor_asyncio.AsyncIOMotorClient(MONGO_URI, event_listeners=[mongo_pool_stats])
+        return self.client[MONGO_DB]
+
+    def __getitem__(self, name: str):
+        return self.database()[name]
+
+    def __getattr__(self, name: str):
+        return getattr(self.database(), name)
+
+
+mongo_pool_stats = MongoPoolStats()
+mongo_db = LazyMongoDatabase()
+
+supabase_pool: Optional[asyncpg.Pool] = None
+_supabase_pool_lock = asyncio.Lock()
+
+
+def supabase_connect_kwargs() -> Dict[str, Any]:
     ssl_context = ssl.create_default_context()
     ssl_context.check_hostname = False
     ssl_context.verify_mode = ssl.CERT_NONE
 
-    return await asyncpg.connect(
+    return dict(
         user=SUPABASE_DB_USER,
         password=SUPABASE_DB_PASSWORD,
         database=SUPABASE_DB_NAME,
@@ -24,7 +116,54 @@ async def get_supabase_connection():
         port=int(SUPABASE_DB_PORT) if SUPABASE_DB_PORT else 5432,
         ssl=ssl_context,
         command_timeout=60,
+        statement_cache_size=SUPABASE_STATEMENT_CACHE_SIZE,
         server_settings={
             'jit': 'off'
         }
     )
+
+
+async def get_supabase_connection():
+    return await asyncpg.connect(**supabase_connect_kwargs())
+
+
+async def get_supabase_pool() -> asyncpg.Pool:
+    global supabase_pool
+    if supabase_pool is None:
+        async with _supabase_pool_lock:
+            if supabase_pool is None:
+                supabase_pool = await asyncpg.create_pool(
+                    min_size=SUPABASE_POOL_MIN_SIZE,
+                    max_size=SUPABASE_POOL_MAX_SIZE,
+                    **supabase_connect_kwargs()
+                )
+    return supabase_pool
+
+
+async def acquire_supabase_connection():
+    # Refuse at once while Supabase is known to be down, instead of waiting
+    # for another connect attempt to time out
+    breakers["supabase"].check()
+    pool = await get_supabase_pool()
+    return await pool.acquire()
+
+
+async def release_supabase_connection(conn) -> None:
+    await supabase_pool.release(conn)
+
+
+async def close_supabase_pool() -> None:
+    global supabase_pool
+    if supabase_pool is not None:
+        await supabase_pool.close()
+        supabase_pool = None
+
+
+def supabase_pool_stats() -> Dict[str, int]:
+    if supabase_pool is None:
+        return {"size": 0, "idle": 0, "max_size": SUPABASE_POOL_MAX_SIZE}
+    return {
+        "size": supabase_pool.get_size(),
+        "idle": supabase_pool.get_idle_size(),
+        "max_size": supabase_pool.get_max_size()
+    }
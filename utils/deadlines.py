@@ -0,0 +1,68 @@
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Optional
+
+from fastapi import HTTPException, Query
+
+from config import QUERY_MAX_TIMEOUT_MS
+
+# Absolute time.monotonic() by which the current request must finish
+deadline_var: ContextVar[Optional[float]] = ContextVar("deadline", default=None)
+# Tags backend operations so they can be found and killed on disconnect
+operation_id_var: ContextVar[Optional[str]] = ContextVar("operation_id", default=None)
+
+
+class DeadlineExceeded(Exception):
+    def __init__(self, message: str = "Query deadline exceeded"):
+        super().__init__(message)
+
+    def to_http(self) -> HTTPException:
+        return HTTPException(status_code=504, detail=str(self))
+
+
+def set_deadline(timeout_ms: int) -> None:
+    timeout_ms = max(1, min(timeout_ms, QUERY_MAX_TIMEOUT_MS))
+    deadline_var.set(time.monotonic() + timeout_ms / 1000)
+
+
+def remaining_ms(default_ms: int) -> int:
+    """Time left for a backend call, in milliseconds.
+
+    Outside a request deadline the endpoint default applies, still capped
+    by QUERY_MAX_TIMEOUT_MS.
+    """
+    deadline = deadline_var.get()
+    if deadline is None:
+        return max(1, min(default_ms, QUERY_MAX_TIMEOUT_MS))
+
+    left = int((deadline - time.monotonic()) * 1000)
+    if left <= 0:
+        raise DeadlineExceeded()
+    return left
+
+
+def remaining_seconds(default_ms: int) -> float:
+    return remaining_ms(default_ms) / 1000
+
+
+def request_deadline(default_ms: int):
+    """Route dependency that starts the request deadline.
+
+    The endpoint supplies its default and callers may ask for a different
+    one with ``timeout_ms``; both are capped by QUERY_MAX_TIMEOUT_MS.
+    """
+    async def dependency(
+        timeout_ms: Optional[int] = Query(
+            None, ge=1, description=f"Server-side time limit in milliseconds (max {QUERY_MAX_TIMEOUT_MS})"
+        )
+    ) -> None:
+        set_deadline(timeout_ms or default_ms)
+
+    return dependency
+
+
+def new_operation_id() -> str:
+    operation_id = uuid.uuid4().hex
+    operation_id_var.set(operation_id)
+    return operation_id
@@ -0,0 +1,52 @@
+import asyncio
+import logging
+from typing import Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from utils.deadlines import new_operation_id
+
+logger = logging.getLogger(__name__)
+
+
+class DisconnectCancellationMiddleware:
+    """Cancel a request's handler as soon as its client disconnects.
+
+    Starlette keeps running a handler whose client has gone away, so a heavy
+    query would keep holding a connection and a backend slot. Here the
+    request body is relayed to the app through a queue while a watcher keeps
+    reading from the server; an ``http.disconnect`` cancels the handler,
+    which cancels the in-flight driver call.
+    """
+
+    def __init__(self, app: ASGIApp, skip_prefixes: Tuple[str, ...] = ()):
+        self.app = app
+        self.skip_prefixes = skip_prefixes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"].startswith(self.skip_prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        new_operation_id()
+        messages: asyncio.Queue = asyncio.Queue()
+        handler = asyncio.ensure_future(self.app(scope, messages.get, send))
+
+        async def watch() -> None:
+            while True:
+                message: Message = await receive()
+                await messages.put(message)
+                if message["type"] == "http.disconnect":
+                    if not handler.done():
+                        logger.info(f"Client disconnected, cancelling {scope['method']} {scope['path']}")
+                        handler.cancel()
+                    return
+
+        watcher = asyncio.ensure_future(watch())
+        try:
+            await handler
+        except asyncio.CancelledError:
+            if not watcher.done():
+                raise
+        finally:
+            watcher.cancel()
@@ -3,13 +3,17 @@ from fastapi import UploadFile
 import io
 
 
-async def parse_file(file: UploadFile) -> pd.DataFrame:
-    content = await file.read()
-    if file.filename.endswith('.csv'):
+def parse_content(filename: str, content: bytes) -> pd.DataFrame:
+    if filename.endswith('.csv'):
         df = pd.read_csv(io.BytesIO(content))
-    elif file.filename.endswith(('.xls', '.xlsx')):
+    elif filename.endswith(('.xls', '.xlsx')):
         df = pd.read_excel(io.BytesIO(content))
     else:
         raise ValueError("Unsupported file format")
 
     return df
+
+
+async def parse_file(file: UploadFile) -> pd.DataFrame:
+    content = await file.read()
+    return parse_content(file.filename, content)
@@ -0,0 +1,238 @@
+import datetime
+import operator
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+import numpy as np
+import pandas as pd
+
+from schemas.schema import QueryParams
+
+COMPARISONS = {
+    "gte": operator.ge,
+    "gt": operator.gt,
+    "lte": operator.le,
+    "lt": operator.lt,
+    "eq": operator.eq,
+}
+
+
+# Hidden column of Mongo frames listing the keys each document doesn't
+# have; BSON keys can't contain NUL, so it can't clash with a field
+ABSENT_KEYS_COLUMN = "\0absent"
+
+# LIKE wildcards and its escape character, which the database path binds unescaped
+LIKE_SPECIAL = ("%", "_", "\\")
+
+
+class UnsupportedFrameQuery(Exception):
+    """The query can't be answered from the frame with the backend's semantics."""
+
+
+def is_missing(value: Any) -> bool:
+    return value is None or value is pd.NA or value is pd.NaT or (isinstance(value, float) and value != value)
+
+
+def column_values(values: List[Any]) -> pd.Series:
+    """One column as the backend returned it.
+
+    Integer and boolean columns get pandas' nullable dtypes, so a NULL
+    doesn't turn the rest of the column into floats.
+    """
+    present = [value for value in values if value is not None]
+    if present and all(type(value) is bool for value in present):
+        return pd.Series(pd.array(values, dtype="boolean"))
+    if present and all(type(value) is int for value in present):
+        try:
+            return pd.Series(pd.array(values, dtype="Int64"))
+        except (OverflowError, TypeError):
+            return pd.Series(values, dtype=object)
+    if present and all(type(value) is float for value in present):
+        return pd.Series(values, dtype="float64")
+    if present and all(isinstance(value, datetime.datetime) for value in present):
+        try:
+            return pd.Series(pd.to_datetime(values))
+        except (TypeError, ValueError):
+            return pd.Series(values, dtype=object)
+    return pd.Series(values, dtype=object)
+
+
+def build_frame(columns: List[str], rows: Sequence[Sequence[Any]]) -> pd.DataFrame:
+    values_by_column = list(zip(*rows)) if rows else [() for _ in columns]
+    return pd.DataFrame(
+        {column: column_values(list(values)) for column, values in zip(columns, values_by_column)},
+        columns=columns
+    )
+
+
+def pg_float_text(value: float) -> str:
+    # float8out: shortest round-trip digits, exponent below 1e-4 and from 1e15
+    if value != value:
+        return "NaN"
+    if value in (float("inf"), float("-inf")):
+        return "Infinity" if value > 0 else "-Infinity"
+    text = repr(value)
+    exponent = Decimal(text).adjusted()
+    if -4 <= exponent < 15:
+        return text[:-2] if text.endswith(".0") else text
+
+    sign, digits, _ = Decimal(text).as_tuple()
+    digits = "".join(str(digit) for digit in digits).rstrip("0") or "0"
+    mantissa = digits[0] + (f".{digits[1:]}" if len(digits) > 1 else "")
+    return f"{'-' if sign else ''}{mantissa}e{'+' if exponent >= 0 else '-'}{abs(exponent):02d}"
+
+
+def pg_text(value: Any) -> str:
+    """``CAST(value AS TEXT)`` as Postgres renders it."""
+    if isinstance(value, (bool, np.bool_)):
+        return "true" if value else "false"
+    if isinstance(value, (int, np.integer)):
+        return str(int(value))
+    if isinstance(value, (float, np.floating)):
+        return pg_float_text(float(value))
+    if isinstance(value, datetime.datetime):
+        if value.tzinfo is not None:
+            raise UnsupportedFrameQuery("timestamptz text depends on the session time zone")
+        text = value.strftime("%Y-%m-%d %H:%M:%S")
+        if value.microsecond:
+            text += f".{value.microsecond:06d}".rstrip("0")
+        return text
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (str, Decimal, UUID)):
+        return str(value)
+    raise UnsupportedFrameQuery(f"No Postgres text form for {type(value).__name__}")
+
+
+def python_value(value: Any) -> Any:
+    """A frame value as the database driver would have returned it."""
+    if is_missing(value):
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def text_values(series: pd.Series, text_cast: bool) -> Optional[pd.Series]:
+    # Postgres casts every column to TEXT before ILIKE; Mongo's $regex only
+    # ever matches string values
+    if text_cast:
+        return series.astype(object).map(lambda value: None if is_missing(value) else pg_text(value).lower())
+    if pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series):
+        return series.str.lower()
+    return None
+
+
+def text_mask(series: pd.Series, term: Any, mode: str, text_cast: bool) -> pd.Series:
+    term = str(term).lower()
+    if text_cast and any(char in term for char in LIKE_SPECIAL):
+        raise UnsupportedFrameQuery("LIKE wildcards in the pattern")
+
+    values = text_values(series, text_cast)
+    if values is None:
+        return pd.Series(False, index=series.index)
+
+    if mode == "startswith":
+        matched = values.str.startswith(term, na=False)
+    elif mode == "endswith":
+        matched = values.str.endswith(term, na=False)
+    else:
+        matched = values.str.contains(term, regex=False, na=False)
+    return matched.fillna(False).astype(bool)
+
+
+def filter_mask(df: pd.DataFrame, params: QueryParams, fields: List[str], text_cast: bool) -> pd.Series:
+    mask = pd.Series(True, index=df.index)
+
+    if params.search and params.search.strip():
+        search_cols = params.search_columns if params.search_columns else fields
+        valid_search_cols = [col for col in search_cols if col in fields]
+        if valid_search_cols:
+            search_mask = pd.Series(False, index=df.index)
+            for col in valid_search_cols:
+                if col in df.columns:
+                    search_mask |= text_mask(df[col], params.search.strip(), "contains", text_cast)
+            mask &= search_mask
+
+    for field, value in (params.filters or {}).items():
+        if field not in fields:
+            continue
+        if field not in df.columns:
+            # The field exists in the schema but on no loaded row
+            mask &= False
+            continue
+
+        series = df[field]
+        conditions = value.items() if isinstance(value, dict) else [("eq", value)]
+        for op, filter_value in conditions:
+            try:
+                if op in COMPARISONS:
+                    mask &= COMPARISONS[op](series, filter_value).fillna(False).astype(bool)
+                elif op == "ne":
+                    # SQL drops NULLs from <>, Mongo's $ne matches them
+                    condition = (series != filter_value).fillna(not text_cast).astype(bool)
+                    mask &= (condition & series.notna()) if text_cast else condition
+                elif op == "in" and isinstance(filter_value, list):
+                    mask &= series.isin(filter_value)
+                elif op in ("contains", "startswith", "endswith"):
+                    mask &= text_mask(series, filter_value, op, text_cast)
+            except TypeError as e:
+                # Mixed-type comparisons are where pandas and the databases disagree
+                raise UnsupportedFrameQuery(str(e))
+
+    return mask
+
+
+def run_frame_query(
+    df: pd.DataFrame,
+    params: QueryParams,
+    fields: List[str],
+    output_columns: Optional[List[str]],
+    text_cast: bool,
+    nulls_first: bool
+) -> Tuple[int, List[Dict[str, Any]]]:
+    """Evaluate QueryParams filter, search, sort and paging over a loaded dataset.
+
+    ``text_cast`` selects Postgres text-matching semantics (every column is
+    matched as text) over Mongo's (strings only). ``nulls_first`` is where
+    nulls sort in ascending order; descending order puts them at the other end.
+    """
+    matched = df[filter_mask(df, params, fields, text_cast)]
+    total_count = len(matched)
+
+    if params.sort_by and params.sort_by in fields and params.sort_by in matched.columns:
+        if text_cast and pd.api.types.is_object_dtype(matched[params.sort_by]):
+            raise UnsupportedFrameQuery("Text ordering follows the database collation")
+        ascending = params.sort_order.lower() != "desc"
+        nulls_first_here = nulls_first if ascending else not nulls_first
+        try:
+            matched = matched.sort_values(
+                params.sort_by,
+                ascending=ascending,
+                kind="stable",
+                na_position="first" if nulls_first_here else "last"
+            )
+        except TypeError as e:
+            raise UnsupportedFrameQuery(str(e))
+
+    skip = (params.page - 1) * params.limit
+    page = matched.iloc[skip:skip + params.limit]
+
+    absent = page[ABSENT_KEYS_COLUMN].tolist() if ABSENT_KEYS_COLUMN in page.columns else [None] * len(page)
+    if output_columns is not None:
+        page = page[[col for col in output_columns if col in page.columns]]
+    else:
+        page = page.drop(columns=ABSENT_KEYS_COLUMN, errors="ignore")
+
+    columns = list(page.columns)
+    return total_count, [
+        {
+            column: python_value(value)
+            for column, value in zip(columns, row)
+            if not absent_keys or column not in absent_keys
+        }
+        for absent_keys, row in zip(absent, page.itertuples(index=False, name=None))
+    ]
@@ -0,0 +1,71 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from config import HEALTH_CHECK_INTERVAL_SECONDS, HEALTH_CHECK_TIMEOUT_SECONDS
+from utils.background import spawn
+from utils.circuit_breaker import breakers
+
+logger = logging.getLogger(__name__)
+
+
+class HealthMonitor:
+    """Ping each backend on an interval and keep the latest result.
+
+    Health endpoints read the cached status instead of opening connections
+    per request. Backends whose circuit is open are reported down without
+    being pinged; the breaker's own probe decides when they recover.
+    """
+
+    def __init__(self, interval: float, timeout: float):
+        self.interval = interval
+        self.timeout = timeout
+        self.probes: Dict[str, Callable[[], Awaitable[Any]]] = {}
+        self.status: Dict[str, Dict[str, Any]] = {}
+
+    def register(self, backend: str, probe: Callable[[], Awaitable[Any]]) -> None:
+        self.probes[backend] = probe
+
+    async def check(self, backend: str) -> None:
+        breaker = breakers.get(backend)
+        started = time.perf_counter()
+        status = {"connected": False, "latency_ms": None, "error": None}
+        if breaker is not None and breaker.is_open:
+            status["error"] = "circuit open"
+        else:
+            try:
+                await asyncio.wait_for(self.probes[backend](), timeout=self.timeout)
+                status["connected"] = True
+                status["latency_ms"] = round((time.perf_counter() - started) * 1000, 2)
+            except Exception as e:
+                status["error"] = f"{type(e).__name__}: {e}"
+        status["checked_at"] = time.time()
+
+        previous = self.status.get(backend)
+        if previous is not None and previous["connected"] != status["connected"]:
+            logger.warning(f"{backend} health changed: {'up' if status['connected'] else 'down'} ({status['error']})")
+        self.status[backend] = status
+
+    async def check_all(self) -> None:
+        await asyncio.gather(*(self.check(backend) for backend in self.probes))
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.check_all()
+            except Exception as e:
+                logger.error(f"Health check pass failed: {e}")
+
+    def start(self) -> None:
+        spawn(self.run(), key="health_monitor")
+
+    def is_connected(self, backend: str) -> bool:
+        return self.status.get(backend, {}).get("connected", False)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        return {backend: dict(status) for backend, status in self.status.items()}
+
+
+health_monitor = HealthMonitor(HEALTH_CHECK_INTERVAL_SECONDS, HEALTH_CHECK_TIMEOUT_SECONDS)
@@ -0,0 +1,136 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from config import (
+    HOT_DATASETS,
+    HOT_DATASET_MAX_ROWS,
+    HOT_DATASET_MEMORY_MB,
+    HOT_DATASET_RETRY_SECONDS,
+    HOT_DATASET_MAX_AGE_SECONDS,
+    QUERY_ONLY
+)
+from utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class HotDatasetStore:
+    """LRU store of whole datasets held as DataFrames under a memory budget.
+
+    Frames are loaded on first use through a backend-supplied loader, which
+    returns None when the dataset is over ``max_rows``. Datasets that don't
+    fit are remembered for ``retry_seconds`` so they aren't reloaded on
+    every query. Frames older than ``max_age_seconds`` are reloaded, since
+    an upload taken by another worker or replica never invalidates them here.
+    """
+
+    def __init__(self, names: str, max_rows: int, memory_budget_bytes: int, retry_seconds: float,
+                 max_age_seconds: float):
+        configured = {name.strip() for name in names.split(",") if name.strip()}
+        self.all_datasets = "*" in configured
+        self.names = configured - {"*"}
+        self.max_rows = max_rows
+        self.memory_budget_bytes = memory_budget_bytes
+        self.max_age_seconds = max_age_seconds
+        self.used_bytes = 0
+
+        self._frames: "OrderedDict[Hashable, tuple[Any, int, float]]" = OrderedDict()
+        # Only kept while a load is in progress, so they don't grow with
+        # every dataset name ever queried
+        self._versions: Dict[Hashable, int] = {}
+        self._locks: Dict[Hashable, asyncio.Lock] = {}
+        self._lock_users: Dict[Hashable, int] = {}
+        self._ineligible = TTLCache(retry_seconds, 4096)
+
+    def enabled_for(self, name: str) -> bool:
+        return self.all_datasets or name in self.names
+
+    def fresh_entry(self, key: Hashable) -> Optional[tuple]:
+        entry = self._frames.get(key)
+        if entry is not None and time.monotonic() - entry[2] > self.max_age_seconds:
+            self._frames.pop(key)
+            self.used_bytes -= entry[1]
+            return None
+        return entry
+
+    async def get(self, key: Hashable, loader: Callable[[int], Awaitable[Optional[Any]]]) -> Optional[Any]:
+        entry = self.fresh_entry(key)
+        if entry is not None:
+            self._frames.move_to_end(key)
+            return entry[0]
+
+        if self._ineligible.get(key):
+            return None
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        self._lock_users[key] = self._lock_users.get(key, 0) + 1
+        try:
+            async with lock:
+                return await self.load(key, loader)
+        finally:
+            self._lock_users[key] -= 1
+            if self._lock_users[key] == 0:
+                del self._lock_users[key]
+                del self._locks[key]
+                self._versions.pop(key, None)
+
+    async def load(self, key: Hashable, loader: Callable[[int], Awaitable[Optional[Any]]]) -> Optional[Any]:
+        entry = self.fresh_entry(key)
+        if entry is not None:
+            return entry[0]
+
+        version = self._versions.get(key, 0)
+        frame = await loader(self.max_rows)
+        if frame is None:
+            self._ineligible.set(key, True)
+            return None
+
+        nbytes = int(frame.memory_usage(deep=True).sum())
+        if nbytes > self.memory_budget_bytes:
+            logger.info(f"Hot dataset {key} needs {nbytes} bytes, over the memory budget")
+            self._ineligible.set(key, True)
+            return None
+
+        if self._versions.get(key, 0) != version:
+            # An upload landed while loading; serve this request from the
+            # database and load the fresh data next time
+            return None
+
+        while self._frames and self.used_bytes + nbytes > self.memory_budget_bytes:
+            evicted_key, (_, evicted_bytes, _) = self._frames.popitem(last=False)
+            self.used_bytes -= evicted_bytes
+            logger.info(f"Evicted hot dataset {evicted_key}")
+
+        self._frames[key] = (frame, nbytes, time.monotonic())
+        self.used_bytes += nbytes
+        logger.info(f"Loaded hot dataset {key}: {len(frame)} rows, {nbytes} bytes")
+        return frame
+
+    def invalidate(self, key: Hashable) -> None:
+        if key in self._locks:
+            # Tells a load in progress that its data is already stale
+            self._versions[key] = self._versions.get(key, 0) + 1
+        self._ineligible.invalidate(lambda ineligible_key: ineligible_key == key)
+        entry = self._frames.pop(key, None)
+        if entry is not None:
+            self.used_bytes -= entry[1]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "datasets": len(self._frames),
+            "used_bytes": self.used_bytes,
+            "memory_budget_bytes": self.memory_budget_bytes
+        }
+
+
+# Frames need pandas, which the query profile never loads
+hot_datasets = HotDatasetStore(
+    "" if QUERY_ONLY else HOT_DATASETS,
+    HOT_DATASET_MAX_ROWS,
+    HOT_DATASET_MEMORY_MB * 1024 * 1024,
+    HOT_DATASET_RETRY_SECONDS,
+    HOT_DATASET_MAX_AGE_SECONDS
+)
@@ -0,0 +1,259 @@
+import abc
+import asyncio
+import bisect
+import logging
+import time
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from config import LOOP_LAG_INTERVAL_SECONDS
+from utils.background import spawn
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{escape_label(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric(abc.ABC):
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+
+    @abc.abstractmethod
+    def samples(self) -> List[str]:
+        """Sample lines in the text format, without HELP and TYPE."""
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}", *self.samples()]
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self.values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{format_labels(self.labels, labels)} {format_value(value)}"
+            for labels, value in self.values.items()
+        ]
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def set(self, value: float, *labels: str) -> None:
+        self.values[labels] = value
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.values[labels] = self.values.get(labels, 0) - amount
+
+
+class CounterFunction(Metric):
+    """Counter whose totals are kept by another component.
+
+    ``read`` returns the current total per label set and is called at
+    scrape time, so the totals are exported as they are instead of being
+    copied into a counter that could then be set backwards.
+    """
+
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str], read: Callable[[], Dict[LabelValues, float]]):
+        super().__init__(name, help, labels)
+        self.read = read
+
+    def samples(self) -> List[str]:
+        try:
+            totals = self.read()
+        except Exception as e:
+            logger.warning(f"Reading {self.name} failed: {e}")
+            return []
+        return [
+            f"{self.name}{format_labels(self.labels, labels)} {format_value(value)}"
+            for labels, value in totals.items()
+        ]
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+        # Per label set: counts per bucket (last one is +Inf), sum, count
+        self.series: Dict[LabelValues, List] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def samples(self) -> List[str]:
+        lines = []
+        for labels, (counts, total, count) in self.series.items():
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, float("inf")), counts):
+                cumulative += bucket_count
+                le = format_labels(self.labels, labels, f'le="{format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            lines.append(f"{self.name}_sum{format_labels(self.labels, labels)} {format_value(total)}")
+            lines.append(f"{self.name}_count{format_labels(self.labels, labels)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """In-process metrics rendered in the Prometheus text format.
+
+    Hot paths only touch dicts of floats. State that already lives in other
+    components (pools, caches, admission controllers) is copied into gauges
+    by collectors that run once per scrape; totals they keep are read
+    through counter functions.
+    """
+
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+        self.collectors: List[Callable[[], None]] = []
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric '{metric.name}' is already registered")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labels))
+
+    def gauge(self, name: str, help: str, labels: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, help, labels))
+
+    def counter_function(
+        self, name: str, help: str, labels: Sequence[str], read: Callable[[], Dict[LabelValues, float]]
+    ) -> CounterFunction:
+        return self.register(CounterFunction(name, help, labels, read))
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labels, buckets))
+
+    def register_collector(self, collector: Callable[[], None]) -> None:
+        self.collectors.append(collector)
+
+    def render(self) -> str:
+        for collector in self.collectors:
+            try:
+                collector()
+            except Exception as e:
+                logger.warning(f"Metrics collector {collector.__name__} failed: {e}")
+        lines = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+http_request_duration = metrics.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("method", "route", "status")
+)
+http_requests_in_flight = metrics.gauge("http_requests_in_flight", "HTTP requests currently being served", ("method",))
+backend_operation_duration = metrics.histogram(
+    "backend_operation_duration_seconds",
+    "Time backend operations hold an admission slot",
+    ("backend", "kind", "outcome")
+)
+query_phase_duration = metrics.histogram(
+    "query_phase_duration_seconds",
+    "Time spent in each phase of traced queries",
+    ("backend", "operation", "phase")
+)
+query_rows_returned = metrics.counter("query_rows_returned_total", "Rows returned by dataset queries", ("backend",))
+query_json_bytes = metrics.counter(
+    "query_json_bytes_total", "Bytes of pre-encoded JSON returned by dataset queries", ("backend",)
+)
+event_loop_lag = metrics.histogram("event_loop_lag_seconds", "Event loop scheduling delay", buckets=LAG_BUCKETS)
+event_loop_lag_last = metrics.gauge("event_loop_lag_last_seconds", "Most recent event loop scheduling delay")
+
+
+class MetricsMiddleware:
+    """Time every HTTP request and count the ones in flight.
+
+    Requests are labelled with the route template rather than the raw path,
+    so dataset names don't create a series each.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = "499"
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        started = time.perf_counter()
+        http_requests_in_flight.inc(method)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            status = "500"
+            raise
+        finally:
+            http_requests_in_flight.dec(method)
+            route = scope.get("route")
+            http_request_duration.observe(
+                time.perf_counter() - started, method, getattr(route, "path", "unmatched"), status
+            )
+
+
+async def watch_loop_lag(interval: float) -> None:
+    # A sleep that wakes late measures how long other callbacks held the loop
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        lag = max(time.perf_counter() - started - interval, 0.0)
+        event_loop_lag.observe(lag)
+        event_loop_lag_last.set(lag)
+
+
+def start_loop_lag_monitor() -> None:
+    spawn(watch_loop_lag(LOOP_LAG_INTERVAL_SECONDS), key="loop_lag")
@@ -0,0 +1,166 @@
+import asyncio
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from config import PROFILE_DIR, PROFILE_INTERVAL_MS, PROFILE_SAMPLE_RATE
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "x-profile"
+# Leaf frames of threads that are parked: waiting on a lock, a queue or a
+# timer (executor workers block in C, so their leaf is the worker loop)
+IDLE_MODULES = ("threading.py", "queue.py", "selectors.py")
+IDLE_FUNCTIONS = {("thread.py", "_worker"), ("periodic_executor.py", "_run")}
+
+
+def is_idle(code) -> bool:
+    filename = os.path.basename(code.co_filename)
+    return filename in IDLE_MODULES or (filename, code.co_name) in IDLE_FUNCTIONS
+
+
+def frame_label(code) -> str:
+    path = code.co_filename
+    if "site-packages" + os.sep in path:
+        path = path.split("site-packages" + os.sep, 1)[1]
+    elif path.startswith(os.getcwd()):
+        path = os.path.relpath(path)
+    else:
+        path = os.path.basename(path)
+    return f"{code.co_name} ({path}:{code.co_firstlineno})"
+
+
+class ProfileSession:
+    """Sample every thread's stack on an interval until stopped.
+
+    Stacks are kept in the collapsed format read by flamegraph.pl, inferno
+    and speedscope: one line per distinct stack, root first, with the
+    number of samples that saw it.
+    """
+
+    def __init__(self, loop_thread_id: int, interval: float):
+        self.loop_thread_id = loop_thread_id
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self.sample_count = 0
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="profiler", daemon=True)
+
+    def run(self) -> None:
+        own_id = threading.get_ident()
+        names = {}
+        while not self.stopped.wait(self.interval):
+            self.sample_count += 1
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                # Idle pool and monitor threads only add noise; the loop
+                # thread is kept, where idle time means waiting on I/O
+                if thread_id != self.loop_thread_id and is_idle(frame.f_code):
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(frame_label(frame.f_code))
+                    frame = frame.f_back
+                if thread_id not in names:
+                    names = {thread.ident: thread.name for thread in threading.enumerate()}
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.samples[";".join(reversed(stack))] += 1
+
+    def start(self) -> None:
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.stopped.set()
+        self.thread.join()
+
+    def write(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class SamplingProfiler:
+    """Profile single requests into collapsed-stack files on local disk.
+
+    A request is profiled when it sends ``X-Profile: 1`` or is picked by
+    ``sample_rate``. Sampling sees the whole process, so work from other
+    requests running at the same time shows up too; only one request is
+    profiled at a time to keep the overhead bounded.
+    """
+
+    def __init__(self, directory: str, interval_ms: float, sample_rate: float):
+        self.directory = directory
+        self.interval = interval_ms / 1000
+        self.sample_rate = sample_rate
+        self.session: Optional[ProfileSession] = None
+
+    def wanted(self, scope: Scope) -> bool:
+        requested = Headers(scope=scope).get(PROFILE_HEADER, "").lower() in ("1", "true")
+        return requested or (self.sample_rate > 0 and random.random() < self.sample_rate)
+
+    def output_path(self, scope: Scope) -> str:
+        route = re.sub(r"[^A-Za-z0-9]+", "_", scope["path"]).strip("_") or "root"
+        return os.path.join(self.directory, f"{int(time.time() * 1000)}_{scope['method']}_{route}.folded")
+
+    def start(self) -> Optional[ProfileSession]:
+        if self.session is not None:
+            return None
+        self.session = ProfileSession(threading.get_ident(), self.interval)
+        self.session.start()
+        return self.session
+
+    async def finish(self, session: ProfileSession, path: str, elapsed: float) -> None:
+        session.stop()
+        self.session = None
+        try:
+            await asyncio.to_thread(session.write, path)
+            logger.info(f"Wrote profile {path} ({session.sample_count} samples over {elapsed * 1000:.0f} ms)")
+        except OSError as e:
+            logger.warning(f"Writing profile {path} failed: {e}")
+
+
+class ProfilingMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        directory: str = PROFILE_DIR,
+        interval_ms: float = PROFILE_INTERVAL_MS,
+        sample_rate: float = PROFILE_SAMPLE_RATE
+    ):
+        self.app = app
+        self.profiler = SamplingProfiler(directory, interval_ms, sample_rate)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.profiler.wanted(scope):
+            await self.app(scope, receive, send)
+            return
+
+        session = self.profiler.start()
+        if session is None:
+            logger.info(f"Profiler busy, not profiling {scope['method']} {scope['path']}")
+            await self.app(scope, receive, send)
+            return
+
+        path = self.profiler.output_path(scope)
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append("X-Profile-Output", path)
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            await self.profiler.finish(session, path, time.perf_counter() - started)
@@ -0,0 +1,72 @@
+from typing import Dict, Optional, Union
+
+from fastapi import Response
+
+from schemas.schema import QueryResult
+from utils.columnar import to_arrow_ipc, to_msgpack
+
+JSON_MEDIA_TYPE = "application/json"
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+
+MEDIA_TYPE_FORMATS = {
+    JSON_MEDIA_TYPE: "json",
+    ARROW_MEDIA_TYPE: "arrow",
+    MSGPACK_MEDIA_TYPE: "msgpack",
+    "application/x-msgpack": "msgpack",
+}
+
+
+def negotiate_format(accept: Optional[str]) -> str:
+    """Pick the response format from an Accept header, defaulting to JSON."""
+    if not accept:
+        return "json"
+
+    best_format, best_quality = "json", 0.0
+    for part in accept.split(","):
+        media_type, *media_params = [piece.strip() for piece in part.split(";")]
+        quality = 1.0
+        for media_param in media_params:
+            if media_param.startswith("q="):
+                try:
+                    quality = float(media_param[2:])
+                except ValueError:
+                    quality = 0.0
+
+        response_format = MEDIA_TYPE_FORMATS.get(media_type.lower())
+        if response_format and quality > best_quality:
+            best_format, best_quality = response_format, quality
+
+    return best_format
+
+
+def pagination_headers(result: QueryResult) -> Dict[str, str]:
+    return {
+        "X-Total-Count": str(result.total_count),
+        "X-Page": str(result.page),
+        "X-Limit": str(result.limit),
+        "X-Total-Pages": str(result.total_pages),
+        "X-Has-Next": str(result.has_next).lower(),
+        "X-Has-Previous": str(result.has_previous).lower(),
+    }
+
+
+def query_response(result: Union[QueryResult, bytes], response_format: str = "json"):
+    if isinstance(result, bytes):
+        return Response(content=result, media_type=JSON_MEDIA_TYPE)
+
+    if response_format == "arrow":
+        return Response(
+            content=to_arrow_ipc(result.data),
+            media_type=ARROW_MEDIA_TYPE,
+            headers=pagination_headers(result)
+        )
+
+    if response_format == "msgpack":
+        return Response(
+            content=to_msgpack(result.data),
+            media_type=MSGPACK_MEDIA_TYPE,
+            headers=pagination_headers(result)
+        )
+
+    return result
@@ -0,0 +1,50 @@
+import base64
+from decimal import Decimal
+from typing import Any, Dict
+
+import orjson
+from bson import ObjectId
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, (ObjectId, Decimal)):
+        return str(value)
+    if isinstance(value, bytes):
+        # bytes and bson Binary, as text like the validated response renders
+        # them; bytes that aren't UTF-8, which it can't render, as base64
+        try:
+            return value.decode()
+        except UnicodeDecodeError:
+            return base64.b64encode(value).decode()
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(value: Any) -> bytes:
+    return orjson.dumps(value, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+def canonical_dumps(value: Any) -> bytes:
+    """Encode with sorted keys, so equal values give equal bytes for use as keys."""
+    return orjson.dumps(value, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_SORT_KEYS)
+
+
+def loads(data):
+    return orjson.loads(data)
+
+
+def pagination_meta(total_count: int, page: int, limit: int) -> Dict[str, Any]:
+    total_pages = (total_count + limit - 1) // limit
+    return {
+        "total_count": total_count,
+        "page": page,
+        "limit": limit,
+        "total_pages": total_pages,
+        "has_next": page < total_pages,
+        "has_previous": page > 1
+    }
+
+
+def query_result_json(data_json: bytes, total_count: int, page: int, limit: int) -> bytes:
+    """Wrap an already-encoded ``data`` array in the QueryResult envelope."""
+    meta = dumps(pagination_meta(total_count, page, limit))
+    return b'{"data":' + data_json + b"," + meta[1:]
@@ -0,0 +1,123 @@
+import asyncio
+import contextvars
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from config import QUERY_COALESCING, QUERY_TIMEOUT_MS
+from utils.deadlines import DeadlineExceeded, deadline_var, new_operation_id, operation_id_var
+from utils.slow_queries import QueryTrace, describe_query, trace_var
+from utils.timing import record_phase
+
+
+class Flight:
+    """One shared call, run in a context of its own.
+
+    The call doesn't inherit the starting request's context: its deadline
+    is the widest among the waiters (never below QUERY_TIMEOUT_MS), it gets
+    its own operation id, and its phases and compiled query are collected
+    here and handed to every waiter's timings and trace.
+    """
+
+    def __init__(self, factory: Callable[[], Awaitable[Any]], deadline: Optional[float], tagged: bool):
+        self.deadline = self.widest(time.monotonic() + QUERY_TIMEOUT_MS / 1000, deadline)
+        self.trace = QueryTrace("", "", "")
+        self.context = contextvars.Context()
+        self.context.run(self.enter, tagged)
+        self.task = asyncio.get_running_loop().create_task(factory(), context=self.context)
+        self.waiters = 0
+
+    def enter(self, tagged: bool) -> None:
+        deadline_var.set(self.deadline)
+        trace_var.set(self.trace)
+        if tagged:
+            new_operation_id()
+
+    @staticmethod
+    def widest(current: Optional[float], deadline: Optional[float]) -> Optional[float]:
+        if current is None or deadline is None:
+            return None
+        return max(current, deadline)
+
+    def join(self, deadline: Optional[float]) -> None:
+        widened = self.widest(self.deadline, deadline)
+        if widened != self.deadline:
+            # Backend calls started from here on get the later deadline
+            self.deadline = widened
+            self.context.run(deadline_var.set, widened)
+
+    def report(self) -> None:
+        for name, ms in self.trace.phases.items():
+            record_phase(name, ms)
+        if self.trace.query:
+            describe_query(**self.trace.query)
+
+
+class SingleFlight:
+    """Share one in-flight call among concurrent callers with the same key.
+
+    The first caller for a key starts the call; callers arriving while it is
+    still running await the same task instead of starting their own. Each
+    caller stops waiting at its own deadline, and the task is cancelled only
+    once every caller waiting on it has gone away.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.flights: Dict[Hashable, Flight] = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    async def run(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        if not self.enabled:
+            self.executed += 1
+            return await factory()
+
+        deadline = deadline_var.get()
+        flight = self.flights.get(key)
+        if flight is None:
+            flight = Flight(factory, deadline, operation_id_var.get() is not None)
+            self.flights[key] = flight
+            self.executed += 1
+
+            def finished(done: asyncio.Task) -> None:
+                if self.flights.get(key) is flight:
+                    del self.flights[key]
+                if not done.cancelled():
+                    # Mark the exception retrieved when every waiter left
+                    done.exception()
+
+            flight.task.add_done_callback(finished)
+        else:
+            flight.join(deadline)
+            self.coalesced += 1
+
+        flight.waiters += 1
+        timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+        try:
+            return await asyncio.wait_for(asyncio.shield(flight.task), timeout)
+        except asyncio.TimeoutError:
+            if flight.task.done():
+                raise
+            self.leave(flight)
+            raise DeadlineExceeded()
+        except asyncio.CancelledError:
+            self.leave(flight)
+            raise
+        finally:
+            flight.report()
+
+    def leave(self, flight: Flight) -> None:
+        flight.waiters -= 1
+        if flight.waiters == 0:
+            flight.task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+            "in_flight": len(self.flights)
+        }
+
+
+query_flights = SingleFlight(QUERY_COALESCING)
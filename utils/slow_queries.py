@@ -0,0 +1,176 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from config import (
+    SLOW_QUERY_ENABLED,
+    SLOW_QUERY_THRESHOLD_MS,
+    SLOW_QUERY_LOG_SIZE,
+    SLOW_QUERY_EXPLAIN,
+    SLOW_QUERY_EXPLAIN_TIMEOUT_SECONDS
+)
+from utils.background import spawn
+from utils.metrics import query_phase_duration
+from utils.serialization import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+Explainer = Callable[[str, Dict[str, Any]], Awaitable[Any]]
+
+
+def json_safe(value: Any) -> Any:
+    try:
+        return loads(dumps(value))
+    except TypeError:
+        return str(value)
+
+
+class QueryTrace:
+    """Phase timings and the compiled query of one traced operation."""
+
+    def __init__(self, backend: str, operation: str, dataset: str):
+        self.backend = backend
+        self.operation = operation
+        self.dataset = dataset
+        self.started = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        self.query: Dict[str, Any] = {}
+
+    def add_phase(self, name: str, ms: float) -> None:
+        self.phases[name] = self.phases.get(name, 0.0) + ms
+
+
+trace_var: ContextVar[Optional[QueryTrace]] = ContextVar("query_trace", default=None)
+
+
+def describe_query(**query: Any) -> None:
+    trace = trace_var.get()
+    if trace is not None:
+        trace.query.update(query)
+
+
+class SlowQueryLog:
+    """Keep recent slow queries and their plans in a ring buffer.
+
+    Operations run inside ``trace()``; services mark their phases with
+    ``utils.timing.phase()`` and hand over the compiled query with
+    ``describe_query()``. An operation slower than ``threshold_ms`` is
+    recorded, and its plan is captured afterwards in the background through
+    the explainer registered for its backend, so the slow request itself is
+    not held up. Only one plan per dataset is captured at a time.
+    """
+
+    def __init__(self, threshold_ms: int, capacity: int, explain: bool = True, enabled: bool = True):
+        self.threshold_ms = threshold_ms
+        self.explain = explain
+        self.enabled = enabled
+        self.entries: Deque[Dict[str, Any]] = deque(maxlen=capacity)
+        self.explainers: Dict[str, Explainer] = {}
+        self.explaining: Set[Tuple[str, str]] = set()
+        self.traced = 0
+        self.recorded = 0
+
+    def register_explainer(self, backend: str, explainer: Explainer) -> None:
+        self.explainers[backend] = explainer
+
+    @asynccontextmanager
+    async def trace(self, backend: str, operation: str, dataset: str) -> AsyncIterator[Optional[QueryTrace]]:
+        if not self.enabled:
+            yield None
+            return
+
+        trace = QueryTrace(backend, operation, dataset)
+        token = trace_var.set(trace)
+        self.traced += 1
+        error: Optional[BaseException] = None
+        try:
+            yield trace
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            trace_var.reset(token)
+            for name, ms in trace.phases.items():
+                query_phase_duration.observe(ms / 1000, backend, operation, name)
+            total_ms = (time.perf_counter() - trace.started) * 1000
+            if total_ms >= self.threshold_ms:
+                self.record(trace, total_ms, error)
+
+    def record(self, trace: QueryTrace, total_ms: float, error: Optional[BaseException]) -> None:
+        phases = {name: round(ms, 2) for name, ms in trace.phases.items()}
+        entry = {
+            "backend": trace.backend,
+            "operation": trace.operation,
+            "dataset": trace.dataset,
+            "recorded_at": time.time(),
+            "total_ms": round(total_ms, 2),
+            "phases_ms": phases,
+            # Admission queueing, pool waits and coalesced waits end up here
+            "other_ms": round(max(total_ms - sum(trace.phases.values()), 0), 2),
+            "query": json_safe(trace.query),
+            "error": f"{type(error).__name__}: {error}" if error is not None else None,
+            "plan": None,
+            "plan_status": "not captured"
+        }
+        self.entries.append(entry)
+        self.recorded += 1
+        logger.warning(f"Slow {trace.backend} {trace.operation} on '{trace.dataset}': {total_ms:.0f} ms {phases}")
+
+        explainer = self.explainers.get(trace.backend)
+        key = (trace.backend, trace.dataset)
+        if not self.explain or explainer is None or not trace.query:
+            return
+        if key in self.explaining:
+            entry["plan_status"] = "skipped, another plan for this dataset is being captured"
+            return
+
+        entry["plan_status"] = "pending"
+        self.explaining.add(key)
+        spawn(self.capture_plan(entry, key, explainer, dict(trace.query)))
+
+    async def capture_plan(
+        self,
+        entry: Dict[str, Any],
+        key: Tuple[str, str],
+        explainer: Explainer,
+        query: Dict[str, Any]
+    ) -> None:
+        try:
+            plan = await asyncio.wait_for(explainer(key[1], query), timeout=SLOW_QUERY_EXPLAIN_TIMEOUT_SECONDS)
+            entry["plan"] = json_safe(plan)
+            entry["plan_status"] = "captured"
+        except Exception as e:
+            entry["plan_status"] = f"failed: {type(e).__name__}: {e}"
+        finally:
+            self.explaining.discard(key)
+
+    def list(self, limit: Optional[int] = None, backend: Optional[str] = None) -> List[Dict[str, Any]]:
+        entries = [entry for entry in reversed(self.entries) if backend is None or entry["backend"] == backend]
+        return entries[:limit] if limit else entries
+
+    def clear(self) -> int:
+        count = len(self.entries)
+        self.entries.clear()
+        return count
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "threshold_ms": self.threshold_ms,
+            "traced": self.traced,
+            "recorded": self.recorded,
+            "buffered": len(self.entries),
+            "capacity": self.entries.maxlen
+        }
+
+
+slow_queries = SlowQueryLog(
+    SLOW_QUERY_THRESHOLD_MS,
+    SLOW_QUERY_LOG_SIZE,
+    explain=SLOW_QUERY_EXPLAIN,
+    enabled=SLOW_QUERY_ENABLED
+)
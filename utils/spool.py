@@ -0,0 +1,296 @@
+import asyncio
+import logging
+import os
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from config import (
+    SPOOL_ENABLED,
+    SPOOL_DIR,
+    SPOOL_RETRY_INITIAL_SECONDS,
+    SPOOL_RETRY_MAX_SECONDS,
+    SPOOL_MAX_ATTEMPTS,
+    SPOOL_POLL_SECONDS,
+    SPOOL_CLAIM_TIMEOUT_SECONDS
+)
+from utils.background import spawn
+from utils.serialization import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+Writer = Callable[[Dict[str, Any], Any], Awaitable[None]]
+
+
+def encode_value(value: Any) -> str:
+    try:
+        return dumps(value).decode()
+    except TypeError:
+        return dumps(str(value)).decode()
+
+
+class WriteSpool:
+    """Durable local queue of upload data a backend failed to take.
+
+    Each entry is a Parquet file holding the parsed rows plus a JSON
+    manifest with the target, the metadata to record and the retry state.
+    The manifest is written last, so a crash mid-write leaves no entry.
+    A background loop replays due entries through the writer registered
+    for their backend, backing off exponentially between attempts; entries
+    that keep failing are moved to ``failed/`` after ``max_attempts``.
+
+    Workers sharing the directory claim an entry by renaming its manifest
+    to ``<id>.claimed`` before replaying it, so only one of them writes it.
+    A failed attempt releases the claim by writing the manifest back; a
+    claim left behind by a crashed worker is released after
+    ``claim_timeout`` seconds.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        initial_backoff: float,
+        max_backoff: float,
+        max_attempts: int,
+        poll_seconds: float,
+        claim_timeout: float = 900,
+        enabled: bool = True
+    ):
+        self.directory = directory
+        self.failed_directory = os.path.join(directory, "failed")
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.max_attempts = max_attempts
+        self.poll_seconds = poll_seconds
+        self.claim_timeout = claim_timeout
+        self.enabled = enabled
+        self.writers: Dict[str, Writer] = {}
+        self.wakeup: Optional[asyncio.Event] = None
+        self.replayed = 0
+        self.dead_lettered = 0
+        # id -> (rows, created_at) of the entries last seen pending, kept so
+        # stats() never touches the disk
+        self.known_entries: Dict[str, tuple] = {}
+
+    def register(self, backend: str, writer: Writer) -> None:
+        self.writers[backend] = writer
+
+    def manifest_path(self, entry_id: str, directory: Optional[str] = None) -> str:
+        return os.path.join(directory or self.directory, f"{entry_id}.json")
+
+    def claim_path(self, entry_id: str) -> str:
+        return os.path.join(self.directory, f"{entry_id}.claimed")
+
+    def data_path(self, entry_id: str, directory: Optional[str] = None) -> str:
+        return os.path.join(directory or self.directory, f"{entry_id}.parquet")
+
+    def write_entry(self, manifest: Dict[str, Any], df) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        os.makedirs(self.directory, exist_ok=True)
+        entry_id = manifest["id"]
+
+        # Mixed-type object columns cannot be stored as one Arrow type, so
+        # they are kept as JSON text and decoded again on replay
+        columns = {}
+        json_columns = []
+        for name in df.columns:
+            try:
+                columns[str(name)] = pa.array(df[name], from_pandas=True)
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                columns[str(name)] = pa.array([encode_value(value) for value in df[name]], type=pa.string())
+                json_columns.append(str(name))
+        manifest["json_columns"] = json_columns
+
+        data_tmp = self.data_path(entry_id) + ".tmp"
+        pq.write_table(pa.table(columns), data_tmp, compression="zstd")
+        os.replace(data_tmp, self.data_path(entry_id))
+
+        manifest_tmp = self.manifest_path(entry_id) + ".tmp"
+        with open(manifest_tmp, "wb") as f:
+            f.write(dumps(manifest))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(manifest_tmp, self.manifest_path(entry_id))
+
+    def read_frame(self, manifest: Dict[str, Any]):
+        import pyarrow.parquet as pq
+
+        df = pq.read_table(self.data_path(manifest["id"])).to_pandas()
+        for name in manifest.get("json_columns", []):
+            df[name] = [loads(value) for value in df[name]]
+        return df
+
+    async def put(self, backend: str, dataset: str, df, metadata: Dict[str, Any]) -> str:
+        now = time.time()
+        manifest = {
+            "id": f"{int(now * 1000)}_{backend}_{uuid.uuid4().hex[:8]}",
+            "backend": backend,
+            "dataset": dataset,
+            "rows": len(df),
+            "created_at": now,
+            "attempts": 0,
+            "next_attempt_at": now + self.initial_backoff,
+            "last_error": None,
+            "metadata": metadata
+        }
+        await asyncio.to_thread(self.write_entry, manifest, df)
+        self.known_entries[manifest["id"]] = (manifest["rows"], now)
+        logger.info(f"Spooled {len(df)} rows for {backend} '{dataset}' as {manifest['id']}")
+        if self.wakeup is not None:
+            self.wakeup.set()
+        return manifest["id"]
+
+    def pending(self) -> List[Dict[str, Any]]:
+        if not os.path.isdir(self.directory):
+            return []
+        for name in os.listdir(self.directory):
+            if name.endswith(".claimed"):
+                self.release_stale_claim(name)
+
+        manifests = []
+        for name in sorted(os.listdir(self.directory)):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.directory, name), "rb") as f:
+                    manifests.append(loads(f.read()))
+            except (OSError, ValueError) as e:
+                logger.warning(f"Skipping unreadable spool manifest {name}: {e}")
+        return manifests
+
+    def release_stale_claim(self, name: str) -> None:
+        path = os.path.join(self.directory, name)
+        try:
+            if time.time() - os.path.getmtime(path) < self.claim_timeout:
+                return
+            os.rename(path, self.manifest_path(name[:-len(".claimed")]))
+            logger.warning(f"Released stale spool claim {name}")
+        except FileNotFoundError:
+            pass
+
+    def claim(self, entry_id: str) -> Optional[Dict[str, Any]]:
+        """Take the entry for this worker and return its current manifest.
+
+        Returns None if another worker got there first.
+        """
+        try:
+            os.rename(self.manifest_path(entry_id), self.claim_path(entry_id))
+        except FileNotFoundError:
+            return None
+        # The claim's age is measured from now, not from the manifest write
+        os.utime(self.claim_path(entry_id))
+        with open(self.claim_path(entry_id), "rb") as f:
+            return loads(f.read())
+
+    def save_manifest(self, manifest: Dict[str, Any]) -> None:
+        """Write the manifest back, releasing the claim on it."""
+        manifest_tmp = self.manifest_path(manifest["id"]) + ".tmp"
+        with open(manifest_tmp, "wb") as f:
+            f.write(dumps(manifest))
+        os.replace(manifest_tmp, self.manifest_path(manifest["id"]))
+        os.remove(self.claim_path(manifest["id"]))
+
+    def remove(self, manifest: Dict[str, Any]) -> None:
+        # Claim first: without a manifest the leftover data file is ignored
+        os.remove(self.claim_path(manifest["id"]))
+        os.remove(self.data_path(manifest["id"]))
+
+    def dead_letter(self, manifest: Dict[str, Any]) -> None:
+        os.makedirs(self.failed_directory, exist_ok=True)
+        os.replace(self.data_path(manifest["id"]), self.data_path(manifest["id"], self.failed_directory))
+        with open(self.manifest_path(manifest["id"], self.failed_directory), "wb") as f:
+            f.write(dumps(manifest))
+        os.remove(self.claim_path(manifest["id"]))
+
+    async def replay(self, manifest: Dict[str, Any]) -> None:
+        writer = self.writers.get(manifest["backend"])
+        if writer is None:
+            return
+
+        manifest = await asyncio.to_thread(self.claim, manifest["id"])
+        if manifest is None:
+            return
+        if manifest["next_attempt_at"] > time.time():
+            # Another worker failed it since it was listed; its backoff stands
+            await asyncio.to_thread(self.save_manifest, manifest)
+            return
+
+        try:
+            df = await asyncio.to_thread(self.read_frame, manifest)
+            await writer(manifest, df)
+        except Exception as e:
+            manifest["attempts"] += 1
+            manifest["last_error"] = f"{type(e).__name__}: {e}"
+            if manifest["attempts"] >= self.max_attempts:
+                logger.error(f"Giving up on spooled {manifest['id']} after {manifest['attempts']} attempts: {e}")
+                await asyncio.to_thread(self.dead_letter, manifest)
+                self.known_entries.pop(manifest["id"], None)
+                self.dead_lettered += 1
+                return
+            backoff = min(self.initial_backoff * 2 ** manifest["attempts"], self.max_backoff)
+            manifest["next_attempt_at"] = time.time() + backoff
+            logger.warning(f"Replay of spooled {manifest['id']} failed, retrying in {backoff:.0f}s: {e}")
+            await asyncio.to_thread(self.save_manifest, manifest)
+            return
+
+        await asyncio.to_thread(self.remove, manifest)
+        self.known_entries.pop(manifest["id"], None)
+        self.replayed += 1
+        logger.info(f"Replayed spooled {manifest['id']} into {manifest['backend']} '{manifest['dataset']}'")
+
+    async def replay_due(self) -> float:
+        """Replay every due entry and return the seconds until the next one."""
+        manifests = await asyncio.to_thread(self.pending)
+        self.known_entries = {manifest["id"]: (manifest["rows"], manifest["created_at"]) for manifest in manifests}
+        next_due = self.poll_seconds
+        for manifest in manifests:
+            wait = manifest["next_attempt_at"] - time.time()
+            if wait <= 0:
+                await self.replay(manifest)
+            else:
+                next_due = min(next_due, wait)
+        return max(next_due, 0.1)
+
+    async def run(self) -> None:
+        self.wakeup = asyncio.Event()
+        while True:
+            self.wakeup.clear()
+            try:
+                delay = await self.replay_due()
+            except Exception as e:
+                logger.error(f"Spool replay pass failed: {e}")
+                delay = self.poll_seconds
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self) -> None:
+        if self.enabled:
+            spawn(self.run(), key="write_spool")
+
+    def stats(self) -> Dict[str, Any]:
+        # As of the last replay pass plus this worker's own puts and replays;
+        # entries claimed by other workers drop out on the next pass
+        entries = list(self.known_entries.values())
+        return {
+            "enabled": self.enabled,
+            "pending": len(entries),
+            "pending_rows": sum(rows for rows, _ in entries),
+            "oldest_age_seconds": round(time.time() - min(created for _, created in entries), 1) if entries else 0,
+            "replayed": self.replayed,
+            "dead_lettered": self.dead_lettered
+        }
+
+
+write_spool = WriteSpool(
+    SPOOL_DIR,
+    SPOOL_RETRY_INITIAL_SECONDS,
+    SPOOL_RETRY_MAX_SECONDS,
+    SPOOL_MAX_ATTEMPTS,
+    SPOOL_POLL_SECONDS,
+    claim_timeout=SPOOL_CLAIM_TIMEOUT_SECONDS,
+    enabled=SPOOL_ENABLED
+)
@@ -0,0 +1,69 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from utils.slow_queries import trace_var
+
+# Milliseconds per phase for the current request; shared with the tasks
+# the request spawns, which see the same dict
+timings_var: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_timings", default=None)
+
+
+def record_phase(name: str, ms: float) -> None:
+    timings = timings_var.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + ms
+    trace = trace_var.get()
+    if trace is not None:
+        trace.add_phase(name, ms)
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Time a block into the request's Server-Timing and the active query trace."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_phase(name, (time.perf_counter() - started) * 1000)
+
+
+def server_timing(timings: Dict[str, float], total_ms: float) -> str:
+    metrics = [f"{name};dur={ms:.1f}" for name, ms in timings.items()]
+    metrics.append(f"total;dur={total_ms:.1f}")
+    return ", ".join(metrics)
+
+
+class ServerTimingMiddleware:
+    """Report the phases recorded during a request in a Server-Timing header.
+
+    The header goes out with the response head, so streamed responses only
+    show the phases finished before their first chunk.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings: Dict[str, float] = {}
+        token = timings_var.set(timings)
+        started = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", server_timing(timings, (time.perf_counter() - started) * 1000))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            timings_var.reset(token)